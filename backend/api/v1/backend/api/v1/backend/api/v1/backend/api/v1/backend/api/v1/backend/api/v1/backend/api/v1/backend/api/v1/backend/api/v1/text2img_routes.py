@@ -5,14 +5,15 @@
 
 import os
 import json
-import requests
 import asyncio
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 from backend.models.models import JimengText2ImgTask
-import subprocess
-import platform
-import threading
+from backend.utils.pagination import keyset_paginate, is_cursor_request, want_total
+from backend.utils.task_stats import get_status_counts, invalidate_task_stats
+from backend.core.task_retry import retry_tasks
+from backend.core.download_jobs import download_job_manager, batch_folder_name
+from backend.utils.folder_dialog import select_folder, get_server_dir, ServerDirError
 from urllib.parse import urlparse
 
 # 创建蓝图
@@ -33,9 +34,27 @@ def get_text2img_tasks():
         if status is not None:
             query = query.where(JimengText2ImgTask.status == status)
         
-        # 分页
-        total = query.count()
-        tasks = query.order_by(JimengText2ImgTask.create_at.desc()).paginate(page, page_size)
+        if is_cursor_request(request.args):
+            # 游标分页：每页开销与翻页深度无关，总数按需统计
+            cursor = request.args.get('cursor') or None
+            tasks, next_cursor = keyset_paginate(query, JimengText2ImgTask, cursor, page_size)
+            total = query.count() if want_total(request.args, default=False) else None
+            pagination = {
+                'total': total,
+                'page_size': page_size,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        else:
+            # 页码分页
+            total = query.count() if want_total(request.args) else None
+            tasks = query.order_by(JimengText2ImgTask.create_at.desc()).paginate(page, page_size)
+            pagination = {
+                'total': total,
+                'page': page,
+                'page_size': page_size,
+                'total_pages': (total + page_size - 1) // page_size if total is not None else None
+            }
         
         data = []
         for task in tasks:
@@ -59,14 +78,14 @@ def get_text2img_tasks():
         return jsonify({
             'success': True,
             'data': data,
-            'pagination': {
-                'total': total,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total + page_size - 1) // page_size
-            }
+            'pagination': pagination
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': '分页参数错误: {}'.format(str(e))
+        }), 400
     except Exception as e:
         print("获取任务列表失败: {}".format(str(e)))
         return jsonify({
@@ -105,6 +124,8 @@ def create_text2img_task():
             image4=None
         )
         
+        invalidate_task_stats(JimengText2ImgTask)
+        
         print("任务创建成功，任务ID: {}".format(task.id))
         return jsonify({
             'success': True,
@@ -131,6 +152,7 @@ def delete_text2img_task(task_id):
         task = JimengText2ImgTask.get(JimengText2ImgTask.id == task_id)
         task_prompt = task.prompt[:50] + '...' if len(task.prompt) > 50 else task.prompt
         task.delete_instance()
+        invalidate_task_stats(JimengText2ImgTask)
         
         print("删除任务成功: {}".format(task_prompt))
         return jsonify({
@@ -158,6 +180,7 @@ def retry_text2img_task(task_id):
         task = JimengText2ImgTask.get_by_id(task_id)
         task.status = 0  # 重置为排队状态
         task.save()
+        invalidate_task_stats(JimengText2ImgTask)
         
         print("重试文生图任务: {}".format(task_id))
         return jsonify({
@@ -184,20 +207,10 @@ def batch_retry_text2img_tasks():
         data = request.get_json()
         task_ids = data.get('task_ids', [])
         
-        if task_ids:
-            # 如果提供了特定的任务ID列表，只重试这些任务
-            retry_count = JimengText2ImgTask.update(status=0).where(
-                JimengText2ImgTask.id.in_(task_ids),
-                JimengText2ImgTask.status == 3,  # 只重试失败的任务
-                JimengText2ImgTask.is_empty_task == False  # 排除空任务
-            ).execute()
-        else:
-            # 如果没有提供任务ID，重试所有失败的任务
-            retry_count = JimengText2ImgTask.update(status=0).where(
-                JimengText2ImgTask.status == 3,  # 只重试失败的任务
-                JimengText2ImgTask.is_empty_task == False  # 排除空任务
-            ).execute()
-        
+        # 只重试失败的非空任务，没有提供任务ID时重试所有失败的任务
+        retried_ids = retry_tasks(JimengText2ImgTask, task_ids,
+                                  conditions=[JimengText2ImgTask.is_empty_task == False])
+        retry_count = len(retried_ids)
         print(f"批量重试文生图任务: {retry_count}个")
         return jsonify({
             'success': True,
@@ -218,13 +231,13 @@ def batch_retry_text2img_tasks():
 def get_text2img_stats():
     """获取文生图任务统计信息"""
     try:
-        # 统计时过滤掉空任务
-        base_query = JimengText2ImgTask.select().where(JimengText2ImgTask.is_empty_task == False)
-        total_tasks = base_query.count()
-        queued_tasks = base_query.where(JimengText2ImgTask.status == 0).count()  # 排队中
-        processing_tasks = base_query.where(JimengText2ImgTask.status == 1).count()  # 生成中
-        completed_tasks = base_query.where(JimengText2ImgTask.status == 2).count()  # 已完成
-        failed_tasks = base_query.where(JimengText2ImgTask.status == 3).count()  # 失败
+        # 统计时过滤掉空任务，一次分组查询得到所有状态的数量
+        stats = get_status_counts(JimengText2ImgTask, JimengText2ImgTask.is_empty_task == False)
+        total_tasks = stats['total']
+        queued_tasks = stats['queued']  # 排队中
+        processing_tasks = stats['processing']  # 生成中
+        completed_tasks = stats['completed']  # 已完成
+        failed_tasks = stats['failed']  # 失败
         
         print("获取任务统计 - 总数:{}, 排队:{}, 处理中:{}, 已完成:{}, 失败:{}".format(
             total_tasks, queued_tasks, processing_tasks, completed_tasks, failed_tasks))
@@ -292,130 +305,37 @@ def batch_download_images():
                 'message': '选中的任务没有图片可下载'
             }), 400
         
-        # 在后台线程中选择文件夹并下载
-        def download_in_background():
-            try:
-                # 使用系统原生对话框选择文件夹
-                download_dir = None
-                system = platform.system()
-                
-                if system == "Darwin":  # macOS
-                    try:
-                        print("正在调用macOS文件选择器...")
-                        # 使用osascript调用macOS原生文件选择器
-                        applescript = '''
-                        tell application "Finder"
-                            activate
-                            set selectedFolder to choose folder with prompt "选择图片下载文件夹" default location (path to downloads folder)
-                            return POSIX path of selectedFolder
-                        end tell
-                        '''
-                        result = subprocess.run([
-                            'osascript', '-e', applescript
-                        ], capture_output=True, text=True, timeout=60)
-                        
-                        print(f"文件选择器返回码: {result.returncode}")
-                        print(f"文件选择器输出: {result.stdout}")
-                        print(f"文件选择器错误: {result.stderr}")
-                        
-                        if result.returncode == 0 and result.stdout.strip():
-                            download_dir = result.stdout.strip()
-                            print(f"用户选择了文件夹: {download_dir}")
-                        elif result.returncode == 1:
-                            print("用户取消了文件夹选择")
-                            return
-                        else:
-                            print(f"文件选择器异常退出，返回码: {result.returncode}")
-                    except subprocess.TimeoutExpired:
-                        print("文件选择器超时，用户可能没有响应")
-                        return
-                    except Exception as e:
-                        print(f"macOS文件选择器失败: {str(e)}")
-                        
-                elif system == "Windows":  # Windows
-                    try:
-                        # 使用PowerShell调用Windows文件选择器
-                        ps_script = """
-                        Add-Type -AssemblyName System.Windows.Forms
-                        $folderBrowser = New-Object System.Windows.Forms.FolderBrowserDialog
-                        $folderBrowser.Description = "选择图片下载文件夹"
-                        $folderBrowser.SelectedPath = [Environment]::GetFolderPath("MyDocuments")
-                        $result = $folderBrowser.ShowDialog()
-                        if ($result -eq [System.Windows.Forms.DialogResult]::OK) {
-                            Write-Output $folderBrowser.SelectedPath
-                        }
-                        """
-                        result = subprocess.run(['powershell', '-Command', ps_script], 
-                                              capture_output=True, text=True, timeout=30)
-                        if result.returncode == 0 and result.stdout.strip():
-                            download_dir = result.stdout.strip()
-                    except Exception as e:
-                        print(f"Windows文件选择器失败: {str(e)}")
-                        
-                else:  # Linux
-                    try:
-                        # 尝试使用zenity
-                        result = subprocess.run([
-                            'zenity', '--file-selection', '--directory', 
-                            '--title=选择图片下载文件夹'
-                        ], capture_output=True, text=True, timeout=30)
-                        
-                        if result.returncode == 0:
-                            download_dir = result.stdout.strip()
-                    except Exception as e:
-                        print(f"Linux文件选择器失败: {str(e)}")
-                
-                # 如果原生对话框失败，使用默认下载目录
-                if not download_dir:
-                    download_dir = os.path.expanduser("~/Downloads")
-                    print(f"文件选择器失败，使用默认下载目录: {download_dir}")
-                
-                # 确保目录存在
-                if not os.path.exists(download_dir):
-                    os.makedirs(download_dir, exist_ok=True)
-                
-                print(f"开始下载 {len(all_images)} 张图片到: {download_dir}")
-                
-                # 创建以当前时间命名的子文件夹
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                batch_folder = os.path.join(download_dir, f"jimeng_images_{timestamp}")
-                os.makedirs(batch_folder, exist_ok=True)
-                
-                success_count = 0
-                error_count = 0
-                
-                # 下载每张图片
-                for img_info in all_images:
-                    try:
-                        response = requests.get(img_info['url'], timeout=30)
-                        response.raise_for_status()
-                        
-                        file_path = os.path.join(batch_folder, img_info['filename'])
-                        with open(file_path, 'wb') as f:
-                            f.write(response.content)
-                        
-                        success_count += 1
-                        print(f"下载成功: {img_info['filename']}")
-                        
-                    except Exception as e:
-                        error_count += 1
-                        print(f"下载失败 {img_info['filename']}: {str(e)}")
-                
-                print(f"批量下载完成: 成功 {success_count} 张，失败 {error_count} 张")
-                print(f"文件保存位置: {batch_folder}")
-                
-            except Exception as e:
-                print(f"批量下载过程出错: {str(e)}")
-        
-        # 在后台线程中执行下载
-        download_thread = threading.Thread(target=download_in_background)
-        download_thread.daemon = True
-        download_thread.start()
+        # 服务端目录模式（传入 output_dir 或 headless=true）不弹出对话框
+        try:
+            output_dir = get_server_dir(data)
+        except ServerDirError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        # 在后台线程中选择文件夹，返回本批次的保存目录（用户取消时返回 None）
+        def choose_batch_folder(job):
+            download_dir = output_dir or select_folder("选择图片下载文件夹", fallback_dir=os.path.expanduser("~/Downloads"))
+            if not download_dir:
+                return None
+            
+            # 确保目录存在
+            os.makedirs(download_dir, exist_ok=True)
+            
+            print(f"开始下载 {len(all_images)} 张图片到: {download_dir}")
+            
+            # 每个下载任务使用固定的子文件夹（任务创建时间 + 任务ID），继续下载时复用
+            batch_folder = os.path.join(download_dir, batch_folder_name("jimeng_images", job))
+            os.makedirs(batch_folder, exist_ok=True)
+            
+            return batch_folder
+        
+        # 创建下载任务，在后台线程中选择文件夹并并发下载
+        job = download_job_manager.start_job('text2img', all_images, choose_batch_folder)
         
         return jsonify({
             'success': True,
-            'message': f'开始下载 {len(all_images)} 张图片，请选择下载文件夹',
+            'message': f'开始下载 {len(all_images)} 张图片到 {output_dir}' if output_dir else f'开始下载 {len(all_images)} 张图片，请选择下载文件夹',
             'data': {
+                'job_id': job.id,
                 'total_images': len(all_images),
                 'tasks_count': len(tasks)
             }
@@ -458,6 +378,7 @@ def delete_tasks_before_today():
             JimengText2ImgTask.create_at < today_start
         ).execute()
         
+        invalidate_task_stats(JimengText2ImgTask)
         print(f"删除了 {deleted_count} 个今日前的文生图任务")
         
         return jsonify({
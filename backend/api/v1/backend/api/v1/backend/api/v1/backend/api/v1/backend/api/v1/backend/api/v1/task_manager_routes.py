@@ -4,6 +4,7 @@
 """
 from flask import Blueprint, jsonify, request
 from backend.core.global_task_manager import global_task_manager
+from backend.core.bounded_task_queue import account_task_queue
 
 # 创建蓝图
 task_manager_bp = Blueprint('task_manager', __name__, url_prefix='/api/task-manager')
@@ -48,6 +49,26 @@ def get_thread_details():
             'message': '获取线程详细信息失败: {}'.format(str(e))
         }), 500
 
+@task_manager_bp.route('/queue', methods=['GET'])
+def get_submit_queue_status():
+    """获取有界提交队列状态（队列深度、运行中任务数）"""
+    try:
+        print("获取提交队列状态")
+        queue_status = account_task_queue.get_status()
+        
+        return jsonify({
+            'success': True,
+            'data': queue_status,
+            'message': '获取提交队列状态成功'
+        })
+        
+    except Exception as e:
+        print("获取提交队列状态失败: {}".format(str(e)))
+        return jsonify({
+            'success': False,
+            'message': '获取提交队列状态失败: {}'.format(str(e))
+        }), 500
+
 @task_manager_bp.route('/start', methods=['POST'])
 def start_task_manager():
     """启动任务管理器"""
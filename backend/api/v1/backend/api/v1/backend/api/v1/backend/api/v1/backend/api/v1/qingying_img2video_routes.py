@@ -5,20 +5,45 @@
 
 import os
 import time
-import platform
-import subprocess
 import threading
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from peewee import chunked
 from werkzeug.utils import secure_filename
 import uuid
 
 from backend.models.models import QingyingImage2VideoTask, QingyingAccount
 from backend.core.global_task_manager import global_task_manager
+from backend.utils.pagination import keyset_paginate, is_cursor_request, want_total
+from backend.utils.task_stats import get_status_counts, invalidate_task_stats
+from backend.utils.account_cache import qingying_nickname_cache
+from backend.core.task_retry import retry_tasks
+from backend.core.task_purge import purge_tasks
+from backend.utils.folder_dialog import select_folder, get_server_dir, ServerDirError
+from backend.utils.bulk_insert import bulk_create
+from backend.utils.upload_pipeline import upload_request, process_uploads
+from backend.utils.image_store import image_store, IMPORT_MODES
+from backend.utils.folder_scanner import scan_images, ScanStats
+from backend.config.settings import IMPORT_BATCH_SIZE
 
 # 创建蓝图
 qingying_img2video_bp = Blueprint('qingying_img2video', __name__, url_prefix='/api/v1/qingying/img2video')
 
+# 上传图片的临时目录（在后端根目录下），删除任务时只会删除这里的旧独立图片文件
+UPLOAD_TMP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'tmp')
+
+def dispatch_tasks(task_ids):
+    """把排队任务提交到全局任务管理器中的清影任务管理器"""
+    manager = getattr(global_task_manager, 'qingying_img2video_manager', None)
+    if not task_ids or manager is None:
+        return
+    if hasattr(manager, 'submit_tasks'):
+        manager.submit_tasks(task_ids)
+    else:
+        for task_id in task_ids:
+            manager.submit_task(task_id)
+
 def allowed_file(filename):
     """检查文件类型是否允许"""
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
@@ -31,26 +56,39 @@ def get_tasks():
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 20))
         
-        # 计算偏移量
-        offset = (page - 1) * page_size
+        tasks_query = QingyingImage2VideoTask.select()
         
-        # 查询任务列表（按创建时间倒序）
-        tasks_query = QingyingImage2VideoTask.select().order_by(QingyingImage2VideoTask.create_at.desc())
-        total_count = tasks_query.count()
+        if is_cursor_request(request.args):
+            # 游标分页：每页开销与翻页深度无关，总数按需统计
+            cursor = request.args.get('cursor') or None
+            tasks, next_cursor = keyset_paginate(tasks_query, QingyingImage2VideoTask, cursor, page_size)
+            total_count = tasks_query.count() if want_total(request.args, default=False) else None
+            pagination = {
+                'page_size': page_size,
+                'total': total_count,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        else:
+            # 计算偏移量
+            offset = (page - 1) * page_size
+            
+            # 查询任务列表（按创建时间倒序）
+            total_count = tasks_query.count() if want_total(request.args) else None
+            tasks = list(tasks_query.order_by(QingyingImage2VideoTask.create_at.desc()).offset(offset).limit(page_size))
+            pagination = {
+                'page': page,
+                'page_size': page_size,
+                'total': total_count,
+                'pages': (total_count + page_size - 1) // page_size if total_count is not None else None
+            }
         
-        tasks = list(tasks_query.offset(offset).limit(page_size))
+        # 批量获取本页任务关联的账号昵称（缓存未命中时只查询一次）
+        nicknames = qingying_nickname_cache.get_many(task.account_id for task in tasks)
         
         # 构建返回数据
         task_list = []
         for task in tasks:
-            # 获取关联的账号信息
-            account = None
-            if task.account_id:
-                try:
-                    account = QingyingAccount.get_by_id(task.account_id)
-                except QingyingAccount.DoesNotExist:
-                    account = None
-            
             task_data = {
                 'id': task.id,
                 'prompt': task.prompt,
@@ -65,7 +103,7 @@ def get_tasks():
                 'video_url': task.video_url,
                 'create_at': task.create_at.strftime('%Y-%m-%d %H:%M:%S'),
                 'update_at': task.update_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'account_nickname': account.nickname if account else None,
+                'account_nickname': nicknames.get(task.account_id),
                 'account_id': task.account_id
             }
             task_list.append(task_data)
@@ -73,14 +111,14 @@ def get_tasks():
         return jsonify({
             'success': True,
             'data': task_list,
-            'pagination': {
-                'page': page,
-                'page_size': page_size,
-                'total': total_count,
-                'pages': (total_count + page_size - 1) // page_size
-            }
+            'pagination': pagination
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'分页参数错误: {str(e)}'
+        }), 400
     except Exception as e:
         current_app.logger.error(f"获取清影图生视频任务列表失败: {str(e)}")
         return jsonify({
@@ -96,31 +134,19 @@ def get_stats():
         today = datetime.now().date()
         today_start = datetime.combine(today, datetime.min.time())
         
-        total_tasks = QingyingImage2VideoTask.select().count()
-        today_tasks = QingyingImage2VideoTask.select().where(
-            QingyingImage2VideoTask.create_at >= today_start
-        ).count()
+        total_tasks = get_status_counts(QingyingImage2VideoTask)['total']
         
-        # 按状态统计今日任务
-        pending_tasks = QingyingImage2VideoTask.select().where(
+        # 按状态统计今日任务（一次分组查询）
+        today_stats = get_status_counts(
+            QingyingImage2VideoTask,
             QingyingImage2VideoTask.create_at >= today_start,
-            QingyingImage2VideoTask.status == 0
-        ).count()
-        
-        processing_tasks = QingyingImage2VideoTask.select().where(
-            QingyingImage2VideoTask.create_at >= today_start,
-            QingyingImage2VideoTask.status == 1
-        ).count()
-        
-        completed_tasks = QingyingImage2VideoTask.select().where(
-            QingyingImage2VideoTask.create_at >= today_start,
-            QingyingImage2VideoTask.status == 2
-        ).count()
-        
-        failed_tasks = QingyingImage2VideoTask.select().where(
-            QingyingImage2VideoTask.create_at >= today_start,
-            QingyingImage2VideoTask.status == 3
-        ).count()
+            cache_key=f'today:{today.isoformat()}'
+        )
+        today_tasks = today_stats['total']
+        pending_tasks = today_stats['queued']
+        processing_tasks = today_stats['processing']
+        completed_tasks = today_stats['completed']
+        failed_tasks = today_stats['failed']
         
         return jsonify({
             'success': True,
@@ -185,12 +211,15 @@ def create_task():
         unique_filename = f"{uuid.uuid4().hex}.{file_ext}"
         
         # 确保tmp目录存在
-        tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'tmp')
+        tmp_dir = UPLOAD_TMP_DIR
         os.makedirs(tmp_dir, exist_ok=True)
         
         file_path = os.path.join(tmp_dir, unique_filename)
         file.save(file_path)
         
+        # 放入内容寻址存储，相同内容的图片只保存一份
+        file_path = image_store.put_file(file_path, move=True)
+        
         # 创建任务记录
         task = QingyingImage2VideoTask.create(
             prompt=prompt,
@@ -205,9 +234,10 @@ def create_task():
             update_at=datetime.now()
         )
         
+        invalidate_task_stats(QingyingImage2VideoTask)
+        
         # 提交任务到全局任务管理器
-        if hasattr(global_task_manager, 'qingying_img2video_manager'):
-            global_task_manager.qingying_img2video_manager.submit_task(task.id)
+        dispatch_tasks([task.id])
         
         return jsonify({
             'success': True,
@@ -231,15 +261,15 @@ def delete_task(task_id):
     """删除指定任务"""
     try:
         task = QingyingImage2VideoTask.get_by_id(task_id)
+        task.delete_instance()
         
-        # 删除关联的图片文件
-        if task.image_path and os.path.exists(task.image_path):
-            try:
-                os.remove(task.image_path)
-            except Exception as e:
-                current_app.logger.warning(f"删除图片文件失败: {str(e)}")
+        # 释放关联图片的引用（上传目录中的旧独立图片文件直接删除）
+        try:
+            image_store.discard_file(task.image_path, (UPLOAD_TMP_DIR,))
+        except Exception as e:
+            current_app.logger.warning(f"删除图片文件失败: {str(e)}")
         
-        task.delete_instance()
+        invalidate_task_stats(QingyingImage2VideoTask)
         
         return jsonify({
             'success': True,
@@ -265,26 +295,17 @@ def delete_tasks_before_today():
         today = datetime.now().date()
         today_start = datetime.combine(today, datetime.min.time())
         
-        # 查询今日前的任务
-        tasks_to_delete = QingyingImage2VideoTask.select().where(
-            QingyingImage2VideoTask.create_at < today_start
+        # 按块删除任务，图片交给后台回收（上传目录中的旧独立图片文件直接删除）
+        deleted_count, purge_id = purge_tasks(
+            QingyingImage2VideoTask,
+            conditions=[QingyingImage2VideoTask.create_at < today_start],
+            untracked_dirs=(UPLOAD_TMP_DIR,)
         )
         
-        deleted_count = 0
-        for task in tasks_to_delete:
-            # 删除关联的图片文件
-            if task.image_path and os.path.exists(task.image_path):
-                try:
-                    os.remove(task.image_path)
-                except Exception as e:
-                    current_app.logger.warning(f"删除图片文件失败: {str(e)}")
-            
-            task.delete_instance()
-            deleted_count += 1
-        
         return jsonify({
             'success': True,
-            'message': f'成功删除 {deleted_count} 个今日前的任务'
+            'message': f'成功删除 {deleted_count} 个今日前的任务',
+            'data': {'deleted_count': deleted_count, 'purge_id': purge_id}
         })
         
     except Exception as e:
@@ -306,10 +327,10 @@ def retry_task(task_id):
         task.video_url = None
         task.update_at = datetime.now()
         task.save()
+        invalidate_task_stats(QingyingImage2VideoTask)
         
         # 重新提交任务到全局任务管理器
-        if hasattr(global_task_manager, 'qingying_img2video_manager'):
-            global_task_manager.qingying_img2video_manager.submit_task(task.id)
+        dispatch_tasks([task.id])
         
         return jsonify({
             'success': True,
@@ -341,27 +362,10 @@ def batch_retry_tasks():
                 'message': '请选择要重试的任务'
             }), 400
         
-        retry_count = 0
-        for task_id in task_ids:
-            try:
-                task = QingyingImage2VideoTask.get_by_id(task_id)
-                
-                # 重置任务状态
-                task.status = 0  # 排队中
-                task.account_id = None
-                task.video_url = None
-                task.update_at = datetime.now()
-                task.save()
-                
-                # 重新提交任务到全局任务管理器
-                if hasattr(global_task_manager, 'qingying_img2video_manager'):
-                    global_task_manager.qingying_img2video_manager.submit_task(task.id)
-                
-                retry_count += 1
-                
-            except QingyingImage2VideoTask.DoesNotExist:
-                current_app.logger.warning(f"任务 {task_id} 不存在，跳过")
-                continue
+        # 分块 UPDATE 重置选中的任务（不存在的任务自动跳过），再重新提交到全局任务管理器
+        retried_ids = retry_tasks(QingyingImage2VideoTask, task_ids, statuses=None,
+                                  dispatch=dispatch_tasks)
+        retry_count = len(retried_ids)
         
         return jsonify({
             'success': True,
@@ -386,43 +390,24 @@ def import_folder_tasks():
         resolution = data.get('resolution', '720p')
         duration = data.get('duration', '5s')
         ai_audio = data.get('ai_audio', False)
+        import_mode = data.get('import_mode', 'auto')  # 默认硬链接，跨文件系统时引用原图片，见 IMPORT_MODES
+        if import_mode not in IMPORT_MODES:
+            return jsonify({'success': False, 'message': f'不支持的导入模式: {import_mode}'}), 400
         
         print(f"清影导入文件夹任务，参数: {generation_mode}, {frame_rate}, {resolution}, {duration}, {ai_audio}")
         
+        # 服务端目录模式（传入 folder_path，必须位于 EXPORT_ROOT 内）不弹出对话框；headless=true 时必须传入 folder_path
+        try:
+            server_folder = get_server_dir(data, 'folder_path', required=True)
+        except ServerDirError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if server_folder and not os.path.isdir(server_folder):
+            return jsonify({'success': False, 'message': f'文件夹不存在: {server_folder}'}), 400
+        
         def select_folder_and_import():
             try:
-                # 调用原生文件夹选择对话框
-                folder_path = None
-                system = platform.system()
-                
-                if system == "Darwin":  # macOS
-                    result = subprocess.run([
-                        'osascript', '-e',
-                        'tell application "Finder" to set folder_path to (choose folder with prompt "选择包含图片的文件夹") as string',
-                        '-e',
-                        'return POSIX path of folder_path'
-                    ], capture_output=True, text=True, timeout=60)
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        folder_path = result.stdout.strip()
-                        
-                elif system == "Windows":  # Windows
-                    result = subprocess.run([
-                        'powershell', '-Command',
-                        'Add-Type -AssemblyName System.Windows.Forms; $folder = New-Object System.Windows.Forms.FolderBrowserDialog; $folder.Description = "选择包含图片的文件夹"; $folder.ShowNewFolderButton = $true; if ($folder.ShowDialog() -eq "OK") { $folder.SelectedPath } else { "" }'
-                    ], capture_output=True, text=True, timeout=60)
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        folder_path = result.stdout.strip()
-                        
-                elif system == "Linux":  # Linux
-                    result = subprocess.run([
-                        'zenity', '--file-selection', '--directory',
-                        '--title=选择包含图片的文件夹'
-                    ], capture_output=True, text=True, timeout=60)
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        folder_path = result.stdout.strip()
+                # 服务端目录模式直接使用传入的目录，否则弹出原生文件夹选择对话框
+                folder_path = server_folder or select_folder("选择包含图片的文件夹")
                 
                 if not folder_path:
                     print("用户取消了文件夹选择")
@@ -434,47 +419,37 @@ def import_folder_tasks():
                     print(f"文件夹不存在: {folder_path}")
                     return
                 
-                # 支持的图片格式
-                supported_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
-                
+                # 递归扫描文件夹（校验文件头），边扫描边分批创建任务
+                scan_stats = ScanStats()
                 created_count = 0
-                import shutil
-                for filename in os.listdir(folder_path):
-                    file_ext = os.path.splitext(filename)[1].lower()
-                    if file_ext in supported_extensions:
-                        source_path = os.path.join(folder_path, filename)
-                        
-                        # 复制文件到tmp目录
-                        file_ext = filename.rsplit('.', 1)[1].lower()
-                        unique_filename = f"{uuid.uuid4().hex}.{file_ext}"
-                        
-                        tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'tmp')
-                        os.makedirs(tmp_dir, exist_ok=True)
-                        
-                        dest_path = os.path.join(tmp_dir, unique_filename)
-                        
-                        shutil.copy2(source_path, dest_path)
+                for source_paths in chunked(scan_images(folder_path, stats=scan_stats), IMPORT_BATCH_SIZE):
+                    # 本批图片的登记和任务创建在同一个事务中提交
+                    with image_store.atomic():
+                        # 硬链接或引用原图片，只有 copy 模式（或 link 模式跨文件系统）才复制数据
+                        dest_paths = image_store.import_files(source_paths, import_mode)
                         
-                        # 创建任务
-                        task = QingyingImage2VideoTask.create(
-                            prompt=f"根据图片 {filename} 生成视频",
-                            generation_mode=generation_mode,
-                            frame_rate=frame_rate,
-                            resolution=resolution,
-                            duration=duration,
-                            ai_audio=ai_audio,
-                            image_path=dest_path,
-                            status=0,
-                            create_at=datetime.now(),
-                            update_at=datetime.now()
-                        )
-                        
-                        # 提交任务到全局任务管理器
-                        if hasattr(global_task_manager, 'qingying_img2video_manager'):
-                            global_task_manager.qingying_img2video_manager.submit_task(task.id)
-                        
-                        created_count += 1
+                        now = datetime.now()
+                        task_rows = [{
+                            'prompt': f"根据图片 {os.path.basename(source_path)} 生成视频",
+                            'generation_mode': generation_mode,
+                            'frame_rate': frame_rate,
+                            'resolution': resolution,
+                            'duration': duration,
+                            'ai_audio': ai_audio,
+                            'image_path': dest_path,
+                            'status': 0,
+                            'create_at': now,
+                            'update_at': now
+                        } for source_path, dest_path in zip(source_paths, dest_paths)]
+                        created_tasks = bulk_create(QingyingImage2VideoTask, task_rows)
+                    created_count += len(created_tasks)
+                    
+                    invalidate_task_stats(QingyingImage2VideoTask)
+                    
+                    # 提交任务到全局任务管理器
+                    dispatch_tasks(created_tasks)
                 
+                print(f"扫描结果: {scan_stats.to_dict()}")
                 print(f"成功导入 {created_count} 个图片任务")
                 
             except Exception as e:
@@ -487,7 +462,7 @@ def import_folder_tasks():
         
         return jsonify({
             'success': True,
-            'message': '开始选择文件夹并导入，请在弹出的对话框中选择包含图片的文件夹'
+            'message': f'开始从 {server_folder} 导入图片' if server_folder else '开始选择文件夹并导入，请在弹出的对话框中选择包含图片的文件夹'
         })
         
     except Exception as e:
@@ -501,96 +476,81 @@ def import_folder_tasks():
 def batch_add_tasks():
     """批量添加图生视频任务"""
     try:
-        # 检查是否有图片文件
-        if 'images' not in request.files:
-            return jsonify({
-                'success': False,
-                'message': '请选择要上传的图片'
-            }), 400
-
-        files = request.files.getlist('images')
-        if not files or all(file.filename == '' for file in files):
-            return jsonify({
-                'success': False,
-                'message': '请选择要上传的图片'
-            }), 400
-
-        # 获取配置参数
-        generation_mode = request.form.get('generation_mode', 'fast')
-        frame_rate = request.form.get('frame_rate', '30')
-        resolution = request.form.get('resolution', '720p')
-        duration = request.form.get('duration', '5s')
-        ai_audio = request.form.get('ai_audio', 'false').lower() == 'true'
+        # 上传的图片在接收时直接写入临时目录
+        tmp_dir = os.path.join(UPLOAD_TMP_DIR, 'qingying_batch_upload')
+        with upload_request(request, tmp_dir) as (form, uploaded):
+            # 检查是否有图片文件
+            files = uploaded.getlist('images')
+            if not files or all(file.filename == '' for file in files):
+                return jsonify({
+                    'success': False,
+                    'message': '请选择要上传的图片'
+                }), 400
 
-        # 创建临时目录保存上传的图片
-        tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'tmp', 'qingying_batch_upload')
-        os.makedirs(tmp_dir, exist_ok=True)
+            # 获取配置参数
+            generation_mode = form.get('generation_mode', 'fast')
+            frame_rate = form.get('frame_rate', '30')
+            resolution = form.get('resolution', '720p')
+            duration = form.get('duration', '5s')
+            ai_audio = form.get('ai_audio', 'false').lower() == 'true'
 
-        created_tasks = []
-        failed_files = []
+            # 并行校验图片并计算哈希
+            uploads = []
+            failed_files = []
 
-        for i, file in enumerate(files):
-            try:
-                if file.filename == '':
+            for result in process_uploads(files, tmp_dir):
+                if result['error']:
+                    failed_files.append(f"{result['filename']}: {result['error']}")
+                    print(f"处理文件 {result['filename']} 失败: {result['error']}")
                     continue
+                uploads.append(result)
 
-                if not allowed_file(file.filename):
-                    failed_files.append(f"{file.filename}: 不支持的文件格式")
-                    continue
+            # 图片放入存储和批量创建任务在同一个事务中提交
+            with image_store.atomic():
+                now = datetime.now()
+                task_rows = [{
+                    # 获取对应的提示词
+                    'prompt': form.get(f"prompts[{result['index']}]", ''),
+                    'generation_mode': generation_mode,
+                    'frame_rate': frame_rate,
+                    'resolution': resolution,
+                    'duration': duration,
+                    'ai_audio': ai_audio,
+                    # 相同内容的图片只保存一份
+                    'image_path': image_store.put_file(result['path'], result['sha256'], move=True),
+                    'status': 0,
+                    'create_at': now,
+                    'update_at': now
+                } for result in uploads]
+                created_tasks = bulk_create(QingyingImage2VideoTask, task_rows)
+            print(f"批量创建清影图生视频任务: {len(created_tasks)}个")
 
-                # 保存上传的图片
-                filename = secure_filename(file.filename)
-                file_ext = filename.rsplit('.', 1)[1].lower()
-                unique_filename = f"{uuid.uuid4().hex}.{file_ext}"
-                file_path = os.path.join(tmp_dir, unique_filename)
-                file.save(file_path)
+            if created_tasks:
+                invalidate_task_stats(QingyingImage2VideoTask)
 
-                # 获取对应的提示词
-                prompt = request.form.get(f'prompts[{i}]', '')
-
-                # 创建任务
-                task = QingyingImage2VideoTask.create(
-                    prompt=prompt,
-                    generation_mode=generation_mode,
-                    frame_rate=frame_rate,
-                    resolution=resolution,
-                    duration=duration,
-                    ai_audio=ai_audio,
-                    image_path=file_path,
-                    status=0,
-                    create_at=datetime.now(),
-                    update_at=datetime.now()
-                )
-
-                # 提交任务到全局任务管理器
-                if hasattr(global_task_manager, 'qingying_img2video_manager'):
-                    global_task_manager.qingying_img2video_manager.submit_task(task.id)
-
-                created_tasks.append(task.id)
-                print(f"创建清影图生视频任务: {task.id}, 图片: {filename}, 提示词: {prompt}")
-
-            except Exception as e:
-                failed_files.append(f"{file.filename}: {str(e)}")
-                print(f"处理文件 {file.filename} 失败: {str(e)}")
+            # 提交任务到全局任务管理器
+            dispatch_tasks(created_tasks)
 
-        # 构建响应消息
-        message_parts = []
-        if created_tasks:
-            message_parts.append(f"成功创建 {len(created_tasks)} 个任务")
-        if failed_files:
-            message_parts.append(f"失败 {len(failed_files)} 个文件")
+            # 构建响应消息
+            message_parts = []
+            if created_tasks:
+                message_parts.append(f"成功创建 {len(created_tasks)} 个任务")
+            if failed_files:
+                message_parts.append(f"失败 {len(failed_files)} 个文件")
 
-        return jsonify({
-            'success': True,
-            'message': ', '.join(message_parts) if message_parts else '没有创建任何任务',
-            'data': {
-                'created_count': len(created_tasks),
-                'failed_count': len(failed_files),
-                'created_task_ids': created_tasks,
-                'failed_files': failed_files
-            }
-        })
+            return jsonify({
+                'success': True,
+                'message': ', '.join(message_parts) if message_parts else '没有创建任何任务',
+                'data': {
+                    'created_count': len(created_tasks),
+                    'failed_count': len(failed_files),
+                    'created_task_ids': created_tasks,
+                    'failed_files': failed_files
+                }
+            })
 
+    except RequestEntityTooLarge as e:
+        return jsonify({'success': False, 'message': f'上传内容超出限制: {e.description}'}), 413
     except Exception as e:
         print(f"批量添加任务失败: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -608,29 +568,19 @@ def batch_delete_tasks():
                 'message': '请提供要删除的任务ID列表'
             }), 400
         
-        # 删除任务
-        deleted_count = 0
-        for task_id in task_ids:
-            try:
-                task = QingyingImage2VideoTask.get_or_none(QingyingImage2VideoTask.id == task_id)
-                if task:
-                    # 删除图片文件
-                    if task.image_path and os.path.exists(task.image_path):
-                        try:
-                            os.remove(task.image_path)
-                        except Exception as e:
-                            print(f"删除图片文件失败: {e}")
-                    
-                    task.delete_instance()
-                    deleted_count += 1
-            except Exception as e:
-                print(f"删除任务 {task_id} 失败: {str(e)}")
+        # 按块删除任务，图片交给后台回收（上传目录中的旧独立图片文件直接删除）
+        deleted_count, purge_id = purge_tasks(
+            QingyingImage2VideoTask,
+            task_ids,
+            untracked_dirs=(UPLOAD_TMP_DIR,)
+        )
         
         return jsonify({
             'success': True,
             'message': f'成功删除 {deleted_count} 个任务',
             'data': {
-                'deleted_count': deleted_count
+                'deleted_count': deleted_count,
+                'purge_id': purge_id
             }
         })
         
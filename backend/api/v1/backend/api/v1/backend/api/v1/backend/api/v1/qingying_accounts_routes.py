@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 from backend.models.models import QingyingAccount, QingyingImage2VideoTask
 from backend.utils.qingying_account_login import login_and_get_cookie
+from backend.utils.account_cache import qingying_nickname_cache
 
 # 创建蓝图
 qingying_accounts_bp = Blueprint('qingying_accounts', __name__, url_prefix='/api/v1/qingying/accounts')
@@ -120,6 +121,7 @@ def _process_add_account_task():
                 phone=phone,
                 cookies=cookies
             )
+            qingying_nickname_cache.invalidate(account.id)
             
             print(f"清影账号添加成功: {nickname} ({phone})")
         else:
@@ -135,6 +137,7 @@ def delete_account(account_id):
         account = QingyingAccount.get_by_id(account_id)
         nickname = account.nickname
         account.delete_instance()
+        qingying_nickname_cache.invalidate(account_id)
         
         print(f"成功删除清影账号: {nickname}")
         return jsonify({'success': True, 'message': f'成功删除账号: {nickname}'})
@@ -150,6 +153,7 @@ def clear_all_accounts():
     """清空所有清影账号"""
     try:
         count = QingyingAccount.delete().execute()
+        qingying_nickname_cache.invalidate()
         print(f"成功清空所有清影账号，共删除 {count} 个账号")
         return jsonify({'success': True, 'message': f'成功清空所有账号，共删除 {count} 个'})
         
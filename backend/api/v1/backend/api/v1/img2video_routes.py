@@ -5,14 +5,24 @@
 
 import os
 import json
-import requests
 import asyncio
 import pandas as pd
 from datetime import datetime
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from peewee import chunked
 from backend.models.models import JimengImg2VideoTask
-import subprocess
-import platform
+from backend.utils.pagination import keyset_paginate, is_cursor_request, want_total
+from backend.utils.task_stats import get_status_counts, invalidate_task_stats
+from backend.core.task_retry import retry_tasks
+from backend.core.task_purge import purge_tasks
+from backend.core.download_jobs import download_job_manager, batch_folder_name
+from backend.utils.folder_dialog import select_folder, get_server_dir, ServerDirError
+from backend.utils.bulk_insert import bulk_create
+from backend.utils.upload_pipeline import upload_request, process_uploads
+from backend.utils.image_store import image_store, IMPORT_MODES
+from backend.utils.folder_scanner import scan_images, ScanStats
+from backend.config.settings import IMPORT_BATCH_SIZE
 import threading
 from urllib.parse import urlparse
 
@@ -34,9 +44,27 @@ def get_img2video_tasks():
         if status is not None:
             query = query.where(JimengImg2VideoTask.status == status)
         
-        # 分页
-        total = query.count()
-        tasks = query.order_by(JimengImg2VideoTask.create_at.desc()).paginate(page, page_size)
+        if is_cursor_request(request.args):
+            # 游标分页：每页开销与翻页深度无关，总数按需统计
+            cursor = request.args.get('cursor') or None
+            tasks, next_cursor = keyset_paginate(query, JimengImg2VideoTask, cursor, page_size)
+            total = query.count() if want_total(request.args, default=False) else None
+            pagination = {
+                'page_size': page_size,
+                'total': total,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        else:
+            # 页码分页
+            total = query.count() if want_total(request.args) else None
+            tasks = query.order_by(JimengImg2VideoTask.create_at.desc()).paginate(page, page_size)
+            pagination = {
+                'page': page,
+                'page_size': page_size,
+                'total': total,
+                'pages': (total + page_size - 1) // page_size if total is not None else None
+            }
         
         data = []
         for task in tasks:
@@ -57,14 +85,11 @@ def get_img2video_tasks():
         return jsonify({
             'success': True,
             'data': data,
-            'pagination': {
-                'page': page,
-                'page_size': page_size,
-                'total': total,
-                'pages': (total + page_size - 1) // page_size
-            }
+            'pagination': pagination
         })
         
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'分页参数错误: {str(e)}'}), 400
     except Exception as e:
         print(f"获取图生视频任务列表失败: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -85,24 +110,24 @@ def create_img2video_task():
                 status=0
             )
             
+            invalidate_task_stats(JimengImg2VideoTask)
             print(f"创建图生视频任务: {task.id}")
             return jsonify({'success': True, 'data': {'task_id': task.id}})
         
         # 批量任务创建
         elif 'tasks' in data:
             tasks = data['tasks']
-            created_tasks = []
             
-            for task_data in tasks:
-                task = JimengImg2VideoTask.create(
-                    prompt=task_data.get('prompt', ''),
-                    model=task_data.get('model', 'Video 3.0'),
-                    second=task_data.get('second', 5),
-                    image_path=task_data['image_path'],
-                    status=0
-                )
-                created_tasks.append(task.id)
+            # 单事务批量插入
+            created_tasks = bulk_create(JimengImg2VideoTask, [{
+                'prompt': task_data.get('prompt', ''),
+                'model': task_data.get('model', 'Video 3.0'),
+                'second': task_data.get('second', 5),
+                'image_path': task_data['image_path'],
+                'status': 0
+            } for task_data in tasks])
             
+            invalidate_task_stats(JimengImg2VideoTask)
             print(f"批量创建图生视频任务: {len(created_tasks)}个")
             return jsonify({'success': True, 'data': {'task_ids': created_tasks}})
         
@@ -119,6 +144,8 @@ def delete_img2video_task(task_id):
     try:
         task = JimengImg2VideoTask.get_by_id(task_id)
         task.delete_instance()
+        image_store.release_paths([task.image_path])
+        invalidate_task_stats(JimengImg2VideoTask)
         
         print(f"删除图生视频任务: {task_id}")
         return jsonify({'success': True, 'message': '任务删除成功'})
@@ -135,6 +162,7 @@ def retry_img2video_task(task_id):
     try:
         task = JimengImg2VideoTask.get_by_id(task_id)
         task.update_status(0)  # 重置为排队状态
+        invalidate_task_stats(JimengImg2VideoTask)
         
         print(f"重试图生视频任务: {task_id}")
         return jsonify({'success': True, 'message': '任务已重新加入队列'})
@@ -152,28 +180,10 @@ def batch_retry_img2video_tasks():
         data = request.get_json()
         task_ids = data.get('task_ids', [])
         
-        if task_ids:
-            # 如果提供了特定的任务ID列表，只重试这些任务
-            tasks = JimengImg2VideoTask.select().where(
-                JimengImg2VideoTask.id.in_(task_ids),
-                JimengImg2VideoTask.status == 3,  # 只重试失败的任务
-                JimengImg2VideoTask.is_empty_task == False  # 排除空任务
-            )
-            retry_count = 0
-            for task in tasks:
-                task.update_status(0)  # 重置为排队状态
-                retry_count += 1
-        else:
-            # 如果没有提供任务ID，重试所有失败的任务
-            tasks = JimengImg2VideoTask.select().where(
-                JimengImg2VideoTask.status == 3,  # 只重试失败的任务
-                JimengImg2VideoTask.is_empty_task == False  # 排除空任务
-            )
-            retry_count = 0
-            for task in tasks:
-                task.update_status(0)  # 重置为排队状态
-                retry_count += 1
-        
+        # 只重试失败的非空任务，没有提供任务ID时重试所有失败的任务
+        retried_ids = retry_tasks(JimengImg2VideoTask, task_ids,
+                                  conditions=[JimengImg2VideoTask.is_empty_task == False])
+        retry_count = len(retried_ids)
         print(f"批量重试图生视频任务: {retry_count}个")
         return jsonify({
             'success': True,
@@ -197,11 +207,11 @@ def batch_delete_img2video_tasks():
         if not task_ids:
             return jsonify({'success': False, 'message': '未提供任务ID'}), 400
         
-        # 删除任务
-        deleted_count = JimengImg2VideoTask.delete().where(JimengImg2VideoTask.id.in_(task_ids)).execute()
-        
+        # 按块删除任务，图片引用交给后台回收
+        deleted_count, purge_id = purge_tasks(JimengImg2VideoTask, task_ids)
         print(f"批量删除图生视频任务: {deleted_count}个")
-        return jsonify({'success': True, 'message': f'成功删除 {deleted_count} 个任务'})
+        return jsonify({'success': True, 'message': f'成功删除 {deleted_count} 个任务',
+                        'data': {'deleted_count': deleted_count, 'purge_id': purge_id}})
         
     except Exception as e:
         print(f"批量删除图生视频任务失败: {str(e)}")
@@ -215,43 +225,24 @@ def import_folder_tasks():
         data = request.get_json()
         model = data.get('model', 'Video 3.0')  # 默认为Video 3.0
         second = data.get('second', 5)  # 默认为5秒
+        import_mode = data.get('import_mode', 'reference')  # 默认直接引用原图片，见 IMPORT_MODES
+        if import_mode not in IMPORT_MODES:
+            return jsonify({'success': False, 'message': f'不支持的导入模式: {import_mode}'}), 400
         
         print(f"导入文件夹任务，模型: {model}, 时长: {second}秒")
         
+        # 服务端目录模式（传入 folder_path，必须位于 EXPORT_ROOT 内）不弹出对话框；headless=true 时必须传入 folder_path
+        try:
+            server_folder = get_server_dir(data, 'folder_path', required=True)
+        except ServerDirError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if server_folder and not os.path.isdir(server_folder):
+            return jsonify({'success': False, 'message': f'文件夹不存在: {server_folder}'}), 400
+        
         def select_folder_and_import():
             try:
-                # 调用原生文件夹选择对话框
-                folder_path = None
-                system = platform.system()
-                
-                if system == "Darwin":  # macOS
-                    result = subprocess.run([
-                        'osascript', '-e',
-                        'tell application "Finder" to set folder_path to (choose folder with prompt "选择包含图片的文件夹") as string',
-                        '-e',
-                        'return POSIX path of folder_path'
-                    ], capture_output=True, text=True, timeout=60)
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        folder_path = result.stdout.strip()
-                        
-                elif system == "Windows":  # Windows
-                    result = subprocess.run([
-                        'powershell', '-Command',
-                        'Add-Type -AssemblyName System.Windows.Forms; $folder = New-Object System.Windows.Forms.FolderBrowserDialog; $folder.Description = "选择包含图片的文件夹"; $folder.ShowNewFolderButton = $true; if ($folder.ShowDialog() -eq "OK") { $folder.SelectedPath } else { "" }'
-                    ], capture_output=True, text=True, timeout=60)
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        folder_path = result.stdout.strip()
-                        
-                elif system == "Linux":  # Linux
-                    result = subprocess.run([
-                        'zenity', '--file-selection', '--directory',
-                        '--title=选择包含图片的文件夹'
-                    ], capture_output=True, text=True, timeout=60)
-                    
-                    if result.returncode == 0 and result.stdout.strip():
-                        folder_path = result.stdout.strip()
+                # 服务端目录模式直接使用传入的目录，否则弹出原生文件夹选择对话框
+                folder_path = server_folder or select_folder("选择包含图片的文件夹")
                 
                 if not folder_path:
                     print("用户取消了文件夹选择")
@@ -259,32 +250,25 @@ def import_folder_tasks():
                 
                 print(f"选择的文件夹: {folder_path}")
                 
-                # 扫描文件夹中的图片文件
-                image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
-                image_files = []
-                
-                for filename in os.listdir(folder_path):
-                    file_ext = os.path.splitext(filename)[1].lower()
-                    if file_ext in image_extensions:
-                        image_files.append(os.path.join(folder_path, filename))
-                
-                print(f"找到 {len(image_files)} 张图片")
-                
-                # 创建任务
+                # 递归扫描文件夹（校验文件头），边扫描边分批创建任务
+                scan_stats = ScanStats()
                 created_count = 0
-                for image_path in image_files:
-                    try:
-                        task = JimengImg2VideoTask.create(
-                            prompt='',  # 文件夹导入时提示词为空
-                            model=model,  # 使用传入的模型参数
-                            second=second,  # 使用传入的时长参数
-                            image_path=image_path,
-                            status=0
-                        )
-                        created_count += 1
-                    except Exception as e:
-                        print(f"创建任务失败 {image_path}: {str(e)}")
+                for image_files in chunked(scan_images(folder_path, stats=scan_stats), IMPORT_BATCH_SIZE):
+                    # 本批图片的登记和任务创建在同一个事务中提交
+                    with image_store.atomic():
+                        image_paths = image_store.import_files(image_files, import_mode)
+                        created_tasks = bulk_create(JimengImg2VideoTask, [{
+                            'prompt': '',  # 文件夹导入时提示词为空
+                            'model': model,  # 使用传入的模型参数
+                            'second': second,  # 使用传入的时长参数
+                            'image_path': image_path,
+                            'status': 0
+                        } for image_path in image_paths])
+                    created_count += len(created_tasks)
+                    
+                    invalidate_task_stats(JimengImg2VideoTask)
                 
+                print(f"扫描结果: {scan_stats.to_dict()}")
                 print(f"成功创建 {created_count} 个图生视频任务，模型: {model}, 时长: {second}秒")
                 
             except Exception as e:
@@ -295,7 +279,7 @@ def import_folder_tasks():
         import_thread.daemon = True
         import_thread.start()
         
-        return jsonify({'success': True, 'message': '正在打开文件夹选择对话框，请选择包含图片的文件夹'})
+        return jsonify({'success': True, 'message': f'正在从 {server_folder} 导入图片' if server_folder else '正在打开文件夹选择对话框，请选择包含图片的文件夹'})
         
     except Exception as e:
         print(f"导入文件夹失败: {str(e)}")
@@ -305,92 +289,69 @@ def import_folder_tasks():
 def batch_add_tasks():
     """批量添加图生视频任务"""
     try:
-        # 检查是否有图片文件
-        if 'images' not in request.files:
-            return jsonify({
-                'success': False,
-                'message': '请选择要上传的图片'
-            }), 400
-
-        files = request.files.getlist('images')
-        if not files or all(file.filename == '' for file in files):
-            return jsonify({
-                'success': False,
-                'message': '请选择要上传的图片'
-            }), 400
-
-        # 获取配置参数
-        model = request.form.get('model', 'Video 3.0')
-        second = int(request.form.get('second', 5))
-
-        # 支持的图片格式
-        ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-        
-        def allowed_file(filename):
-            return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-        # 创建临时目录保存上传的图片
-        import uuid
-        from werkzeug.utils import secure_filename
-        
+        # 上传的图片在接收时直接写入临时目录
         tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'tmp', 'batch_upload')
-        os.makedirs(tmp_dir, exist_ok=True)
+        with upload_request(request, tmp_dir) as (form, uploaded):
+            # 检查是否有图片文件
+            files = uploaded.getlist('images')
+            if not files or all(file.filename == '' for file in files):
+                return jsonify({
+                    'success': False,
+                    'message': '请选择要上传的图片'
+                }), 400
 
-        created_tasks = []
-        failed_files = []
+            # 获取配置参数
+            model = form.get('model', 'Video 3.0')
+            second = int(form.get('second', 5))
 
-        for i, file in enumerate(files):
-            try:
-                if file.filename == '':
-                    continue
+            # 并行校验图片并计算哈希
+            uploads = []
+            failed_files = []
 
-                if not allowed_file(file.filename):
-                    failed_files.append(f"{file.filename}: 不支持的文件格式")
+            for result in process_uploads(files, tmp_dir):
+                if result['error']:
+                    failed_files.append(f"{result['filename']}: {result['error']}")
+                    print(f"处理文件 {result['filename']} 失败: {result['error']}")
                     continue
+                uploads.append(result)
 
-                # 保存上传的图片
-                filename = secure_filename(file.filename)
-                file_ext = filename.rsplit('.', 1)[1].lower()
-                unique_filename = f"{uuid.uuid4().hex}.{file_ext}"
-                file_path = os.path.join(tmp_dir, unique_filename)
-                file.save(file_path)
-
-                # 获取对应的提示词
-                prompt = request.form.get(f'prompts[{i}]', '')
-
-                # 创建任务
-                task = JimengImg2VideoTask.create(
-                    prompt=prompt,
-                    model=model,
-                    second=second,
-                    image_path=file_path,
-                    status=0
-                )
-                created_tasks.append(task.id)
-                print(f"创建图生视频任务: {task.id}, 图片: {filename}, 提示词: {prompt}")
+            # 图片放入存储和批量创建任务在同一个事务中提交
+            with image_store.atomic():
+                task_rows = [{
+                    # 获取对应的提示词
+                    'prompt': form.get(f"prompts[{result['index']}]", ''),
+                    'model': model,
+                    'second': second,
+                    # 相同内容的图片只保存一份
+                    'image_path': image_store.put_file(result['path'], result['sha256'], move=True),
+                    'status': 0
+                } for result in uploads]
+                created_tasks = bulk_create(JimengImg2VideoTask, task_rows)
+            print(f"批量创建图生视频任务: {len(created_tasks)}个")
 
-            except Exception as e:
-                failed_files.append(f"{file.filename}: {str(e)}")
-                print(f"处理文件 {file.filename} 失败: {str(e)}")
+            if created_tasks:
+                invalidate_task_stats(JimengImg2VideoTask)
 
-        # 构建响应消息
-        message_parts = []
-        if created_tasks:
-            message_parts.append(f"成功创建 {len(created_tasks)} 个任务")
-        if failed_files:
-            message_parts.append(f"失败 {len(failed_files)} 个文件")
+            # 构建响应消息
+            message_parts = []
+            if created_tasks:
+                message_parts.append(f"成功创建 {len(created_tasks)} 个任务")
+            if failed_files:
+                message_parts.append(f"失败 {len(failed_files)} 个文件")
 
-        return jsonify({
-            'success': True,
-            'message': ', '.join(message_parts) if message_parts else '没有创建任何任务',
-            'data': {
-                'created_count': len(created_tasks),
-                'failed_count': len(failed_files),
-                'created_task_ids': created_tasks,
-                'failed_files': failed_files
-            }
-        })
+            return jsonify({
+                'success': True,
+                'message': ', '.join(message_parts) if message_parts else '没有创建任何任务',
+                'data': {
+                    'created_count': len(created_tasks),
+                    'failed_count': len(failed_files),
+                    'created_task_ids': created_tasks,
+                    'failed_files': failed_files
+                }
+            })
 
+    except RequestEntityTooLarge as e:
+        return jsonify({'success': False, 'message': f'上传内容超出限制: {e.description}'}), 413
     except Exception as e:
         print(f"批量添加任务失败: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -436,130 +397,37 @@ def batch_download_videos():
                 'message': '选中的任务没有视频可下载'
             }), 400
         
-        # 在后台线程中选择文件夹并下载
-        def download_in_background():
-            try:
-                # 使用系统原生对话框选择文件夹
-                download_dir = None
-                system = platform.system()
-                
-                if system == "Darwin":  # macOS
-                    try:
-                        print("正在调用macOS文件选择器...")
-                        # 使用osascript调用macOS原生文件选择器
-                        applescript = '''
-                        tell application "Finder"
-                            activate
-                            set selectedFolder to choose folder with prompt "选择视频下载文件夹" default location (path to downloads folder)
-                            return POSIX path of selectedFolder
-                        end tell
-                        '''
-                        result = subprocess.run([
-                            'osascript', '-e', applescript
-                        ], capture_output=True, text=True, timeout=60)
-                        
-                        print(f"文件选择器返回码: {result.returncode}")
-                        print(f"文件选择器输出: {result.stdout}")
-                        print(f"文件选择器错误: {result.stderr}")
-                        
-                        if result.returncode == 0 and result.stdout.strip():
-                            download_dir = result.stdout.strip()
-                            print(f"用户选择了文件夹: {download_dir}")
-                        elif result.returncode == 1:
-                            print("用户取消了文件夹选择")
-                            return
-                        else:
-                            print(f"文件选择器异常退出，返回码: {result.returncode}")
-                    except subprocess.TimeoutExpired:
-                        print("文件选择器超时，用户可能没有响应")
-                        return
-                    except Exception as e:
-                        print(f"macOS文件选择器失败: {str(e)}")
-                        
-                elif system == "Windows":  # Windows
-                    try:
-                        # 使用PowerShell调用Windows文件选择器
-                        ps_script = """
-                        Add-Type -AssemblyName System.Windows.Forms
-                        $folderBrowser = New-Object System.Windows.Forms.FolderBrowserDialog
-                        $folderBrowser.Description = "选择视频下载文件夹"
-                        $folderBrowser.SelectedPath = [Environment]::GetFolderPath("MyDocuments")
-                        $result = $folderBrowser.ShowDialog()
-                        if ($result -eq [System.Windows.Forms.DialogResult]::OK) {
-                            Write-Output $folderBrowser.SelectedPath
-                        }
-                        """
-                        result = subprocess.run(['powershell', '-Command', ps_script], 
-                                              capture_output=True, text=True, timeout=30)
-                        if result.returncode == 0 and result.stdout.strip():
-                            download_dir = result.stdout.strip()
-                    except Exception as e:
-                        print(f"Windows文件选择器失败: {str(e)}")
-                        
-                else:  # Linux
-                    try:
-                        # 尝试使用zenity
-                        result = subprocess.run([
-                            'zenity', '--file-selection', '--directory', 
-                            '--title=选择视频下载文件夹'
-                        ], capture_output=True, text=True, timeout=30)
-                        
-                        if result.returncode == 0:
-                            download_dir = result.stdout.strip()
-                    except Exception as e:
-                        print(f"Linux文件选择器失败: {str(e)}")
-                
-                # 如果原生对话框失败，使用默认下载目录
-                if not download_dir:
-                    download_dir = os.path.expanduser("~/Downloads")
-                    print(f"文件选择器失败，使用默认下载目录: {download_dir}")
-                
-                # 确保目录存在
-                if not os.path.exists(download_dir):
-                    os.makedirs(download_dir, exist_ok=True)
-                
-                print(f"开始下载 {len(all_videos)} 个视频到: {download_dir}")
-                
-                # 创建以当前时间命名的子文件夹
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                batch_folder = os.path.join(download_dir, f"jimeng_videos_{timestamp}")
-                os.makedirs(batch_folder, exist_ok=True)
-                
-                success_count = 0
-                error_count = 0
-                
-                # 下载每个视频
-                for video_info in all_videos:
-                    try:
-                        response = requests.get(video_info['url'], timeout=60)
-                        response.raise_for_status()
-                        
-                        file_path = os.path.join(batch_folder, video_info['filename'])
-                        with open(file_path, 'wb') as f:
-                            f.write(response.content)
-                        
-                        success_count += 1
-                        print(f"下载成功: {video_info['filename']}")
-                        
-                    except Exception as e:
-                        error_count += 1
-                        print(f"下载失败 {video_info['filename']}: {str(e)}")
-                
-                print(f"批量下载完成: 成功 {success_count} 个，失败 {error_count} 个")
-                print(f"文件保存位置: {batch_folder}")
-                
-            except Exception as e:
-                print(f"批量下载过程出错: {str(e)}")
+        # 服务端目录模式（传入 output_dir 或 headless=true）不弹出对话框
+        try:
+            output_dir = get_server_dir(data)
+        except ServerDirError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        # 在后台线程中选择文件夹，返回本批次的保存目录（用户取消时返回 None）
+        def choose_batch_folder(job):
+            download_dir = output_dir or select_folder("选择视频下载文件夹", fallback_dir=os.path.expanduser("~/Downloads"))
+            if not download_dir:
+                return None
+            
+            # 确保目录存在
+            os.makedirs(download_dir, exist_ok=True)
+            
+            print(f"开始下载 {len(all_videos)} 个视频到: {download_dir}")
+            
+            # 每个下载任务使用固定的子文件夹（任务创建时间 + 任务ID），继续下载时复用
+            batch_folder = os.path.join(download_dir, batch_folder_name("jimeng_videos", job))
+            os.makedirs(batch_folder, exist_ok=True)
+            
+            return batch_folder
         
-        # 在后台线程中执行下载
-        download_thread = threading.Thread(target=download_in_background)
-        download_thread.daemon = True
-        download_thread.start()
+        # 创建下载任务，在后台线程中选择文件夹并并发下载
+        job = download_job_manager.start_job('img2video', all_videos, choose_batch_folder)
         
         return jsonify({
             'success': True,
-            'message': f'开始下载 {len(all_videos)} 个视频，请选择下载文件夹',
+            'message': f'开始下载 {len(all_videos)} 个视频到 {output_dir}' if output_dir else f'开始下载 {len(all_videos)} 个视频，请选择下载文件夹',
             'data': {
+                'job_id': job.id,
                 'total_videos': len(all_videos),
                 'tasks_count': len(tasks)
             }
@@ -576,13 +444,13 @@ def batch_download_videos():
 def get_img2video_stats():
     """获取图生视频统计信息"""
     try:
-        # 统计时过滤掉空任务
-        base_query = JimengImg2VideoTask.select().where(JimengImg2VideoTask.is_empty_task == False)
-        total_tasks = base_query.count()
-        pending_tasks = base_query.where(JimengImg2VideoTask.status == 0).count()
-        processing_tasks = base_query.where(JimengImg2VideoTask.status == 1).count()
-        completed_tasks = base_query.where(JimengImg2VideoTask.status == 2).count()
-        failed_tasks = base_query.where(JimengImg2VideoTask.status == 3).count()
+        # 统计时过滤掉空任务，一次分组查询得到所有状态的数量
+        stats = get_status_counts(JimengImg2VideoTask, JimengImg2VideoTask.is_empty_task == False)
+        total_tasks = stats['total']
+        pending_tasks = stats['queued']
+        processing_tasks = stats['processing']
+        completed_tasks = stats['completed']
+        failed_tasks = stats['failed']
         
         return jsonify({
             'success': True,
@@ -624,17 +492,14 @@ def delete_tasks_before_today():
                 'data': {'deleted_count': 0}
             })
         
-        # 删除任务
-        deleted_count = JimengImg2VideoTask.delete().where(
-            JimengImg2VideoTask.create_at < today_start
-        ).execute()
-        
+        # 按块删除任务，图片引用交给后台回收
+        deleted_count, purge_id = purge_tasks(JimengImg2VideoTask, conditions=[JimengImg2VideoTask.create_at < today_start])
         print(f"删除了 {deleted_count} 个今日前的图生视频任务")
         
         return jsonify({
             'success': True,
             'message': f'成功删除 {deleted_count} 个今日前的任务',
-            'data': {'deleted_count': deleted_count}
+            'data': {'deleted_count': deleted_count, 'purge_id': purge_id}
         })
         
     except Exception as e:
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
+import queue
 from flask import Blueprint, request, jsonify
 from datetime import datetime, date
 from backend.models.models import JimengAccount, JimengText2ImgTask, JimengImg2VideoTask
 from backend.utils.jimeng_account_login import login_and_get_cookie
 from backend.utils.jimeng_login_window import login_and_wait
 from backend.core.global_task_manager import global_task_manager
+from backend.core.bounded_task_queue import account_task_queue
+from backend.utils.account_usage import DAILY_LIMITS, get_today_usage_by_account, get_total_usage_by_account, empty_usage
 import asyncio
 
 # 创建蓝图
@@ -16,27 +19,12 @@ def get_accounts():
     try:
         accounts = JimengAccount.select()
         data = []
-        today = date.today()
+        
+        # 每张任务表只执行一次分组查询，统计所有账号的今日使用次数
+        today_usage = get_today_usage_by_account()
         
         for account in accounts:
-            # 计算今日文生图使用次数
-            text2img_usage = JimengText2ImgTask.select().where(
-                (JimengText2ImgTask.account_id == account.id) &
-                (JimengText2ImgTask.create_at >= today)
-            ).count()
-            
-            # 计算今日图生视频使用次数
-            img2video_usage = JimengImg2VideoTask.select().where(
-                (JimengImg2VideoTask.account_id == account.id) &
-                (JimengImg2VideoTask.create_at >= today)
-            ).count()
-            
-            # 计算今日数字人使用次数
-            from backend.models.models import JimengDigitalHumanTask
-            digital_human_usage = JimengDigitalHumanTask.select().where(
-                (JimengDigitalHumanTask.account_id == account.id) &
-                (JimengDigitalHumanTask.create_at >= today)
-            ).count()
+            usage = today_usage.get(account.id) or empty_usage()
             
             data.append({
                 'id': account.id,
@@ -45,16 +33,8 @@ def get_accounts():
                 'has_cookies': bool(account.cookies),  # 添加布尔值表示是否有Cookie
                 'created_at': account.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                 'updated_at': account.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'today_usage': {
-                    'text2img': text2img_usage,
-                    'img2video': img2video_usage,
-                    'digital_human': digital_human_usage
-                },
-                'daily_limits': {
-                    'text2img': 10,
-                    'img2video': 2,  # 更新为2个视频任务
-                    'digital_human': 1
-                }
+                'today_usage': usage,
+                'daily_limits': dict(DAILY_LIMITS)
             })
         
         print("成功获取账号列表，总数: {}".format(len(data)))
@@ -175,41 +155,32 @@ def clear_all_accounts():
 def get_account_usage_stats():
     """获取账号使用情况统计"""
     try:
-        from datetime import date
-        
-        today = date.today()
         accounts = list(JimengAccount.select())
         
+        # 读取触发器维护的使用量计数表，不扫描任务表
+        today_usage = get_today_usage_by_account()
+        total_usage = get_total_usage_by_account()
+        
         stats = []
         for account in accounts:
-            # 统计今日文生图使用次数 - 不过滤空任务
-            today_text2img = JimengText2ImgTask.select().where(
-                (JimengText2ImgTask.account_id == account.id) &
-                (JimengText2ImgTask.create_at >= today)
-            ).count()
+            today_counts = today_usage.get(account.id) or empty_usage()
+            total_counts = total_usage.get(account.id) or empty_usage()
             
-            # 统计今日图生视频使用次数 - 不过滤空任务
-            today_img2video = JimengImg2VideoTask.select().where(
-                (JimengImg2VideoTask.account_id == account.id) &
-                (JimengImg2VideoTask.create_at >= today)
-            ).count()
+            # 今日使用次数 - 不过滤空任务
+            today_text2img = today_counts['text2img']
+            today_img2video = today_counts['img2video']
             
             # 数字人暂时设为0
             today_digital_human = 0
             
-            # 统计总使用次数
-            total_text2img = JimengText2ImgTask.select().where(
-                (JimengText2ImgTask.account_id == account.id)
-            ).count()
-            
-            total_img2video = JimengImg2VideoTask.select().where(
-                (JimengImg2VideoTask.account_id == account.id)
-            ).count()
+            # 总使用次数
+            total_text2img = total_counts['text2img']
+            total_img2video = total_counts['img2video']
             
             # 设置每日限额
-            text2img_limit = 10
-            img2video_limit = 2  # 更新为2个视频任务
-            digital_human_limit = 1
+            text2img_limit = DAILY_LIMITS['text2img']
+            img2video_limit = DAILY_LIMITS['img2video']
+            digital_human_limit = DAILY_LIMITS['digital_human']
             
             # 判断账号状态 - 任何一种类型达到限制就视为已满
             is_available = (today_text2img < text2img_limit) and (today_img2video < img2video_limit) and (today_digital_human < digital_human_limit)
@@ -380,22 +351,16 @@ def batch_get_account_cookie():
                 'message': '未找到指定的账号'
             }), 404
         
-        # 提交任务到全局线程池
-        for account in accounts:
-            global_task_manager.submit_task(
-                platform_name="即梦账号",
-                task_callable=_process_cookie_task,
-                task_id=account.id,  # 传递task_id参数
-                account_id=account.id,  # 传递account_id参数
-                account_email=account.account,  # 传递account_email参数
-                task_type="获取Cookie",
-                prompt=f"获取账号 {account.account} 的Cookie"
-            )
-        
-        print(f"批量获取Cookie任务已提交，账号数量: {len(accounts)}")
+        # 整批放入有界队列（不阻塞），有空闲工作线程时提交到全局线程池；已在排队或执行的账号跳过
+        queued_count = _queue_cookie_tasks(accounts)
+        if queued_count is None:
+            return _queue_full_response()
+        
+        print(f"批量获取Cookie任务已提交，账号数量: {queued_count}，跳过已在队列中的账号: {len(accounts) - queued_count}")
         return jsonify({
             'success': True,
-            'message': f'正在获取 {len(accounts)} 个账号的Cookie，请稍候...'
+            'message': f'正在获取 {queued_count} 个账号的Cookie，请稍候...',
+            'data': {'queued_count': queued_count, 'skipped_count': len(accounts) - queued_count}
         })
         
     except Exception as e:
@@ -418,50 +383,16 @@ def update_all_cookies():
                 'message': '没有找到任何账号'
             }), 404
         
-        # 启动批量更新Cookie的后台任务
-        import threading
+        # 整批放入有界队列（不阻塞），有空闲工作线程时提交到全局线程池；已在排队或执行的账号跳过
+        queued_count = _queue_cookie_tasks(accounts)
+        if queued_count is None:
+            return _queue_full_response()
         
-        def batch_update_cookies():
-            """批量更新Cookie的后台任务"""
-            import time
-            
-            for account in accounts:
-                # 检查线程池是否有空位
-                while True:
-                    active_threads = len(global_task_manager.active_tasks)
-                    max_threads = global_task_manager.max_threads
-                    
-                    if active_threads < max_threads:
-                        # 有空位，提交任务
-                        global_task_manager.submit_task(
-                            platform_name="即梦账号",
-                            task_callable=_process_cookie_task,
-                            task_id=account.id,
-                            account_id=account.id,
-                            account_email=account.account,
-                            task_type="获取Cookie",
-                            prompt=f"获取账号 {account.account} 的Cookie"
-                        )
-                        print(f"已提交账号 {account.account} 的Cookie获取任务")
-                        break
-                    else:
-                        # 线程池满了，等待一会再检查
-                        print(f"线程池已满，等待空位提交账号 {account.account} 的任务...")
-                        time.sleep(2)
-                
-                # 稍微延迟一下，避免过快提交
-                time.sleep(0.5)
-            
-            print(f"所有账号Cookie更新任务已成功提交完成，共 {len(accounts)} 个账号")
-        
-        # 启动后台线程
-        update_thread = threading.Thread(target=batch_update_cookies, daemon=True)
-        update_thread.start()
-        
-        print(f"开始批量更新所有账号Cookie，账号数量: {len(accounts)}")
+        print(f"开始批量更新所有账号Cookie，账号数量: {queued_count}，跳过已在队列中的账号: {len(accounts) - queued_count}")
         return jsonify({
             'success': True,
-            'message': f'正在批量更新 {len(accounts)} 个账号的Cookie，任务将智能调度到线程池中...'
+            'message': f'正在批量更新 {queued_count} 个账号的Cookie，任务已进入队列，将在线程池有空闲时立即执行...',
+            'data': {'queued_count': queued_count, 'skipped_count': len(accounts) - queued_count}
         })
         
     except Exception as e:
@@ -486,50 +417,16 @@ def get_uncookied_accounts_cookie():
                 'message': '没有找到未设置Cookie的账号'
             }), 404
         
-        # 启动批量获取Cookie的后台任务
-        import threading
+        # 整批放入有界队列（不阻塞），有空闲工作线程时提交到全局线程池；已在排队或执行的账号跳过
+        queued_count = _queue_cookie_tasks(uncookied_accounts)
+        if queued_count is None:
+            return _queue_full_response()
         
-        def batch_get_uncookied_accounts():
-            """批量获取未设置Cookie账号的后台任务"""
-            import time
-            
-            for account in uncookied_accounts:
-                # 检查线程池是否有空位
-                while True:
-                    active_threads = len(global_task_manager.active_tasks)
-                    max_threads = global_task_manager.max_threads
-                    
-                    if active_threads < max_threads:
-                        # 有空位，提交任务
-                        global_task_manager.submit_task(
-                            platform_name="即梦账号",
-                            task_callable=_process_cookie_task,
-                            task_id=account.id,
-                            account_id=account.id,
-                            account_email=account.account,
-                            task_type="获取Cookie",
-                            prompt=f"获取账号 {account.account} 的Cookie"
-                        )
-                        print(f"已提交未设置Cookie账号 {account.account} 的获取任务")
-                        break
-                    else:
-                        # 线程池满了，等待一会再检查
-                        print(f"线程池已满，等待空位提交账号 {account.account} 的任务...")
-                        time.sleep(2)
-                
-                # 稍微延迟一下，避免过快提交
-                time.sleep(0.5)
-            
-            print(f"所有未设置Cookie账号的获取任务已成功提交完成，共 {len(uncookied_accounts)} 个账号")
-        
-        # 启动后台线程
-        update_thread = threading.Thread(target=batch_get_uncookied_accounts, daemon=True)
-        update_thread.start()
-        
-        print(f"开始批量获取未设置Cookie账号的Cookie，账号数量: {len(uncookied_accounts)}")
+        print(f"开始批量获取未设置Cookie账号的Cookie，账号数量: {queued_count}，跳过已在队列中的账号: {len(uncookied_accounts) - queued_count}")
         return jsonify({
             'success': True,
-            'message': f'正在获取 {len(uncookied_accounts)} 个未设置Cookie账号的Cookie，任务将智能调度到线程池中...'
+            'message': f'正在获取 {queued_count} 个未设置Cookie账号的Cookie，任务已进入队列，将在线程池有空闲时立即执行...',
+            'data': {'queued_count': queued_count, 'skipped_count': len(uncookied_accounts) - queued_count}
         })
         
     except Exception as e:
@@ -539,6 +436,32 @@ def get_uncookied_accounts_cookie():
             'message': f'获取未设置Cookie账号失败: {str(e)}'
         }), 500
 
+def _queue_cookie_tasks(accounts):
+    """把账号的获取Cookie任务整批放入提交队列，队列已满时返回 None"""
+    try:
+        return account_task_queue.submit_many(_cookie_task_kwargs(account) for account in accounts)
+    except queue.Full as e:
+        print(f"提交队列已满: {str(e)}")
+        return None
+
+def _queue_full_response():
+    return jsonify({
+        'success': False,
+        'message': '任务提交队列已满，请稍后再试'
+    }), 429
+
+def _cookie_task_kwargs(account):
+    """构造获取Cookie任务的提交参数"""
+    return {
+        'platform_name': "即梦账号",
+        'task_callable': _process_cookie_task,
+        'task_id': account.id,
+        'account_id': account.id,
+        'account_email': account.account,
+        'task_type': "获取Cookie",
+        'prompt': f"获取账号 {account.account} 的Cookie"
+    }
+
 def _process_login_task(account_id, account_email, account_password):
     """处理登录任务（使用jimeng_login_window）"""
     try:
@@ -12,9 +12,56 @@ DATABASE_PATH = os.path.join(DATABASE_DIR, 'shukeai_tools.db')
 # Cookies目录
 COOKIES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cookies')
 
+# 内容寻址图片存储目录（上传和导入的图片按 SHA-256 去重保存）
+IMAGE_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'image_store')
+IMPORT_LINK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'imported')  # 文件夹导入时硬链接的目标目录
+PROMPT_THUMBNAIL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'prompt_thumbnails')  # 提示词预览缩略图目录（按原图 SHA-256 保存）
+
 # 任务处理配置
 TASK_PROCESSOR_INTERVAL = 5  # 任务检查间隔（秒）
 TASK_PROCESSOR_ERROR_WAIT = 10  # 错误后等待时间（秒）
+TASK_SUBMIT_QUEUE_SIZE = 10000  # 批量任务提交队列容量，放不下整批任务时接口返回 429
+TASK_SUBMIT_POLL_INTERVAL = 1  # 线程池满时复查空闲工作线程的间隔（秒），本队列任务结束时立即唤醒
+
+# 统计接口缓存配置
+STATS_CACHE_TTL = 3  # 任务状态统计缓存时间（秒）
 
 # Playwright配置
 PLAYWRIGHT_HEADLESS = True  # 是否无头模式运行
+
+# 批量下载配置
+DOWNLOAD_MAX_WORKERS = 8  # 批量下载并发数（同时也是HTTP连接池大小）
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 流式写入磁盘的分块大小（字节）
+DOWNLOAD_MAX_RETRIES = 3  # 单个文件下载失败后的重试次数
+DOWNLOAD_RETRY_BACKOFF = 1.0  # 重试退避基数（秒），每次重试翻倍
+DOWNLOAD_TIMEOUT = (10, 60)  # 连接超时和读取超时（秒）
+DOWNLOAD_PROGRESS_SAVE_INTERVAL = 1  # 下载任务进度写回数据库的最小间隔（秒）
+DOWNLOAD_RATE_WINDOW = 5  # 计算当前下载速率的滑动窗口（秒）
+
+# 文件夹选择配置
+FOLDER_DIALOG_ENABLED = os.environ.get('SHUKEAI_FOLDER_DIALOG', '1') != '0'  # 是否弹出系统原生文件夹对话框，无图形界面的服务器设为0
+FOLDER_DIALOG_TIMEOUT = 60  # 文件夹对话框等待时间（秒）
+EXPORT_ROOT = os.environ.get('SHUKEAI_EXPORT_ROOT') or os.path.expanduser('~/Downloads')  # 服务端目录模式的根目录，接口传入的相对路径基于此目录
+
+# 批量上传配置
+UPLOAD_WORKERS = 4  # 上传文件校验、计算哈希的并行线程数
+UPLOAD_HASH_CHUNK_SIZE = 1024 * 1024  # 计算文件哈希时的读取块大小（字节）
+
+# 文件夹导入配置
+SCAN_WORKERS = 8  # 递归扫描文件夹的并行线程数
+IMPORT_BATCH_SIZE = 500  # 边扫描边创建任务，每批创建的任务数
+
+# 任务清理配置
+PURGE_CHUNK_SIZE = 500  # 批量删除任务时每条 DELETE 语句删除的行数
+RETRY_CHUNK_SIZE = 500  # 批量重试时每条 UPDATE 语句的任务ID数（低于 SQLite 的 999 个参数上限）
+RECLAIM_BATCH_SIZE = 200  # 后台文件回收每批释放/删除的文件数
+RECLAIM_HISTORY_SIZE = 100  # 保留最近多少次清理的回收统计（按 purge_id 查询释放的字节数）
+
+# 提示词库配置
+PROMPT_THUMBNAIL_SIZE = (400, 300)  # 预览缩略图最大尺寸
+PROMPT_THUMBNAIL_QUALITY = 85  # 预览缩略图JPEG质量
+PROMPT_THUMBNAIL_MAX_AGE = 365 * 24 * 3600  # 预览图浏览器缓存时间（秒），文件名即内容哈希，内容不会变化
+PROMPT_THUMBNAIL_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # 首次加载时生成缩略图的进程数
+PROMPT_THUMBNAIL_MAX_PENDING = 32  # 同时提交到进程池的图片数上限（限制排队图片占用的内存）
+PROMPT_THUMBNAIL_PYTHON = None  # 缩略图工作进程使用的Python解释器（嵌入式或打包运行时指定，None 使用 sys.executable）
+PROMPT_SEARCH_CACHE_SIZE = 128  # 缓存最近多少个查询的排序结果（翻页时不重新打分）
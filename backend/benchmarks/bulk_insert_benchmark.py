@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+批量插入基准测试
+
+在临时 SQLite 数据库文件中分别用逐行 Model.create() 和 bulk_create() 导入任务，
+输出每秒插入行数。表结构与图生视频任务表的常用字段一致。
+
+用法:
+    python -m backend.benchmarks.bulk_insert_benchmark [行数，默认10000]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime
+from peewee import SqliteDatabase, Model, CharField, TextField, IntegerField, DateTimeField
+from backend.utils.bulk_insert import bulk_create
+
+database = SqliteDatabase(None)
+
+class BenchmarkTask(Model):
+    prompt = TextField(default='')
+    model = CharField(default='Video 3.0')
+    second = IntegerField(default=5)
+    image_path = CharField(max_length=1024)
+    status = IntegerField(default=0)
+    account_id = IntegerField(null=True)
+    video_url = CharField(max_length=1024, null=True)
+    create_at = DateTimeField(default=datetime.now)
+    update_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = database
+        table_name = 'benchmark_img2video_task'
+
+def make_rows(count):
+    return [{'prompt': f'提示词 {i}', 'image_path': f'/tmp/images/{i:06d}.png', 'status': 0} for i in range(count)]
+
+def run_create(rows):
+    """逐行 create()，每行一个事务"""
+    return [BenchmarkTask.create(**row).id for row in rows]
+
+def run_bulk_create(rows):
+    """单事务分块 insert_many"""
+    return bulk_create(BenchmarkTask, rows)
+
+def benchmark(name, func, rows):
+    BenchmarkTask.delete().execute()
+    start = time.perf_counter()
+    ids = func(rows)
+    elapsed = time.perf_counter() - start
+    assert len(ids) == len(rows) == BenchmarkTask.select().count()
+    stored = dict(BenchmarkTask.select(BenchmarkTask.id, BenchmarkTask.image_path).tuples())
+    assert all(stored[task_id] == row['image_path'] for task_id, row in zip(ids, rows)), 'ID与行不对应'
+    print(f"{name:<14} {len(rows):>7} 行  {elapsed:8.3f} 秒  {len(rows) / elapsed:12.0f} 行/秒")
+    return elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 与应用数据库一样使用文件数据库（默认 journal 模式），包含每次提交的 fsync 开销
+        database.init(os.path.join(tmp_dir, 'benchmark.db'))
+        database.connect()
+        database.create_tables([BenchmarkTask])
+        rows = make_rows(count)
+        print(f"SQLite {database.server_version}, RETURNING: {database.returning_clause}")
+        create_time = benchmark('create()', run_create, rows)
+        bulk_time = benchmark('bulk_create()', run_bulk_create, rows)
+        print(f"加速比: {create_time / bulk_time:.1f}x")
+        database.close()
+
+if __name__ == '__main__':
+    main()
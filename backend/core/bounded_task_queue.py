@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+有界任务提交队列
+
+批量任务（如批量获取账号Cookie）一次性放入有界队列，由后台分发线程在
+全局线程池有空闲工作线程时提交，提交接口不会阻塞请求线程：
+队列放不下整批任务时 submit_many() 直接抛出 queue.Full，由接口返回 429。
+
+空闲判断使用全局任务管理器真实的活动任务数（len(active_tasks) < max_threads），
+其他直接调用 global_task_manager 的任务同样计入；已提交但还没开始执行的任务也算占用，
+避免在活动任务数更新之前连续提交。分发线程在本队列的任务结束时被唤醒，
+其他来源的任务结束时按 TASK_SUBMIT_POLL_INTERVAL 定时复查。
+
+同一个任务键（默认是 task_id，即账号ID）在排队或执行期间重复提交会被跳过。
+"""
+
+import queue
+import functools
+import threading
+from collections import deque
+from backend.core.global_task_manager import global_task_manager
+from backend.config.settings import TASK_SUBMIT_QUEUE_SIZE, TASK_SUBMIT_POLL_INTERVAL
+
+class BoundedTaskQueue:
+    """位于 global_task_manager 之前的有界提交队列"""
+
+    def __init__(self, task_manager, maxsize=TASK_SUBMIT_QUEUE_SIZE, poll_interval=TASK_SUBMIT_POLL_INTERVAL):
+        self.task_manager = task_manager
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+        self._queue = deque()
+        self._keys = set()  # 排队中和执行中的任务键
+        self._starting = 0  # 已提交到线程池但还没开始执行的任务数
+        self._running = 0
+        self._submitted = 0
+        self._failed = 0
+        self._skipped = 0
+        self._cond = threading.Condition()
+        self._dispatcher = None
+
+    @property
+    def max_running(self):
+        """全局线程池的工作线程数"""
+        return self.task_manager.max_threads
+
+    def _active_count(self):
+        """全局任务管理器中正在执行的任务数"""
+        return len(getattr(self.task_manager, 'active_tasks', ()))
+
+    def _has_free_worker(self):
+        return self._active_count() + self._starting < self.max_running
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='bounded-task-queue', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, **task_kwargs):
+        """放入一个任务，参数与 global_task_manager.submit_task 相同，返回是否放入（重复任务返回 False）"""
+        return self.submit_many([task_kwargs]) == 1
+
+    def submit_many(self, tasks, key='task_id'):
+        """整批放入任务（不阻塞），返回放入的数量
+
+        task_kwargs[key] 相同的任务（批内重复或已在排队/执行）会被跳过；
+        队列剩余容量放不下整批任务时一个都不放入，抛出 queue.Full。
+        """
+        tasks = list(tasks)
+        with self._cond:
+            batch = []
+            batch_keys = set()
+            for task_kwargs in tasks:
+                task_key = task_kwargs.get(key)
+                if task_key is not None:
+                    if task_key in self._keys or task_key in batch_keys:
+                        continue
+                    batch_keys.add(task_key)
+                batch.append((task_key, task_kwargs))
+
+            if len(self._queue) + len(batch) > self.maxsize:
+                raise queue.Full(f'提交队列已满（{len(self._queue)}/{self.maxsize}），无法放入 {len(batch)} 个任务')
+
+            self._skipped += len(tasks) - len(batch)
+            self._keys.update(batch_keys)
+            self._queue.extend(batch)
+            self._ensure_dispatcher()
+            self._cond.notify_all()
+            return len(batch)
+
+    def _dispatch_loop(self):
+        """等待全局线程池有空闲工作线程后，把队列中的任务逐个提交"""
+        while True:
+            with self._cond:
+                while not self._queue or not self._has_free_worker():
+                    # 队列为空时等待新任务；线程池满时定时复查其他来源任务的结束
+                    self._cond.wait(None if not self._queue else self.poll_interval)
+                task_key, task_kwargs = self._queue.popleft()
+                self._starting += 1
+
+            finish = self._finisher(task_key)
+            try:
+                task_kwargs = dict(task_kwargs, task_callable=self._wrap(task_kwargs['task_callable'], finish))
+                future = self.task_manager.submit_task(**task_kwargs)
+                if hasattr(future, 'add_done_callback'):
+                    # 任务被拒绝、取消或从未执行时 Future 同样会完成，名额和任务键不会泄漏
+                    future.add_done_callback(lambda _: finish())
+                with self._cond:
+                    self._submitted += 1
+            except Exception as e:
+                finish()
+                with self._cond:
+                    self._failed += 1
+                print(f"有界队列提交任务失败: {str(e)}")
+
+    def _finisher(self, task_key):
+        """返回只生效一次的结束回调：释放“待开始”名额和任务键并唤醒分发线程"""
+        state = {'started': False, 'finished': False}
+
+        def start():
+            with self._cond:
+                if state['started'] or state['finished']:
+                    return
+                state['started'] = True
+                self._starting -= 1
+                self._running += 1
+
+        def finish():
+            with self._cond:
+                if state['finished']:
+                    return
+                state['finished'] = True
+                if state['started']:
+                    self._running -= 1
+                else:
+                    self._starting -= 1
+                self._keys.discard(task_key)
+                self._cond.notify_all()
+
+        finish.start = start
+        return finish
+
+    def _wrap(self, task_callable, finish):
+        """任务开始时计入运行数，结束（无论成功失败）后释放（提交没有返回 Future 时的兜底）"""
+        @functools.wraps(task_callable)
+        def run(*args, **kwargs):
+            finish.start()
+            try:
+                return task_callable(*args, **kwargs)
+            finally:
+                finish()
+        return run
+
+    def get_status(self):
+        """获取队列状态"""
+        with self._cond:
+            return {
+                'queue_depth': len(self._queue),
+                'queue_capacity': self.maxsize,
+                'starting': self._starting,
+                'running': self._running,
+                'active_tasks': self._active_count(),
+                'max_running': self.max_running,
+                'submitted': self._submitted,
+                'failed': self._failed,
+                'skipped_duplicates': self._skipped
+            }
+
+# 账号类批量任务（Cookie获取等）的提交队列
+account_task_queue = BoundedTaskQueue(global_task_manager)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+批量下载任务管理
+
+每次批量下载创建一条 DownloadJob 记录并返回任务ID，下载在后台线程中执行，
+进度（字节数、完成/失败文件数、失败明细、速率）定期写回数据库。
+进行中的任务直接读取内存中的实时进度；服务重启后遗留的未完成任务显示为 interrupted。
+
+    job = download_job_manager.start_job('text2img', items, resolve_target_dir)
+
+resolve_target_dir(job) 在后台线程中调用，返回保存目录，返回 None 表示用户取消。
+保存目录按任务区分且保持不变（目录名包含任务创建时间和任务ID），文件列表保存在任务记录中；
+中断、失败或取消的任务调用 resume_job() 在原目录继续：已完成的文件跳过，.part 文件通过 Range 续传。
+"""
+
+import json
+import time
+import threading
+from datetime import datetime
+from backend.models.download_models import DownloadJob
+from backend.utils.download_engine import DownloadProgress, download_batch
+from backend.config.settings import DOWNLOAD_PROGRESS_SAVE_INTERVAL
+
+# 尚未结束的任务状态
+ACTIVE_STATUSES = ('pending', 'running')
+
+class DownloadJobError(ValueError):
+    """下载任务无法继续（不存在、正在进行或没有保存目录）"""
+
+def batch_folder_name(prefix, job):
+    """下载任务的保存子目录名（同一个任务每次继续都使用同一个目录）"""
+    return f"{prefix}_{job.create_at.strftime('%Y%m%d_%H%M%S')}_{job.id}"
+
+class DownloadJobManager:
+    """创建、跟踪和取消批量下载任务"""
+
+    def __init__(self, save_interval=DOWNLOAD_PROGRESS_SAVE_INTERVAL):
+        self.save_interval = save_interval
+        self._active = {}  # job_id -> DownloadProgress
+        self._last_saved = {}
+        self._lock = threading.Lock()
+
+    def start_job(self, job_type, items, resolve_target_dir):
+        """创建下载任务并在后台线程中执行，返回 DownloadJob"""
+        job = DownloadJob.create(job_type=job_type, total_files=len(items),
+                                 items=json.dumps(items, ensure_ascii=False))
+        with self._lock:
+            self._launch(job, items, resolve_target_dir)
+        return job
+
+    def resume_job(self, job_id):
+        """在原保存目录中继续下载任务，返回 DownloadJob"""
+        with self._lock:
+            if job_id in self._active:
+                raise DownloadJobError('下载任务正在进行中')
+            job = DownloadJob.get_or_none(DownloadJob.id == job_id)
+            if job is None:
+                raise DownloadJobError('下载任务不存在')
+            if job.status == 'completed' and not job.files_failed:
+                raise DownloadJobError('下载任务已全部完成')
+            items = job.get_items()
+            if not job.target_dir or not items:
+                raise DownloadJobError('下载任务没有保存目录或文件列表，无法继续')
+            DownloadJob.update(status='pending', finish_at=None).where(DownloadJob.id == job_id).execute()
+            self._launch(job, items, lambda job: job.target_dir)
+        print(f"继续下载任务 {job_id}，保存位置: {job.target_dir}")
+        return job
+
+    def _launch(self, job, items, resolve_target_dir):
+        """登记实时进度并启动后台下载线程（调用方持有 self._lock）"""
+        progress = DownloadProgress(len(items), on_progress=lambda p: self._save(job.id, p))
+        self._active[job.id] = progress
+        thread = threading.Thread(
+            target=self._run, args=(job, items, resolve_target_dir, progress),
+            name=f'download-job-{job.id}', daemon=True
+        )
+        thread.start()
+
+    def _run(self, job, items, resolve_target_dir, progress):
+        job_id = job.id
+        try:
+            target_dir = resolve_target_dir(job)
+            if not target_dir or progress.cancelled:
+                progress.finish('cancelled')
+                return
+            DownloadJob.update(target_dir=target_dir).where(DownloadJob.id == job_id).execute()
+            download_batch(items, target_dir, progress)
+            print(f"下载任务 {job_id} 结束: {progress.status}，文件保存位置: {target_dir}")
+        except Exception as e:
+            print(f"下载任务 {job_id} 执行失败: {str(e)}")
+            progress.finish('failed')
+        finally:
+            with self._lock:
+                self._active.pop(job_id, None)
+                self._last_saved.pop(job_id, None)
+
+    def _save(self, job_id, progress):
+        """写回进度，下载过程中按 save_interval 节流，状态变化时立即写入"""
+        data = progress.to_dict()
+        now = time.time()
+        with self._lock:
+            if data['status'] == 'running' and now - self._last_saved.get(job_id, 0) < self.save_interval:
+                return
+            self._last_saved[job_id] = now
+        try:
+            DownloadJob.update(
+                status=data['status'],
+                files_done=data['files_done'],
+                files_failed=data['files_failed'],
+                bytes_done=data['bytes_done'],
+                rate=data['rate'],
+                failures=json.dumps(data['failures'], ensure_ascii=False),
+                start_at=datetime.fromtimestamp(data['started_at']) if data['started_at'] else None,
+                finish_at=datetime.fromtimestamp(data['finished_at']) if data['finished_at'] else None
+            ).where(DownloadJob.id == job_id).execute()
+        except Exception as e:
+            print(f"保存下载任务 {job_id} 进度失败: {str(e)}")
+
+    def _job_dict(self, job):
+        """下载任务详情（进行中的任务使用实时进度）"""
+        data = job.to_dict()
+        with self._lock:
+            progress = self._active.get(job.id)
+        if progress is not None:
+            live = progress.to_dict()
+            for key in ('status', 'files_done', 'files_failed', 'bytes_done', 'rate', 'failures'):
+                data[key] = live[key]
+        elif job.status in ACTIVE_STATUSES:
+            # 进程重启前未完成的任务
+            data['status'] = 'interrupted'
+        data['resumable'] = (progress is None and bool(data['target_dir']) and job.items not in ('', '[]')
+                             and (data['status'] != 'completed' or data['files_failed'] > 0))
+        return data
+
+    def get_job(self, job_id):
+        """获取下载任务详情（进行中的任务返回实时进度），不存在时返回 None"""
+        job = DownloadJob.get_or_none(DownloadJob.id == job_id)
+        if job is None:
+            return None
+        return self._job_dict(job)
+
+    def list_jobs(self, limit=20):
+        """获取最近的下载任务（一次查询）"""
+        jobs = DownloadJob.select().order_by(DownloadJob.id.desc()).limit(limit)
+        return [self._job_dict(job) for job in jobs]
+
+    def cancel_job(self, job_id):
+        """取消下载任务，返回是否取消成功（任务不存在或已结束时返回 False）"""
+        with self._lock:
+            progress = self._active.get(job_id)
+        if progress is not None:
+            progress.cancel()
+            return True
+        return bool(DownloadJob.update(status='cancelled', finish_at=datetime.now())
+                    .where((DownloadJob.id == job_id) & (DownloadJob.status.in_(ACTIVE_STATUSES)))
+                    .execute())
+
+    def get_status(self):
+        """获取进行中的下载任务数"""
+        with self._lock:
+            return {'active_jobs': len(self._active)}
+
+# 全局下载任务管理器
+download_job_manager = DownloadJobManager()
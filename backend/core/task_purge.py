@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+任务批量清理
+
+按块删除任务行（每块先取出ID和关联文件路径，再用一条 DELETE 删除），
+关联文件交给后台回收线程分批释放引用和删除，HTTP 请求不再等待文件删除：
+
+    deleted_count, purge_id = purge_tasks(QingyingImage2VideoTask,
+                                          conditions=[QingyingImage2VideoTask.create_at < today_start],
+                                          untracked_dirs=(UPLOAD_TMP_DIR,))
+
+每次清理分配一个 purge_id，file_reclaimer.get_purge(purge_id) 返回这次清理已删除的文件数、
+释放的字节数和待回收的文件数（保留最近 RECLAIM_HISTORY_SIZE 次）；
+回收线程的累计统计可通过 file_reclaimer.get_status() 查看。
+"""
+
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+from peewee import chunked
+from backend.utils.image_store import image_store
+from backend.utils.task_stats import invalidate_task_stats
+from backend.config.settings import PURGE_CHUNK_SIZE, RECLAIM_BATCH_SIZE, RECLAIM_HISTORY_SIZE
+
+class FileReclaimer:
+    """后台文件回收：分批释放图片引用、删除不再使用的文件"""
+
+    def __init__(self, batch_size=RECLAIM_BATCH_SIZE, history_size=RECLAIM_HISTORY_SIZE):
+        self.batch_size = batch_size
+        self.history_size = history_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._purge_ids = itertools.count(1)
+        self._purges = OrderedDict()  # purge_id -> 该次清理的回收统计（只保留最近 history_size 次）
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+        self.errors = 0
+
+    def start_purge(self):
+        """分配一个清理ID，之后 enqueue(..., purge_id=) 的文件按该ID统计"""
+        with self._lock:
+            purge_id = next(self._purge_ids)
+            self._purges[purge_id] = {'files_queued': 0, 'files_done': 0, 'files_removed': 0,
+                                      'bytes_reclaimed': 0, 'errors': 0}
+            while len(self._purges) > self.history_size:
+                self._purges.popitem(last=False)
+        return purge_id
+
+    def enqueue(self, paths, untracked_dirs=(), purge_id=None):
+        """加入待回收的文件路径
+
+        不在图片存储中的旧独立文件只有位于 untracked_dirs（程序自己的上传目录）中时才删除，
+        其他路径只释放存储图片、硬链接和外部引用。
+        """
+        untracked_dirs = tuple(untracked_dirs)
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        with self._lock:
+            if purge_id in self._purges:
+                self._purges[purge_id]['files_queued'] += len(paths)
+        for path in paths:
+            self._queue.put((path, untracked_dirs, purge_id))
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='file-reclaimer', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """阻塞取出第一项，再取出已排队的其余项（最多 batch_size 项）"""
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                groups = {}
+                for path, untracked_dirs, purge_id in batch:
+                    groups.setdefault((untracked_dirs, purge_id), []).append(path)
+                for (untracked_dirs, purge_id), paths in groups.items():
+                    try:
+                        removed = image_store.release_paths(paths, untracked_dirs)
+                    except Exception as e:
+                        self._record(purge_id, len(paths), error=True)
+                        print(f"回收文件失败: {str(e)}")
+                        continue
+                    self._record(purge_id, len(paths), removed)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _record(self, purge_id, files_done, removed=(), error=False):
+        """累计回收统计（总计和所属清理）"""
+        bytes_reclaimed = sum(size for _, size in removed)
+        with self._lock:
+            self.files_removed += len(removed)
+            self.bytes_reclaimed += bytes_reclaimed
+            self.errors += int(error)
+            stats = self._purges.get(purge_id)
+            if stats is not None:
+                stats['files_done'] += files_done
+                stats['files_removed'] += len(removed)
+                stats['bytes_reclaimed'] += bytes_reclaimed
+                stats['errors'] += int(error)
+
+    def wait(self):
+        """等待已排队的文件全部回收完成"""
+        self._queue.join()
+
+    def get_purge(self, purge_id):
+        """获取一次清理的回收统计，不存在（或已超出保留数量）时返回 None"""
+        with self._lock:
+            stats = self._purges.get(purge_id)
+            if stats is None:
+                return None
+            data = dict(stats, purge_id=purge_id)
+        data['pending'] = data['files_queued'] - data['files_done']
+        data['status'] = 'completed' if data['pending'] == 0 else 'running'
+        return data
+
+    def get_status(self):
+        """获取回收统计"""
+        with self._lock:
+            return {
+                'pending': self._queue.unfinished_tasks,
+                'files_removed': self.files_removed,
+                'bytes_reclaimed': self.bytes_reclaimed,
+                'errors': self.errors
+            }
+
+# 全局文件回收器
+file_reclaimer = FileReclaimer()
+
+def _purge_chunks(model, where, fields, untracked_dirs, chunk_size, purge_id):
+    database = model._meta.database
+    deleted_count = 0
+    while True:
+        with database.atomic():
+            rows = list(model
+                        .select(model.id, *fields)
+                        .where(*where)
+                        .order_by(model.id)
+                        .limit(chunk_size)
+                        .tuples())
+            if not rows:
+                break
+            model.delete().where(model.id.in_([row[0] for row in rows])).execute()
+        file_reclaimer.enqueue([path for row in rows for path in row[1:]], untracked_dirs, purge_id)
+        deleted_count += len(rows)
+        if len(rows) < chunk_size:
+            break
+    return deleted_count
+
+def purge_tasks(model, task_ids=None, conditions=(), file_fields=('image_path',), untracked_dirs=(),
+                chunk_size=PURGE_CHUNK_SIZE):
+    """按块删除任务，关联文件交给后台回收，返回 (删除的任务数, purge_id)
+
+    task_ids 为空时删除所有符合 conditions 的任务（两者都为空时不删除）；
+    file_fields 为保存文件路径的字段名（模型中不存在的字段会跳过）；
+    untracked_dirs 见 FileReclaimer.enqueue。
+    释放的字节数通过 file_reclaimer.get_purge(purge_id) 查询（GET /api/storage/purges/<purge_id>）。
+    """
+    if not task_ids and not conditions:
+        return 0, None
+    fields = [model._meta.fields[name] for name in file_fields if name in model._meta.fields]
+    purge_id = file_reclaimer.start_purge()
+    deleted_count = 0
+    if task_ids:
+        for chunk in chunked(list(task_ids), chunk_size):
+            deleted_count += _purge_chunks(model, [model.id.in_(chunk), *conditions],
+                                           fields, untracked_dirs, chunk_size, purge_id)
+    else:
+        deleted_count = _purge_chunks(model, list(conditions), fields, untracked_dirs, chunk_size, purge_id)
+
+    if deleted_count:
+        invalidate_task_stats(model)
+    return deleted_count, purge_id
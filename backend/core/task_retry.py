@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+批量重试
+
+所有任务类型共用的集合式重试：按 RETRY_CHUNK_SIZE 分块执行 UPDATE（同一个事务），
+把符合条件的任务重置为排队状态（同时清空该任务类型的账号和输出字段），
+有自己调度入口的任务类型再把受影响的任务ID一次性交给调度，
+其余任务类型由任务处理器按 TASK_PROCESSOR_INTERVAL 轮询排队任务。
+引用外部原图片的任务会先校验原文件，导入后被修改或删除的任务不会重试。
+
+    task_ids = retry_tasks(JimengImg2VideoTask, task_ids,
+                           conditions=[JimengImg2VideoTask.is_empty_task == False])
+"""
+
+from datetime import datetime
+from peewee import chunked
+from backend.models.models import JimengText2ImgTask, JimengImg2VideoTask, JimengDigitalHumanTask, QingyingImage2VideoTask
+from backend.models.image_store_models import ImageReference
+from backend.utils.image_store import image_store
+from backend.utils.task_stats import invalidate_task_stats
+from backend.config.settings import RETRY_CHUNK_SIZE
+
+# 重试时清空的账号和输出字段（按任务模型区分，模型中不存在的字段会跳过）
+RETRY_RESET_FIELDS = {
+    JimengText2ImgTask: ('account_id', 'image1', 'image2', 'image3', 'image4', 'start_time'),
+    JimengImg2VideoTask: ('account_id', 'video_url', 'start_time'),
+    JimengDigitalHumanTask: ('account_id', 'video_url', 'start_time'),
+    QingyingImage2VideoTask: ('account_id', 'video_url', 'start_time'),
+}
+DEFAULT_RETRY_RESET_FIELDS = ('account_id', 'video_url', 'start_time')
+
+def _reset_values(model):
+    fields = model._meta.fields
+    values = {fields['status']: 0}
+    for name in RETRY_RESET_FIELDS.get(model, DEFAULT_RETRY_RESET_FIELDS):
+        if name in fields:
+            values[fields[name]] = None
+    if 'update_at' in fields:
+        values[fields['update_at']] = datetime.now()
+    return values
+
+def _changed_reference_ids(model, where):
+    """找出引用的原图片在导入后被修改或删除的任务ID"""
+    if 'image_path' not in model._meta.fields:
+        return set()
+    rows = list(model
+                .select(model.id, model.image_path)
+                .where(*where, model.image_path.in_(ImageReference.select(ImageReference.path)))
+                .tuples())
+    changed = image_store.find_changed_references([image_path for _, image_path in rows])
+    return {task_id for task_id, image_path in rows if image_path in changed}
+
+def _retry_chunk(model, values, where):
+    database = model._meta.database
+    query = model.update(values).where(*where)
+    if getattr(database, 'returning_clause', False):
+        return [task_id for (task_id,) in query.returning(model.id).tuples().execute()]
+    retried_ids = [task_id for (task_id,) in model.select(model.id).where(*where).tuples()]
+    query.execute()
+    return retried_ids
+
+def retry_tasks(model, task_ids=None, statuses=(3,), conditions=(), dispatch=None,
+                chunk_size=RETRY_CHUNK_SIZE):
+    """把任务重置为排队状态并交给调度，返回重置的任务ID列表
+
+    task_ids 为空时重试所有符合条件的任务；statuses 为 None 时不限制原状态；
+    有自己调度入口的任务类型传入 dispatch(task_ids)，重置后立即提交。
+    """
+    where = list(conditions)
+    if statuses is not None:
+        where.append(model.status.in_(list(statuses)))
+
+    database = model._meta.database
+    values = _reset_values(model)
+    retried_ids = []
+    with database.atomic():
+        if not task_ids:
+            # 先取出符合条件的任务ID，再按块更新，每条语句的参数数量不随任务数增长
+            task_ids = [task_id for (task_id,) in model.select(model.id).where(*where).tuples()]
+        skipped_count = 0
+        for chunk in chunked(list(task_ids), chunk_size):
+            chunk_where = where + [model.id.in_(chunk)]
+            skipped_ids = _changed_reference_ids(model, chunk_where)
+            if skipped_ids:
+                skipped_count += len(skipped_ids)
+                chunk = [task_id for task_id in chunk if task_id not in skipped_ids]
+                if not chunk:
+                    continue
+                chunk_where = where + [model.id.in_(chunk)]
+            retried_ids.extend(_retry_chunk(model, values, chunk_where))
+    if skipped_count:
+        print(f"原图片已被修改或删除，跳过重试 {skipped_count} 个任务")
+
+    invalidate_task_stats(model)
+    if retried_ids and dispatch is not None:
+        dispatch(retried_ids)
+    return retried_ids
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+批量下载任务表
+"""
+
+import json
+from datetime import datetime
+from peewee import Model, IntegerField, BigIntegerField, FloatField, CharField, TextField, DateTimeField
+from backend.models.models import JimengAccount
+
+class DownloadJob(Model):
+    """批量下载任务（进度在下载过程中定期写入）"""
+    job_type = CharField(max_length=32)  # text2img / img2video
+    status = CharField(max_length=16, default='pending')  # pending / running / completed / cancelled / failed / interrupted
+    target_dir = CharField(max_length=1024, null=True)
+    total_files = IntegerField(default=0)
+    files_done = IntegerField(default=0)
+    files_failed = IntegerField(default=0)
+    bytes_done = BigIntegerField(default=0)
+    rate = FloatField(default=0)  # 下载速率（字节/秒），进行中为最近几秒的速率，结束后为平均速率
+    failures = TextField(default='[]')  # JSON: [{'filename': ..., 'error': ...}]
+    items = TextField(default='[]')  # JSON: [{'url': ..., 'filename': ...}]，继续下载时使用
+    create_at = DateTimeField(default=datetime.now)
+    start_at = DateTimeField(null=True)
+    finish_at = DateTimeField(null=True)
+
+    class Meta:
+        database = JimengAccount._meta.database
+        table_name = 'download_jobs'
+
+    def get_failures(self):
+        """获取失败文件列表"""
+        try:
+            return json.loads(self.failures or '[]')
+        except Exception:
+            return []
+
+    def get_items(self):
+        """获取下载文件列表"""
+        try:
+            return json.loads(self.items or '[]')
+        except Exception:
+            return []
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'target_dir': self.target_dir,
+            'total_files': self.total_files,
+            'files_done': self.files_done,
+            'files_failed': self.files_failed,
+            'bytes_done': self.bytes_done,
+            'rate': self.rate,
+            'failures': self.get_failures(),
+            'create_at': self.create_at.strftime('%Y-%m-%d %H:%M:%S') if self.create_at else None,
+            'start_at': self.start_at.strftime('%Y-%m-%d %H:%M:%S') if self.start_at else None,
+            'finish_at': self.finish_at.strftime('%Y-%m-%d %H:%M:%S') if self.finish_at else None
+        }
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+图片存储表（内容寻址存储和零复制导入的外部引用）
+"""
+
+from datetime import datetime
+from peewee import Model, CharField, IntegerField, BigIntegerField, DateTimeField
+from backend.models.models import JimengAccount
+
+class StoredImage(Model):
+    """按 SHA-256 存储的图片（相同内容只保存一份）
+
+    ref_count 为引用该图片的任务数，任务删除时减一，减到0时删除文件和记录。
+    """
+    sha256 = CharField(max_length=64, primary_key=True)
+    path = CharField(max_length=1024)
+    size = BigIntegerField(default=0)
+    ref_count = IntegerField(default=0)
+    create_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = JimengAccount._meta.database
+        table_name = 'image_store'
+
+class ImageReference(Model):
+    """导入时直接引用的外部图片（不复制），记录大小和修改时间用于校验文件是否被改动"""
+    path = CharField(max_length=1024, primary_key=True)
+    size = BigIntegerField(default=0)
+    mtime_ns = BigIntegerField(default=0)
+    ref_count = IntegerField(default=0)
+    create_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = JimengAccount._meta.database
+        table_name = 'image_references'
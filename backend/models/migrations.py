@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+数据库结构迁移
+
+按版本号顺序执行迁移，已执行的版本记录在 schema_migrations 表中。
+目前的迁移主要为任务表的常用筛选/排序条件添加组合索引、建立下载任务/图片存储表
+和由触发器维护的账号使用量计数表，并提供 EXPLAIN QUERY PLAN 检查，确认各接口的查询命中索引。
+
+命令行用法:
+    python -m backend.models.migrations          执行迁移并检查查询计划
+    python -m backend.models.migrations --check  只检查查询计划
+"""
+
+import sys
+import threading
+from datetime import datetime, date
+from peewee import Model, IntegerField, CharField, DateTimeField, ModelIndex, Value, fn
+from backend.models.models import (
+    JimengAccount, JimengText2ImgTask, JimengImg2VideoTask,
+    JimengDigitalHumanTask, QingyingImage2VideoTask
+)
+from backend.models.download_models import DownloadJob
+from backend.models.image_store_models import StoredImage, ImageReference
+from backend.models.usage_models import AccountDailyUsage, AccountTotalUsage
+
+database = JimengAccount._meta.database
+
+class SchemaMigration(Model):
+    """已执行的迁移记录"""
+    version = IntegerField(primary_key=True)
+    name = CharField(max_length=128)
+    applied_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = database
+        table_name = 'schema_migrations'
+
+def create_index(model, name, *fields):
+    """为模型创建组合索引（已存在时跳过）"""
+    database.execute(ModelIndex(model, fields, name=name, safe=True))
+
+def _add_task_indexes():
+    """为任务表的列表、统计、配额查询添加组合索引"""
+    for model, prefix in ((JimengText2ImgTask, 'jimeng_text2img'), (JimengImg2VideoTask, 'jimeng_img2video')):
+        # 列表（可选状态筛选）按创建时间倒序 / 按状态统计
+        create_index(model, f'idx_{prefix}_empty_status_create', model.is_empty_task, model.status, model.create_at)
+        # 不筛选状态的列表按创建时间倒序
+        create_index(model, f'idx_{prefix}_empty_create', model.is_empty_task, model.create_at)
+        # 账号每日使用量
+        create_index(model, f'idx_{prefix}_account_create', model.account_id, model.create_at)
+        # 删除今日前任务
+        create_index(model, f'idx_{prefix}_create', model.create_at)
+
+    model = JimengDigitalHumanTask
+    create_index(model, 'idx_jimeng_digital_human_status_create', model.status, model.create_at)
+    create_index(model, 'idx_jimeng_digital_human_account_create', model.account_id, model.create_at)
+    create_index(model, 'idx_jimeng_digital_human_create', model.create_at)
+
+    model = QingyingImage2VideoTask
+    # 列表按创建时间倒序，游标分页按 (create_at, id) 排序（单列索引隐含 rowid）
+    create_index(model, 'idx_qingying_img2video_create', model.create_at)
+    # 今日任务按状态统计
+    create_index(model, 'idx_qingying_img2video_status_create', model.status, model.create_at)
+    create_index(model, 'idx_qingying_img2video_account', model.account_id)
+
+def _add_download_jobs():
+    """批量下载任务表"""
+    DownloadJob.create_table(safe=True)
+
+def _add_image_store():
+    """内容寻址图片存储表"""
+    StoredImage.create_table(safe=True)
+
+def _add_image_references():
+    """零复制导入的外部图片引用表"""
+    ImageReference.create_table(safe=True)
+
+def _add_download_job_items():
+    """下载任务保存文件列表，中断的任务可以在原目录继续下载"""
+    table = DownloadJob._meta.table_name
+    if 'items' not in [column.name for column in database.get_columns(table)]:
+        # 迁移 2 使用当前模型建表时已经包含该列
+        database.execute_sql(f"ALTER TABLE \"{table}\" ADD COLUMN items TEXT NOT NULL DEFAULT '[]'")
+
+# 计入账号使用量的任务表
+USAGE_TASK_MODELS = (
+    ('text2img', JimengText2ImgTask),
+    ('img2video', JimengImg2VideoTask),
+    ('digital_human', JimengDigitalHumanTask),
+)
+
+def _usage_trigger_sql(model, task_type):
+    """任务表上维护使用量计数的触发器：分配账号 +1，清空/更换账号（重试）和删除任务 -1"""
+    table = model._meta.table_name
+    daily = AccountDailyUsage._meta.table_name
+    total = AccountTotalUsage._meta.table_name
+
+    def increment(row):
+        return f"""
+            INSERT INTO "{daily}" (account_id, task_type, usage_date, usage_count)
+            SELECT {row}.account_id, '{task_type}', date({row}.create_at), 1 WHERE {row}.account_id IS NOT NULL
+            ON CONFLICT (account_id, task_type, usage_date) DO UPDATE SET usage_count = usage_count + 1;
+            INSERT INTO "{total}" (account_id, task_type, usage_count)
+            SELECT {row}.account_id, '{task_type}', 1 WHERE {row}.account_id IS NOT NULL
+            ON CONFLICT (account_id, task_type) DO UPDATE SET usage_count = usage_count + 1;"""
+
+    def decrement(row):
+        return f"""
+            UPDATE "{daily}" SET usage_count = usage_count - 1
+            WHERE account_id = {row}.account_id AND task_type = '{task_type}' AND usage_date = date({row}.create_at);
+            UPDATE "{total}" SET usage_count = usage_count - 1
+            WHERE account_id = {row}.account_id AND task_type = '{task_type}';"""
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS "trg_{table}_usage_insert" AFTER INSERT ON "{table}"
+            WHEN NEW.account_id IS NOT NULL
+            BEGIN {increment('NEW')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS "trg_{table}_usage_update" AFTER UPDATE OF account_id, create_at ON "{table}"
+            WHEN OLD.account_id IS NOT NEW.account_id OR OLD.create_at IS NOT NEW.create_at
+            BEGIN {decrement('OLD')} {increment('NEW')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS "trg_{table}_usage_delete" AFTER DELETE ON "{table}"
+            WHEN OLD.account_id IS NOT NULL
+            BEGIN {decrement('OLD')}
+            END""",
+    ]
+
+def _add_account_usage_counters():
+    """账号使用量计数表：从任务表回填一次，之后由触发器在分配账号、重试和删除任务时维护"""
+    database.create_tables([AccountDailyUsage, AccountTotalUsage], safe=True)
+    for task_type, model in USAGE_TASK_MODELS:
+        usage_date = fn.date(model.create_at)
+        (AccountDailyUsage
+         .insert_from(model
+                      .select(model.account_id, Value(task_type), usage_date, fn.COUNT(model.id))
+                      .where(model.account_id.is_null(False))
+                      .group_by(model.account_id, usage_date),
+                      [AccountDailyUsage.account_id, AccountDailyUsage.task_type,
+                       AccountDailyUsage.usage_date, AccountDailyUsage.usage_count])
+         .execute())
+        (AccountTotalUsage
+         .insert_from(model
+                      .select(model.account_id, Value(task_type), fn.COUNT(model.id))
+                      .where(model.account_id.is_null(False))
+                      .group_by(model.account_id),
+                      [AccountTotalUsage.account_id, AccountTotalUsage.task_type, AccountTotalUsage.usage_count])
+         .execute())
+        for sql in _usage_trigger_sql(model, task_type):
+            database.execute_sql(sql)
+
+# 迁移列表：(版本号, 名称, 执行函数)，只能追加，不能修改已发布的版本
+MIGRATIONS = [
+    (1, 'add_task_composite_indexes', _add_task_indexes),
+    (2, 'add_download_jobs', _add_download_jobs),
+    (3, 'add_image_store', _add_image_store),
+    (4, 'add_image_references', _add_image_references),
+    (5, 'add_account_usage_counters', _add_account_usage_counters),
+    (6, 'add_download_job_items', _add_download_job_items),
+]
+
+# 由迁移创建、服务启动时必须存在的表
+MIGRATED_MODELS = (DownloadJob, StoredImage, ImageReference, AccountDailyUsage, AccountTotalUsage)
+
+_migrate_lock = threading.Lock()
+
+def get_current_version():
+    """获取当前数据库结构版本"""
+    if not SchemaMigration.table_exists():
+        return 0
+    return SchemaMigration.select(fn.MAX(SchemaMigration.version)).scalar() or 0
+
+def run_migrations():
+    """执行所有未执行的迁移，返回本次执行的版本号列表"""
+    with _migrate_lock:
+        SchemaMigration.create_table(safe=True)
+        current_version = get_current_version()
+        applied = []
+        for version, name, migrate in MIGRATIONS:
+            if version <= current_version:
+                continue
+            with database.atomic():
+                migrate()
+                SchemaMigration.create(version=version, name=name)
+            applied.append(version)
+            print(f"数据库迁移完成: {version} {name}")
+
+        if applied:
+            # 更新统计信息，让查询优化器正确选择新索引
+            database.execute_sql('ANALYZE')
+
+        missing = [model._meta.table_name for model in MIGRATED_MODELS if not model.table_exists()]
+        if missing:
+            raise RuntimeError(f"数据库迁移后缺少数据表: {', '.join(missing)}")
+        return applied
+
+def explain_query(query):
+    """返回查询的 EXPLAIN QUERY PLAN 明细列表"""
+    sql, params = query.sql()
+    cursor = database.execute_sql('EXPLAIN QUERY PLAN ' + sql, params)
+    return [row[-1] for row in cursor.fetchall()]
+
+def _plan_uses_index(plan):
+    """查询计划中没有全表扫描和 ORDER BY 临时排序即视为命中索引"""
+    for detail in plan:
+        if detail.startswith('SCAN') and 'INDEX' not in detail:
+            return False
+        if 'TEMP B-TREE FOR ORDER BY' in detail:
+            return False
+    return True
+
+def _keyset_query(query, model):
+    """构造与 keyset_paginate 相同的游标分页查询"""
+    cursor_at = datetime.now()
+    return (query
+            .where((model.create_at <= cursor_at) & ((model.create_at < cursor_at) | (model.id < 1000)))
+            .order_by(model.create_at.desc(), model.id.desc())
+            .limit(21))
+
+def get_route_queries():
+    """各接口使用的典型查询（与路由中的查询保持一致）"""
+    today = date.today()
+    today_start = datetime.combine(today, datetime.min.time())
+    queries = {}
+
+    for model, prefix in ((JimengText2ImgTask, 'text2img'), (JimengImg2VideoTask, 'img2video')):
+        base_query = model.select().where(model.is_empty_task == False)
+        queries[f'{prefix}.tasks'] = base_query.order_by(model.create_at.desc()).paginate(50, 10)
+        queries[f'{prefix}.tasks?status'] = (base_query.where(model.status == 2)
+                                              .order_by(model.create_at.desc()).paginate(50, 10))
+        queries[f'{prefix}.tasks?cursor'] = _keyset_query(base_query, model)
+        queries[f'{prefix}.tasks?status&cursor'] = _keyset_query(base_query.where(model.status == 2), model)
+        queries[f'{prefix}.stats'] = (model.select(model.status, fn.COUNT(model.id))
+                                      .where(model.is_empty_task == False)
+                                      .group_by(model.status))
+        queries[f'{prefix}.delete_before_today'] = model.select(model.id).where(model.create_at < today_start)
+
+    model = JimengDigitalHumanTask
+    queries['digital_human.stats'] = model.select(model.status, fn.COUNT(model.id)).group_by(model.status)
+
+    # 今日使用量只读计数表（累计表每个账号、任务类型一行，不做检查）
+    queries['account_usage.today'] = (AccountDailyUsage
+                                      .select(AccountDailyUsage.account_id, AccountDailyUsage.task_type,
+                                              AccountDailyUsage.usage_count)
+                                      .where(AccountDailyUsage.usage_date == today))
+
+    model = QingyingImage2VideoTask
+    queries['qingying.tasks'] = model.select().order_by(model.create_at.desc()).offset(500).limit(20)
+    queries['qingying.tasks?cursor'] = _keyset_query(model.select(), model)
+    queries['qingying.stats'] = (model.select(model.status, fn.COUNT(model.id))
+                                 .where(model.create_at >= today_start)
+                                 .group_by(model.status))
+    return queries
+
+def check_query_plans(verbose=True):
+    """检查各接口查询是否命中索引，返回未命中索引的查询名称列表"""
+    failures = []
+    for name, query in get_route_queries().items():
+        plan = explain_query(query)
+        ok = _plan_uses_index(plan)
+        if not ok:
+            failures.append(name)
+        if verbose:
+            print(f"[{'OK' if ok else 'FAIL'}] {name}")
+            for detail in plan:
+                print(f"    {detail}")
+    return failures
+
+if __name__ == '__main__':
+    if '--check' not in sys.argv:
+        run_migrations()
+    sys.exit(1 if check_query_plans() else 0)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+账号使用量计数表（由任务表上的触发器维护，见迁移 add_account_usage_counters）
+"""
+
+from peewee import Model, IntegerField, CharField, DateField
+from backend.models.models import JimengAccount
+
+class AccountDailyUsage(Model):
+    """账号每日使用量（每个账号、任务类型、日期一行）
+
+    按任务的创建日期计数，与按 create_at 统计任务表的结果一致；
+    跨天后新的日期自动使用新行，不需要归零或重新扫描任务表。
+    """
+    account_id = IntegerField()
+    task_type = CharField(max_length=32)  # text2img / img2video / digital_human
+    usage_date = DateField()
+    usage_count = IntegerField(default=0)
+
+    class Meta:
+        database = JimengAccount._meta.database
+        table_name = 'account_daily_usage'
+        indexes = (
+            (('account_id', 'task_type', 'usage_date'), True),
+            (('usage_date',), False),
+        )
+
+class AccountTotalUsage(Model):
+    """账号累计使用量（每个账号、任务类型一行）"""
+    account_id = IntegerField()
+    task_type = CharField(max_length=32)
+    usage_count = IntegerField(default=0)
+
+    class Meta:
+        database = JimengAccount._meta.database
+        table_name = 'account_total_usage'
+        indexes = (
+            (('account_id', 'task_type'), True),
+        )
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+
+把仓库根目录和 backend 目录加入 sys.path（与服务启动时的导入方式一致），
+每个测试使用独立的临时 SQLite 数据库。
+backend.models.models 不在当前检出中时，用字段一致的最小任务模型代替；
+backend.core.global_task_manager 不在时只注册一个空模块。
+"""
+
+import os
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for path in (os.path.join(REPO_ROOT, 'backend'), REPO_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from peewee import (SqliteDatabase, Model, CharField, TextField, IntegerField,
+                    BooleanField, DateTimeField)
+
+def _install_test_models():
+    """定义与 backend.models.models 字段一致的最小任务模型"""
+    test_database = SqliteDatabase(None)
+
+    class BaseModel(Model):
+        class Meta:
+            database = test_database
+
+    class JimengAccount(BaseModel):
+        account = CharField(default='')
+        password = CharField(default='')
+        cookies = TextField(null=True)
+
+    class QingyingAccount(BaseModel):
+        nickname = CharField(default='')
+        cookies = TextField(null=True)
+
+    class JimengText2ImgTask(BaseModel):
+        prompt = TextField(default='')
+        status = IntegerField(default=0)
+        account_id = IntegerField(null=True)
+        is_empty_task = BooleanField(default=False)
+        image1 = CharField(null=True)
+        image2 = CharField(null=True)
+        image3 = CharField(null=True)
+        image4 = CharField(null=True)
+        start_time = DateTimeField(null=True)
+        create_at = DateTimeField(default=datetime.now)
+        update_at = DateTimeField(default=datetime.now)
+
+    class JimengImg2VideoTask(BaseModel):
+        prompt = TextField(default='')
+        model = CharField(default='Video 3.0')
+        second = IntegerField(default=5)
+        image_path = CharField(null=True)
+        status = IntegerField(default=0)
+        account_id = IntegerField(null=True)
+        is_empty_task = BooleanField(default=False)
+        video_url = CharField(null=True)
+        start_time = DateTimeField(null=True)
+        create_at = DateTimeField(default=datetime.now)
+        update_at = DateTimeField(default=datetime.now)
+
+    class JimengDigitalHumanTask(BaseModel):
+        image_path = CharField(null=True)
+        audio_path = CharField(null=True)
+        status = IntegerField(default=0)
+        account_id = IntegerField(null=True)
+        video_url = CharField(null=True)
+        start_time = DateTimeField(null=True)
+        create_at = DateTimeField(default=datetime.now)
+        update_at = DateTimeField(default=datetime.now)
+
+    class QingyingImage2VideoTask(BaseModel):
+        prompt = TextField(default='')
+        image_path = CharField(null=True)
+        status = IntegerField(default=0)
+        account_id = IntegerField(null=True)
+        video_url = CharField(null=True)
+        start_time = DateTimeField(null=True)
+        create_at = DateTimeField(default=datetime.now)
+        update_at = DateTimeField(default=datetime.now)
+
+    module = types.ModuleType('backend.models.models')
+    for model in (JimengAccount, QingyingAccount, JimengText2ImgTask, JimengImg2VideoTask,
+                  JimengDigitalHumanTask, QingyingImage2VideoTask):
+        setattr(module, model.__name__, model)
+    module.db = test_database
+    sys.modules['backend.models.models'] = module
+    return module
+
+try:
+    import backend.models.models as models
+except ImportError:
+    models = _install_test_models()
+
+try:
+    import backend.core.global_task_manager  # noqa: F401
+except ImportError:
+    # 全局任务管理器不在当前检出中，测试中直接构造带 submit_task 的假管理器
+    module = types.ModuleType('backend.core.global_task_manager')
+    module.global_task_manager = None
+    sys.modules['backend.core.global_task_manager'] = module
+
+TASK_MODELS = (models.JimengAccount, models.QingyingAccount, models.JimengText2ImgTask,
+               models.JimengImg2VideoTask, models.JimengDigitalHumanTask, models.QingyingImage2VideoTask)
+
+@pytest.fixture
+def database(tmp_path):
+    """绑定到临时文件的数据库（已建好任务表并执行完迁移）"""
+    from backend.models.migrations import run_migrations
+    database = models.JimengAccount._meta.database
+    database.init(str(tmp_path / 'test.db'), pragmas={'journal_mode': 'wal'}, check_same_thread=False)
+    database.connect(reuse_if_open=True)
+    database.create_tables(TASK_MODELS)
+    run_migrations()
+    yield database
+    database.close()
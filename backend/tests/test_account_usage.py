@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""账号使用量计数表（触发器维护）测试"""
+
+from datetime import date, datetime, timedelta
+
+from backend.models import migrations
+from backend.models.models import JimengText2ImgTask, JimengImg2VideoTask
+from backend.models.usage_models import AccountDailyUsage, AccountTotalUsage
+from backend.utils.account_usage import (get_today_usage_by_account, get_total_usage_by_account,
+                                         empty_usage)
+
+def _usage(account_id, task_type):
+    today = get_today_usage_by_account().get(account_id, empty_usage())[task_type]
+    total = get_total_usage_by_account().get(account_id, empty_usage())[task_type]
+    return today, total
+
+def test_counters_follow_assignment_retry_and_delete(database):
+    task = JimengText2ImgTask.create(prompt='a')
+    assert _usage(1, 'text2img') == (0, 0)
+
+    # 处理器分配账号
+    JimengText2ImgTask.update(account_id=1).where(JimengText2ImgTask.id == task.id).execute()
+    JimengText2ImgTask.create(prompt='b', account_id=1)
+    assert _usage(1, 'text2img') == (2, 2)
+
+    # 重试清空账号
+    JimengText2ImgTask.update(account_id=None, status=0).where(JimengText2ImgTask.id == task.id).execute()
+    assert _usage(1, 'text2img') == (1, 1)
+
+    # 重新分配到其他账号
+    JimengText2ImgTask.update(account_id=2).where(JimengText2ImgTask.id == task.id).execute()
+    assert _usage(1, 'text2img') == (1, 1)
+    assert _usage(2, 'text2img') == (1, 1)
+
+    JimengText2ImgTask.delete().execute()
+    assert _usage(1, 'text2img') == (0, 0)
+    assert _usage(2, 'text2img') == (0, 0)
+
+def test_counters_are_keyed_on_creation_date(database):
+    yesterday = datetime.now() - timedelta(days=1)
+    JimengImg2VideoTask.create(account_id=1, create_at=yesterday)
+    JimengImg2VideoTask.create(account_id=1)
+    assert _usage(1, 'img2video') == (1, 2)
+    assert get_today_usage_by_account(yesterday.date())[1]['img2video'] == 1
+
+def test_backfill_counts_existing_tasks(database):
+    # 模拟迁移前已有的任务：去掉触发器和计数表后写入任务，再执行迁移
+    for _, model in migrations.USAGE_TASK_MODELS:
+        table = model._meta.table_name
+        for event in ('insert', 'update', 'delete'):
+            database.execute_sql(f'DROP TRIGGER "trg_{table}_usage_{event}"')
+    database.drop_tables([AccountDailyUsage, AccountTotalUsage])
+
+    JimengText2ImgTask.create(account_id=3)
+    JimengText2ImgTask.create(account_id=3, create_at=datetime.now() - timedelta(days=2))
+    JimengText2ImgTask.create(account_id=None)
+    JimengImg2VideoTask.create(account_id=3)
+
+    migrations._add_account_usage_counters()
+    assert get_today_usage_by_account()[3] == {'text2img': 1, 'img2video': 1, 'digital_human': 0}
+    assert get_total_usage_by_account()[3] == {'text2img': 2, 'img2video': 1, 'digital_human': 0}
+    assert AccountDailyUsage.select().where(AccountDailyUsage.usage_date == date.today()).count() == 2
+
+    # 回填后触发器继续生效
+    JimengText2ImgTask.create(account_id=3)
+    assert _usage(3, 'text2img') == (2, 3)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""有界提交队列测试"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.core.bounded_task_queue import BoundedTaskQueue
+
+class FakeTaskManager:
+    """与 global_task_manager 接口一致的最小任务管理器"""
+
+    def __init__(self, max_threads=2, fail=False, cancel=False):
+        self.max_threads = max_threads
+        self.active_tasks = {}
+        self.fail = fail
+        self.cancel = cancel
+        self.executor = ThreadPoolExecutor(max_threads)
+        self.lock = threading.Lock()
+        self.peak = 0
+
+    def submit_task(self, platform_name, task_callable, task_id, **kwargs):
+        if self.fail:
+            raise RuntimeError('线程池已停止')
+        if self.cancel:
+            future = self.executor.submit(lambda: None)
+            future.cancel()
+            return future
+
+        def run():
+            with self.lock:
+                self.active_tasks[task_id] = True
+                self.peak = max(self.peak, len(self.active_tasks))
+            try:
+                return task_callable(task_id)
+            finally:
+                with self.lock:
+                    self.active_tasks.pop(task_id, None)
+        return self.executor.submit(run)
+
+def _task(task_id, callable_):
+    return {'platform_name': '测试', 'task_callable': callable_, 'task_id': task_id}
+
+def _wait_idle(task_queue, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = task_queue.get_status()
+        if not status['queue_depth'] and not status['starting'] and not status['running']:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(task_queue.get_status())
+
+def test_respects_real_active_count_and_dedupes():
+    manager = FakeTaskManager(max_threads=2)
+    release = threading.Event()
+    done = []
+    task_queue = BoundedTaskQueue(manager, maxsize=10, poll_interval=0.01)
+
+    # 其他来源占用一个工作线程
+    manager.active_tasks['other'] = True
+
+    def work(task_id):
+        release.wait(5)
+        done.append(task_id)
+
+    assert task_queue.submit_many([_task(i, work) for i in (1, 2, 2, 3)]) == 3
+    assert task_queue.submit_many([_task(1, work)]) == 0
+    release.set()
+    manager.active_tasks.pop('other')
+    status = _wait_idle(task_queue)
+    assert sorted(done) == [1, 2, 3]
+    assert manager.peak <= 2
+    assert status['skipped_duplicates'] == 2
+    # 任务结束后同一个账号可以再次提交
+    assert task_queue.submit_many([_task(1, work)]) == 1
+    _wait_idle(task_queue)
+
+def test_full_queue_rejects_whole_batch_without_blocking():
+    manager = FakeTaskManager(max_threads=1)
+    manager.active_tasks['other'] = True  # 线程池一直是满的，任务只能排队
+    task_queue = BoundedTaskQueue(manager, maxsize=3, poll_interval=0.01)
+    assert task_queue.submit_many([_task(i, lambda _: None) for i in range(2)]) == 2
+    with pytest.raises(queue.Full):
+        task_queue.submit_many([_task(i, lambda _: None) for i in range(10, 12)])
+    assert task_queue.get_status()['queue_depth'] == 2
+    manager.active_tasks.clear()
+    _wait_idle(task_queue)
+
+@pytest.mark.parametrize('mode', ['fail', 'cancel'])
+def test_rejected_or_cancelled_tasks_release_slots(mode):
+    manager = FakeTaskManager(max_threads=1, **{mode: True})
+    task_queue = BoundedTaskQueue(manager, maxsize=10, poll_interval=0.01)
+    task_queue.submit_many([_task(i, lambda _: None) for i in range(5)])
+    status = _wait_idle(task_queue)
+    assert status['starting'] == 0 and status['running'] == 0
+    assert status['failed' if mode == 'fail' else 'submitted'] == 5
+    # 任务键也已释放
+    assert task_queue.submit_many([_task(0, lambda _: None)]) == 1
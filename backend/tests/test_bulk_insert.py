@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""批量插入测试"""
+
+import pytest
+
+from backend.models.models import JimengImg2VideoTask
+from backend.utils.bulk_insert import bulk_create
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'lastrowid'])
+def test_ids_follow_row_order(database, monkeypatch, returning):
+    monkeypatch.setattr(database, 'returning_clause', returning)
+    JimengImg2VideoTask.create(prompt='已有任务')
+    rows = [{'prompt': f'任务{i}', 'second': i} for i in range(7)]
+
+    task_ids = bulk_create(JimengImg2VideoTask, rows, chunk_size=3)
+
+    assert len(task_ids) == len(rows) == len(set(task_ids))
+    prompts = dict(JimengImg2VideoTask.select(JimengImg2VideoTask.id, JimengImg2VideoTask.prompt).tuples())
+    assert [prompts[task_id] for task_id in task_ids] == [row['prompt'] for row in rows]
+
+def test_empty_rows(database):
+    assert bulk_create(JimengImg2VideoTask, []) == []
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""批量下载任务继续下载测试"""
+
+import functools
+import json
+import os
+import threading
+import time
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+from backend.core.download_jobs import DownloadJobManager, DownloadJobError, batch_folder_name
+from backend.models.download_models import DownloadJob
+
+@pytest.fixture
+def file_server(tmp_path):
+    """提供 a.bin / b.bin 的本地 HTTP 服务"""
+    root = tmp_path / 'server'
+    root.mkdir()
+    (root / 'a.bin').write_bytes(b'a' * 1000)
+    (root / 'b.bin').write_bytes(b'b' * 2000)
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(root))
+    handler.log_message = lambda *args: None
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+def _wait_finished(manager, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get_job(job_id)
+        if job['status'] not in ('pending', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(manager.get_job(job_id))
+
+def test_resume_interrupted_job_reuses_target_dir(database, file_server, tmp_path):
+    items = [{'url': f'{file_server}/a.bin', 'filename': 'a.bin'},
+             {'url': f'{file_server}/b.bin', 'filename': 'b.bin'}]
+    job = DownloadJob.create(job_type='text2img', status='running', total_files=2,
+                             items=json.dumps(items))
+    target_dir = tmp_path / 'downloads' / batch_folder_name('jimeng_images', job)
+    target_dir.mkdir(parents=True)
+    job.target_dir = str(target_dir)
+    job.save()
+    # 上次运行已完成 a.bin，b.bin 只写了一部分
+    (target_dir / 'a.bin').write_bytes(b'a' * 1000)
+    (target_dir / 'b.bin.part').write_bytes(b'b' * 500)
+
+    manager = DownloadJobManager(save_interval=0)
+    assert manager.get_job(job.id)['status'] == 'interrupted'
+    assert manager.get_job(job.id)['resumable']
+
+    manager.resume_job(job.id)
+    data = _wait_finished(manager, job.id)
+    assert data['status'] == 'completed'
+    assert data['files_done'] == 2 and data['files_failed'] == 0
+    assert data['target_dir'] == str(target_dir)
+    assert (target_dir / 'b.bin').read_bytes() == b'b' * 2000
+    assert not (target_dir / 'b.bin.part').exists()
+    assert sorted(os.listdir(tmp_path / 'downloads')) == [target_dir.name]
+
+    with pytest.raises(DownloadJobError):
+        manager.resume_job(job.id)
+
+def test_resume_requires_target_dir(database):
+    job = DownloadJob.create(job_type='img2video', status='cancelled', items='[]')
+    manager = DownloadJobManager(save_interval=0)
+    assert not manager.get_job(job.id)['resumable']
+    with pytest.raises(DownloadJobError):
+        manager.resume_job(job.id)
+    with pytest.raises(DownloadJobError):
+        manager.resume_job(job.id + 100)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""服务端目录解析测试"""
+
+import pytest
+
+from backend.utils import folder_dialog
+
+@pytest.fixture
+def export_root(tmp_path, monkeypatch):
+    root = tmp_path / 'exports'
+    root.mkdir()
+    monkeypatch.setattr(folder_dialog, 'EXPORT_ROOT', str(root))
+    monkeypatch.setattr(folder_dialog, 'FOLDER_DIALOG_ENABLED', True)
+    return root
+
+@pytest.mark.parametrize('headless, expect_dialog', [
+    (True, False), ('true', False), ('1', False), ('yes', False), ('On', False),
+    (False, True), ('false', True), ('0', True), ('no', True), ('', True), (None, True),
+])
+def test_headless_flag_is_parsed_as_boolean(export_root, headless, expect_dialog):
+    result = folder_dialog.get_server_dir({'headless': headless})
+    if expect_dialog:
+        assert result is None
+    else:
+        assert result == str(export_root.resolve())
+
+def test_relative_path_resolves_inside_export_root(export_root):
+    assert folder_dialog.resolve_server_dir('batch/2026') == str((export_root / 'batch' / '2026').resolve())
+    assert folder_dialog.resolve_server_dir() == str(export_root.resolve())
+
+@pytest.mark.parametrize('path', ['..', '../outside', 'batch/../../outside', '/etc', '/'])
+def test_paths_outside_export_root_are_rejected(export_root, path):
+    with pytest.raises(folder_dialog.ServerDirError):
+        folder_dialog.resolve_server_dir(path)
+
+def test_sibling_with_common_prefix_is_rejected(export_root):
+    # exports-other 与 exports 有相同的字符串前缀，但不在 EXPORT_ROOT 内
+    sibling = export_root.parent / f'{export_root.name}-other'
+    sibling.mkdir()
+    with pytest.raises(folder_dialog.ServerDirError):
+        folder_dialog.resolve_server_dir(str(sibling))
+
+def test_symlink_escaping_export_root_is_rejected(export_root, tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (export_root / 'link').symlink_to(outside, target_is_directory=True)
+    with pytest.raises(folder_dialog.ServerDirError):
+        folder_dialog.resolve_server_dir('link')
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""内容寻址图片存储测试"""
+
+import os
+
+import pytest
+
+from backend.models.image_store_models import StoredImage
+from backend.utils.image_store import ImageStore
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 100
+
+@pytest.fixture
+def store(database, tmp_path):
+    return ImageStore(root=str(tmp_path / 'store'), link_dir=str(tmp_path / 'imported'))
+
+@pytest.fixture
+def upload(tmp_path):
+    upload_dir = tmp_path / 'uploads'
+    upload_dir.mkdir()
+
+    def make(name='a.png', data=PNG):
+        path = upload_dir / name
+        path.write_bytes(data)
+        return str(path)
+    return make
+
+def _store_files(store):
+    return sorted(name for _, _, names in os.walk(store.root) for name in names)
+
+def test_put_file_move_removes_source_after_commit(store, upload):
+    source = upload()
+    with store.atomic():
+        target = store.put_file(source, move=True)
+        # 提交前源文件保留
+        assert os.path.exists(source)
+    assert not os.path.exists(source)
+    assert open(target, 'rb').read() == PNG
+    assert StoredImage.get().ref_count == 1
+
+def test_rollback_keeps_upload_and_removes_new_store_file(store, upload):
+    source = upload()
+    with pytest.raises(RuntimeError):
+        with store.atomic():
+            store.put_file(source, move=True)
+            raise RuntimeError('创建任务失败')
+    assert os.path.exists(source)
+    assert _store_files(store) == []
+    assert StoredImage.select().count() == 0
+
+def test_rollback_keeps_existing_store_file(store, upload):
+    target = store.put_file(upload('a.png'))
+    with pytest.raises(RuntimeError):
+        with store.atomic():
+            store.put_file(upload('b.png'), move=True)
+            raise RuntimeError('创建任务失败')
+    assert os.path.exists(target)
+    assert StoredImage.get().ref_count == 1
+
+def test_release_deferred_until_commit(store, upload):
+    target = store.put_file(upload())
+    with pytest.raises(RuntimeError):
+        with store.atomic():
+            store.release_paths([target])
+            raise RuntimeError('删除任务失败')
+    assert os.path.exists(target)
+    assert StoredImage.get().ref_count == 1
+
+def test_import_rollback_removes_hard_links(store, upload):
+    sources = [upload('a.png'), upload('b.png', PNG + b'1')]
+    with pytest.raises(RuntimeError):
+        with store.atomic():
+            paths = store.import_files(sources, 'link')
+            assert all(store.is_link_path(path) for path in paths)
+            raise RuntimeError('创建任务失败')
+    assert not os.path.exists(store.link_dir) or os.listdir(store.link_dir) == []
+    assert all(os.path.exists(source) for source in sources)
+
+    with store.atomic():
+        paths = store.import_files(sources, 'link')
+    assert all(os.path.exists(path) for path in paths)
+
+def test_release_deletes_file_when_last_reference_goes(store, upload):
+    target = store.put_file(upload('a.png'))
+    assert store.put_file(upload('b.png')) == target
+    assert StoredImage.get().ref_count == 2
+
+    # 还有其他任务引用时只减少引用数
+    assert store.release_paths([target]) == []
+    assert os.path.exists(target)
+    assert StoredImage.get().ref_count == 1
+
+    assert store.release_paths([target]) == [(target, len(PNG))]
+    assert not os.path.exists(target)
+    assert StoredImage.select().count() == 0
+
+def test_release_same_path_twice_in_one_call(store, upload):
+    target = store.put_file(upload('a.png'))
+    store.put_file(upload('b.png'))
+    assert store.release_paths([target, target]) == [(target, len(PNG))]
+    assert StoredImage.select().count() == 0
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""数据库迁移与查询计划检查"""
+
+import pytest
+from backend.models import migrations
+
+ROUTE_QUERY_NAMES = sorted(migrations.get_route_queries())
+
+def test_migrations_applied_once(database):
+    assert migrations.get_current_version() == migrations.MIGRATIONS[-1][0]
+    assert migrations.run_migrations() == []
+
+def test_migration_versions_are_sequential():
+    versions = [version for version, _, _ in migrations.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+@pytest.mark.parametrize('name', ROUTE_QUERY_NAMES)
+def test_route_query_uses_index(database, name):
+    query = migrations.get_route_queries()[name]
+    plan = migrations.explain_query(query)
+    assert migrations._plan_uses_index(plan), plan
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""游标分页测试"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models.models import JimengImg2VideoTask
+from backend.utils.pagination import encode_cursor, decode_cursor, keyset_paginate
+
+def test_cursor_round_trip():
+    create_at = datetime(2026, 10, 18, 9, 30, 15, 123456)
+    cursor = encode_cursor(create_at, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (create_at, 42)
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(datetime(2026, 1, 1), 1)[:-3], ''])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def _all_pages(page_size):
+    pages = []
+    cursor = None
+    while True:
+        rows, cursor = keyset_paginate(JimengImg2VideoTask.select(), JimengImg2VideoTask, cursor, page_size)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+def test_equal_create_at_is_ordered_by_id(database):
+    same_time = datetime(2026, 10, 18, 12, 0, 0)
+    older = JimengImg2VideoTask.create(create_at=same_time - timedelta(seconds=1)).id
+    tied = [JimengImg2VideoTask.create(create_at=same_time).id for _ in range(5)]
+    newer = JimengImg2VideoTask.create(create_at=same_time + timedelta(seconds=1)).id
+
+    pages = _all_pages(page_size=2)
+    # 同一时间的任务按ID倒序排列，跨页时不重复也不遗漏
+    assert [task_id for page in pages for task_id in page] == [newer, *sorted(tied, reverse=True), older]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+
+def test_exact_page_size_has_no_next_cursor(database):
+    for _ in range(2):
+        JimengImg2VideoTask.create()
+    rows, cursor = keyset_paginate(JimengImg2VideoTask.select(), JimengImg2VideoTask, None, 2)
+    assert len(rows) == 2 and cursor is None
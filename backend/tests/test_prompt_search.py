@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""提示词检索排序测试"""
+
+from backend.utils.prompt_search import PromptSearchIndex
+from backend.utils.prompt_workbook import PromptRecord
+
+def _index(*items):
+    return PromptSearchIndex([PromptRecord(row, name, '', prompt) for row, (name, prompt) in enumerate(items, start=2)])
+
+def _names(index, query, **kwargs):
+    return [prompt.name for prompt in index.search(query, **kwargs)[1]]
+
+def test_ranking_by_match_kind():
+    index = _index(
+        ('夜晚的猫', '城市'),       # 名称包含
+        ('风景', '一只猫在草地'),    # 提示词包含
+        ('猫咪', '睡觉'),           # 名称前缀
+        ('猫', '坐着'),             # 名称完全相同
+        ('肖像', '猫和狗'),         # 提示词前缀
+        ('可爱 猫', '插画'),        # 名称中词的前缀
+        ('无关', '草地'),
+    )
+    assert _names(index, '猫') == ['猫', '猫咪', '可爱 猫', '夜晚的猫', '肖像', '风景']
+
+def test_all_terms_must_match_and_scores_add_up():
+    index = _index(('草地风景', '一只猫'), ('猫', '在屋顶'), ('猫', '在草地上'))
+    assert _names(index, '猫 草地') == ['猫', '草地风景']
+
+def test_ties_keep_original_order_and_paginate():
+    index = _index(*[(f'图{i}', '日落海边') for i in range(5)])
+    total, page = index.search('海边', page=2, per_page=2)
+    assert total == 5
+    assert [prompt.name for prompt in page] == ['图2', '图3']
+
+def test_full_width_and_case_are_normalized():
+    index = _index(('Ｃａｔ Portrait', ''), ('dog', 'CAT'))
+    assert _names(index, 'cat') == ['Ｃａｔ Portrait', 'dog']
+
+def test_empty_query_returns_everything_and_missing_term_nothing():
+    index = _index(('a', 'x'), ('b', 'y'))
+    assert index.search('')[0] == 2
+    assert index.search('不存在') == (0, [])
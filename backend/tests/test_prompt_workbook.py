@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""提示词 Excel 流式读取测试"""
+
+import io
+
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as ExcelImage
+from PIL import Image
+
+from backend.utils.prompt_workbook import read_prompt_rows, read_image_anchors, open_media
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, format='PNG')
+    return buffer
+
+def _workbook(tmp_path):
+    wb = Workbook()
+    wb.create_sheet('其他')
+    ws = wb.create_sheet('提示词')
+    wb.active = wb.index(ws)
+    ws.append(['name', 'image', 'prompt'])
+    ws.append(['无图', '', '第一条'])
+    ws.append(['有图', '', '第二条'])
+    ws.append([None, None, None])
+    ws.append(['文件图', 'a.png', '第四条'])
+    ws.add_image(ExcelImage(_png('red')), 'B3')
+    path = tmp_path / 'prompt.xlsx'
+    wb.save(path)
+    return path
+
+def test_rows_keep_excel_row_numbers(tmp_path):
+    records, sheet_path = read_prompt_rows(_workbook(tmp_path))
+    assert [(record.row, record.name, record.image_filename) for record in records] == [
+        (2, '无图', ''), (3, '有图', ''), (5, '文件图', 'a.png')]
+    assert sheet_path == 'xl/worksheets/sheet3.xml'
+
+def test_image_anchor_maps_to_excel_row(tmp_path):
+    excel_file = _workbook(tmp_path)
+    _, sheet_path = read_prompt_rows(excel_file)
+    images = read_image_anchors(excel_file, sheet_path)
+    # 锚在 B3 的图片（锚点行号 2，从0开始）对应 Excel 第3行
+    assert list(images) == [3]
+    with open_media(excel_file) as archive:
+        assert archive.read(images[3]).startswith(b'\x89PNG')
+
+def test_sheet_without_drawing_has_no_images(tmp_path):
+    wb = Workbook()
+    wb.active.append(['name', 'image', 'prompt'])
+    path = tmp_path / 'plain.xlsx'
+    wb.save(path)
+    _, sheet_path = read_prompt_rows(path)
+    assert read_image_anchors(path, sheet_path) == {}
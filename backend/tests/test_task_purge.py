@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""任务批量清理测试"""
+
+import os
+
+import pytest
+
+from backend.core import task_purge
+from backend.core.task_purge import FileReclaimer, purge_tasks
+from backend.models.models import JimengImg2VideoTask
+from backend.utils.image_store import ImageStore
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 100
+
+@pytest.fixture
+def reclaimer(database, tmp_path, monkeypatch):
+    store = ImageStore(root=str(tmp_path / 'store'), link_dir=str(tmp_path / 'imported'))
+    reclaimer = FileReclaimer(batch_size=2, history_size=2)
+    monkeypatch.setattr(task_purge, 'image_store', store)
+    monkeypatch.setattr(task_purge, 'file_reclaimer', reclaimer)
+    reclaimer.store = store
+    return reclaimer
+
+def _stored_image(store, tmp_path, name, data):
+    source = tmp_path / name
+    source.write_bytes(data)
+    return store.put_file(str(source), move=True)
+
+def test_purge_reports_reclaimed_bytes(reclaimer, tmp_path):
+    shared = _stored_image(reclaimer.store, tmp_path, 'a.png', PNG)
+    single = _stored_image(reclaimer.store, tmp_path, 'b.png', PNG + b'1')
+    kept = JimengImg2VideoTask.create(image_path=reclaimer.store.put_file(shared))
+    task_ids = [JimengImg2VideoTask.create(image_path=path).id for path in (shared, single)]
+
+    deleted_count, purge_id = purge_tasks(JimengImg2VideoTask, task_ids, chunk_size=1)
+    reclaimer.wait()
+
+    assert deleted_count == 2
+    purge = reclaimer.get_purge(purge_id)
+    assert purge['status'] == 'completed'
+    assert purge['files_queued'] == 2 and purge['pending'] == 0
+    # 仍被其他任务引用的图片不删除，只回收 single
+    assert purge['files_removed'] == 1
+    assert purge['bytes_reclaimed'] == len(PNG) + 1
+    assert os.path.exists(kept.image_path) and not os.path.exists(single)
+
+def test_purge_without_targets_returns_no_purge_id(reclaimer):
+    assert purge_tasks(JimengImg2VideoTask) == (0, None)
+
+def test_purge_history_is_bounded(reclaimer):
+    purge_ids = [reclaimer.start_purge() for _ in range(3)]
+    assert reclaimer.get_purge(purge_ids[0]) is None
+    assert reclaimer.get_purge(purge_ids[-1])['status'] == 'completed'
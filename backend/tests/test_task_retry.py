@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""批量重试测试"""
+
+from datetime import datetime
+
+import pytest
+
+from backend.core.task_retry import RETRY_RESET_FIELDS, retry_tasks
+from backend.models.models import JimengImg2VideoTask
+
+OUTPUT_VALUES = {
+    'account_id': 7,
+    'image1': 'a.png', 'image2': 'b.png', 'image3': 'c.png', 'image4': 'd.png',
+    'video_url': 'https://example.com/v.mp4',
+    'start_time': datetime(2026, 10, 18, 8, 0),
+}
+
+def _create(model, status):
+    fields = model._meta.fields
+    return model.create(status=status, **{name: value for name, value in OUTPUT_VALUES.items() if name in fields})
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'select'])
+@pytest.mark.parametrize('model', list(RETRY_RESET_FIELDS), ids=lambda model: model.__name__)
+def test_retry_resets_fields_per_model(database, monkeypatch, model, returning):
+    monkeypatch.setattr(database, 'returning_clause', returning)
+    failed = _create(model, status=3)
+    running = _create(model, status=1)
+    dispatched = []
+
+    retried_ids = retry_tasks(model, dispatch=dispatched.append)
+
+    assert retried_ids == [failed.id]
+    assert dispatched == [[failed.id]]
+    failed = model.get_by_id(failed.id)
+    assert failed.status == 0
+    for name in RETRY_RESET_FIELDS[model]:
+        assert getattr(failed, name) is None, name
+    # 不在重试状态中的任务保持不变
+    running = model.get_by_id(running.id)
+    assert running.status == 1 and running.account_id == OUTPUT_VALUES['account_id']
+
+def test_retry_by_ids_respects_conditions(database):
+    model = JimengImg2VideoTask
+    tasks = [_create(model, status=3) for _ in range(3)]
+    model.update(is_empty_task=True).where(model.id == tasks[0].id).execute()
+
+    retried_ids = retry_tasks(model, [task.id for task in tasks], conditions=[model.is_empty_task == False],
+                              chunk_size=1)
+
+    assert retried_ids == [tasks[1].id, tasks[2].id]
+    assert model.get_by_id(tasks[0].id).status == 3
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""缩略图进程池启动检查和提示词库重新加载测试"""
+
+import sys
+import types
+import threading
+
+from backend.utils import thumbnail_store
+from backend.utils.prompt_cache import PromptLibraryCache
+
+def _main_module(monkeypatch, tmp_path, source):
+    main_path = tmp_path / 'main.py'
+    main_path.write_text(source, encoding='utf-8')
+    module = types.ModuleType('__main__')
+    module.__file__ = str(main_path)
+    monkeypatch.setitem(sys.modules, '__main__', module)
+
+def test_guarded_main_uses_process_pool(monkeypatch, tmp_path):
+    _main_module(monkeypatch, tmp_path, "app = None\nif __name__ == '__main__':\n    app.run()\n")
+    context, reason = thumbnail_store.process_pool_context()
+    assert reason is None
+    assert context.get_start_method() in ('forkserver', 'spawn')
+
+def test_unguarded_main_falls_back_to_threads(monkeypatch, tmp_path):
+    _main_module(monkeypatch, tmp_path, "app = None\napp.run()\n")
+    context, reason = thumbnail_store.process_pool_context()
+    assert context is None and '__main__' in reason
+
+    store = thumbnail_store.ThumbnailStore(root=str(tmp_path / 'thumbs'), max_workers=1)
+    assert store._get_pool().__class__.__name__ == 'ThreadPoolExecutor'
+
+def test_non_python_executable_is_rejected(tmp_path):
+    executable = tmp_path / 'uwsgi'
+    executable.write_bytes(b'')
+    context, reason = thumbnail_store.process_pool_context(str(executable))
+    assert context is None and 'PROMPT_THUMBNAIL_PYTHON' in reason
+
+def test_reload_cancels_previews_of_old_library(tmp_path):
+    platform_path = tmp_path / 'jimeng'
+    platform_path.mkdir()
+    excel_file = platform_path / 'prompt.xlsx'
+    excel_file.write_bytes(b'v1')
+    events = []
+
+    def loader(platform):
+        events.append(threading.Event())
+        return {'success': True, 'message': '', 'data': [], 'cancel_event': events[-1]}
+
+    cache = PromptLibraryCache(tmp_path, loader)
+    cache.get('jimeng')
+    excel_file.write_bytes(b'v2-changed')
+    cache.get('jimeng')
+    assert events[0].is_set() and not events[1].is_set()
+
+    cache.invalidate('jimeng')
+    assert events[1].is_set()
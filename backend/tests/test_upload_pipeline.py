@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""批量上传处理测试"""
+
+import io
+import os
+
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from backend.utils.upload_pipeline import upload_request, process_uploads
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 2048
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    return str(tmp_path / 'uploads')
+
+@pytest.fixture
+def client(upload_dir):
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
+    app.config['MAX_FORM_PARTS'] = 20
+    seen = {}
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        try:
+            with upload_request(request, upload_dir) as (form, files):
+                storages = files.getlist('images')
+                seen['submitted'] = [hasattr(storage, 'upload_future') for storage in storages]
+                results = process_uploads(storages, upload_dir)
+                seen['on_disk'] = [os.path.exists(result['path']) for result in results if result['path']]
+                return jsonify({'form': form.to_dict(), 'results': results})
+        except RequestEntityTooLarge:
+            return jsonify({'success': False}), 413
+
+    client = app.test_client()
+    client.seen = seen
+    return client
+
+def test_parts_are_processed_as_they_arrive(client, upload_dir):
+    data = {
+        'model': 'Video 3.0',
+        'images': [(io.BytesIO(PNG), 'a.png'), (io.BytesIO(b'not an image'), 'b.png'),
+                   (io.BytesIO(b''), ''), (io.BytesIO(PNG + b'1'), 'c.png')],
+    }
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['form'] == {'model': 'Video 3.0'}
+    results = body['results']
+    assert [result['index'] for result in results] == [0, 1, 3]
+    assert results[0]['sha256'] and results[0]['error'] is None
+    assert results[1]['error']
+    # 文件部分在请求体解析过程中已提交处理（空文件名的表单项除外）
+    assert client.seen['submitted'] == [True, True, False, True]
+    assert client.seen['on_disk'] == [True, True]
+    # 退出 with 块后没有放入存储的文件和临时文件全部删除
+    assert os.listdir(upload_dir) == []
+
+def test_limits_raise_413_and_clean_up(client, upload_dir):
+    too_big = {'images': [(io.BytesIO(PNG * 40), 'a.png')]}
+    assert client.post('/upload', data=too_big, content_type='multipart/form-data').status_code == 413
+    too_many = {'images': [(io.BytesIO(PNG[:64]), f'{i}.png') for i in range(30)]}
+    assert client.post('/upload', data=too_many, content_type='multipart/form-data').status_code == 413
+    assert os.listdir(upload_dir) == []
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+账号显示名缓存
+
+任务列表需要显示账号昵称，按页批量查询缺失的账号并缓存在进程内，
+避免每个任务单独查询一次账号表。账号新增、删除时需要清除缓存。
+"""
+
+import threading
+from backend.models.models import QingyingAccount
+
+class AccountNameCache:
+    """按账号ID缓存账号显示名"""
+
+    def __init__(self, model, name_field):
+        self.model = model
+        self.name_field = name_field
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, account_ids):
+        """批量获取账号显示名，返回 {account_id: name}，不存在的账号不在结果中"""
+        account_ids = {account_id for account_id in account_ids if account_id}
+        with self._lock:
+            result = {account_id: self._names[account_id] for account_id in account_ids if account_id in self._names}
+        missing = account_ids - set(result)
+        if missing:
+            # 一次查询补齐缓存中没有的账号
+            query = (self.model
+                     .select(self.model.id, self.name_field)
+                     .where(self.model.id.in_(list(missing)))
+                     .tuples())
+            loaded = {account_id: name for account_id, name in query}
+            with self._lock:
+                self._names.update(loaded)
+            result.update(loaded)
+        return result
+
+    def invalidate(self, account_id=None):
+        """清除指定账号（为空时清除全部）的缓存"""
+        with self._lock:
+            if account_id is None:
+                self._names.clear()
+            else:
+                self._names.pop(account_id, None)
+
+# 清影账号昵称缓存
+qingying_nickname_cache = AccountNameCache(QingyingAccount, QingyingAccount.nickname)
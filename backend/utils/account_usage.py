@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+账号使用量统计
+
+读取迁移 add_account_usage_counters 建立的计数表（由任务表上的触发器维护），
+不再在请求时对任务表执行 GROUP BY 统计。
+"""
+
+from datetime import date
+from backend.models.models import JimengText2ImgTask, JimengImg2VideoTask, JimengDigitalHumanTask
+from backend.models.usage_models import AccountDailyUsage, AccountTotalUsage
+
+# 任务类型与任务表的对应关系
+USAGE_TASK_MODELS = {
+    'text2img': JimengText2ImgTask,
+    'img2video': JimengImg2VideoTask,
+    'digital_human': JimengDigitalHumanTask
+}
+
+# 每个账号的每日限额
+DAILY_LIMITS = {
+    'text2img': 10,
+    'img2video': 2,
+    'digital_human': 1
+}
+
+def _collect(query):
+    """把计数行合并为 {account_id: {task_type: count}}"""
+    usage = {}
+    for row in query.namedtuples():
+        if row.task_type in USAGE_TASK_MODELS:
+            usage.setdefault(row.account_id, empty_usage())[row.task_type] = row.usage_count
+    return usage
+
+def get_today_usage_by_account(usage_date=None):
+    """读取所有账号今日的使用次数，返回 {account_id: {task_type: count}}
+
+    没有使用记录的账号不会出现在结果中，调用方应使用 empty_usage() 作为默认值。
+    """
+    usage_date = usage_date or date.today()
+    return _collect(AccountDailyUsage
+                    .select(AccountDailyUsage.account_id, AccountDailyUsage.task_type,
+                            AccountDailyUsage.usage_count)
+                    .where(AccountDailyUsage.usage_date == usage_date))
+
+def get_total_usage_by_account():
+    """读取所有账号的累计使用次数，返回 {account_id: {task_type: count}}"""
+    return _collect(AccountTotalUsage
+                    .select(AccountTotalUsage.account_id, AccountTotalUsage.task_type,
+                            AccountTotalUsage.usage_count))
+
+def empty_usage():
+    """返回全部为0的使用次数字典"""
+    return {task_type: 0 for task_type in USAGE_TASK_MODELS}
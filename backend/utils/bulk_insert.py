@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+批量插入
+
+批量创建任务时在同一个事务中分块执行 insert_many，整批只提交（fsync）一次，
+代替逐行 Model.create()（每行一个事务）。
+
+    task_ids = bulk_create(JimengImg2VideoTask, rows)
+
+rows 为字段字典列表，各行的键需一致，未提供的字段使用模型默认值。
+"""
+
+from peewee import chunked
+
+# SQLite 单条语句的参数上限（旧版本为 999）
+SQLITE_MAX_VARIABLES = 999
+
+def _chunk_size(model, rows):
+    """按参数上限计算每块行数（列数包含使用默认值的字段）"""
+    columns = set(rows[0]) | {field.name for field in model._meta.fields.values() if field.default is not None}
+    return max(1, SQLITE_MAX_VARIABLES // max(1, len(columns)))
+
+def bulk_create(model, rows, chunk_size=None):
+    """在一个事务中分块插入多行，返回新记录的ID列表（与 rows 顺序一致）"""
+    rows = list(rows)
+    if not rows:
+        return []
+    database = model._meta.database
+    chunk_size = chunk_size or _chunk_size(model, rows)
+    primary_key = model._meta.primary_key
+    ids = []
+
+    with database.atomic():
+        for chunk in chunked(rows, chunk_size):
+            if getattr(database, 'returning_clause', False):
+                # SQLite 3.35+ 支持 RETURNING，直接取回生成的ID
+                query = model.insert_many(chunk).returning(primary_key).tuples()
+                ids.extend(row[0] for row in query.execute())
+            else:
+                # 多行 INSERT 在同一事务（持有写锁）中分配连续的 rowid，
+                # 返回值为最后一行的ID，由此推算整块的ID
+                last_id = model.insert_many(chunk).execute()
+                ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+    return ids
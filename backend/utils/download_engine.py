@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+批量下载引擎
+
+- 有界线程池并发下载，共享带连接池的 requests.Session（keep-alive）
+- 按块流式写入磁盘（先写 .part 临时文件，完成后重命名），不在内存中保存整个文件
+- 存在 .part 文件时通过 Range 请求断点续传（416 时按 Content-Range 校验 .part 是否完整），
+  目标目录中已下载完成的文件直接跳过，同一个下载任务可以在原目录多次继续
+- 连接错误、超时和 5xx 按指数退避重试，4xx 直接失败
+- 通过 DownloadProgress 对象报告整批进度（字节数、文件数、失败明细、速率）
+"""
+
+import os
+import time
+import threading
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from backend.config.settings import (
+    DOWNLOAD_MAX_WORKERS, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_MAX_RETRIES,
+    DOWNLOAD_RETRY_BACKOFF, DOWNLOAD_TIMEOUT, DOWNLOAD_RATE_WINDOW
+)
+
+class DownloadCancelled(Exception):
+    """下载批次已被取消"""
+
+class DownloadProgress:
+    """一个下载批次的进度（线程安全）"""
+
+    def __init__(self, total_files=0, on_progress=None, rate_window=DOWNLOAD_RATE_WINDOW):
+        self.total_files = total_files
+        self.files_done = 0
+        self.files_failed = 0
+        self.bytes_done = 0
+        self.failures = []
+        self.status = 'pending'  # pending / running / completed / cancelled / failed
+        self.started_at = None
+        self.finished_at = None
+        self.on_progress = on_progress
+        self.rate_window = rate_window
+        self._samples = deque()  # (时间, 累计字节数)，只保留滑动窗口内的采样
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def start(self):
+        with self._lock:
+            self.status = 'running'
+            self.started_at = time.time()
+            self._samples.append((self.started_at, 0))
+        self._notify()
+
+    def add_bytes(self, size):
+        with self._lock:
+            self.bytes_done += size
+            now = time.time()
+            self._samples.append((now, self.bytes_done))
+            self._trim_samples(now)
+
+    def _trim_samples(self, now):
+        """丢弃窗口外的采样（保留窗口起点之前的最后一个采样作为基准）"""
+        while len(self._samples) > 1 and self._samples[1][0] <= now - self.rate_window:
+            self._samples.popleft()
+
+    def file_done(self):
+        with self._lock:
+            self.files_done += 1
+        self._notify()
+
+    def file_failed(self, filename, error):
+        with self._lock:
+            self.files_failed += 1
+            self.failures.append({'filename': filename, 'error': error})
+        self._notify()
+
+    def finish(self, status=None):
+        with self._lock:
+            if status:
+                self.status = status
+            elif self.cancelled:
+                self.status = 'cancelled'
+            else:
+                self.status = 'completed'
+            self.finished_at = time.time()
+        self._notify()
+
+    @property
+    def rate(self):
+        """下载速率（字节/秒）：进行中为最近 rate_window 秒的速率，结束后为整个批次的平均速率"""
+        with self._lock:
+            return self._rate()
+
+    def _rate(self):
+        if not self.started_at:
+            return 0
+        if self.finished_at:
+            elapsed = self.finished_at - self.started_at
+            return self.bytes_done / elapsed if elapsed > 0 else 0
+        now = time.time()
+        self._trim_samples(now)
+        since, bytes_since = self._samples[0]
+        elapsed = now - since
+        return (self.bytes_done - bytes_since) / elapsed if elapsed > 0 else 0
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'status': self.status,
+                'total_files': self.total_files,
+                'files_done': self.files_done,
+                'files_failed': self.files_failed,
+                'bytes_done': self.bytes_done,
+                'rate': round(self._rate(), 1),
+                'failures': list(self.failures),
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+    def _notify(self):
+        if self.on_progress:
+            try:
+                self.on_progress(self)
+            except Exception as e:
+                print(f"下载进度回调失败: {str(e)}")
+
+def create_session(pool_size=DOWNLOAD_MAX_WORKERS):
+    """创建带连接池的 Session，连接数与并发数一致"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _is_retryable(error):
+    """只重试连接错误、超时和服务端错误（5xx），4xx 重试也不会成功"""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+def _range_total(response):
+    """从 416 响应的 Content-Range（bytes */总大小）取出文件总大小，没有时返回 None"""
+    content_range = response.headers.get('Content-Range', '')
+    total = content_range.rpartition('/')[2].strip()
+    return int(total) if total.isdigit() else None
+
+def download_file(session, url, file_path, progress=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                  max_retries=DOWNLOAD_MAX_RETRIES, backoff=DOWNLOAD_RETRY_BACKOFF, timeout=DOWNLOAD_TIMEOUT):
+    """流式下载单个文件，支持断点续传和失败重试，返回写入的字节数"""
+    part_path = file_path + '.part'
+    written = 0
+    attempt = 0
+    while True:
+        if progress and progress.cancelled:
+            raise DownloadCancelled()
+        try:
+            headers = {}
+            resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if resume_from:
+                headers['Range'] = f'bytes={resume_from}-'
+
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416:
+                    if _range_total(response) == resume_from:
+                        # .part 与服务器上的文件大小一致，已是完整文件
+                        break
+                    # 大小不一致或无法确认（文件已变化或 .part 损坏），删除 .part 从头下载
+                    print(f"断点续传范围无效，重新下载 {os.path.basename(file_path)}")
+                    os.remove(part_path)
+                    if progress:
+                        progress.add_bytes(-written)
+                    written = 0
+                    continue
+                response.raise_for_status()
+                if resume_from and response.status_code != 206:
+                    # 服务器不支持 Range，从头下载
+                    resume_from = 0
+                    if progress:
+                        progress.add_bytes(-written)
+                    written = 0
+
+                with open(part_path, 'ab' if resume_from else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if progress and progress.cancelled:
+                            raise DownloadCancelled()
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+                            if progress:
+                                progress.add_bytes(len(chunk))
+            break
+
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries or not _is_retryable(e):
+                raise
+            wait = backoff * (2 ** (attempt - 1))
+            print(f"下载失败，{wait:.1f}秒后第{attempt}次重试 {os.path.basename(file_path)}: {str(e)}")
+            time.sleep(wait)
+
+    os.replace(part_path, file_path)
+    return written
+
+def download_batch(items, target_dir, progress=None, max_workers=DOWNLOAD_MAX_WORKERS):
+    """并发下载一批文件
+
+    items 为 [{'url': ..., 'filename': ...}] 列表，文件保存到 target_dir 下。
+    返回 DownloadProgress。
+    """
+    progress = progress or DownloadProgress()
+    progress.total_files = len(items)
+    os.makedirs(target_dir, exist_ok=True)
+    session = create_session(max_workers)
+
+    def download_one(item):
+        if progress.cancelled:
+            return
+        file_path = os.path.join(target_dir, item['filename'])
+        if os.path.exists(file_path):
+            # 之前的尝试已下载完成（完成的文件由 .part 重命名得到，存在即完整）
+            progress.file_done()
+            return
+        try:
+            download_file(session, item['url'], file_path, progress)
+            progress.file_done()
+        except DownloadCancelled:
+            pass
+        except Exception as e:
+            progress.file_failed(item['filename'], str(e))
+            print(f"下载失败 {item['filename']}: {str(e)}")
+
+    progress.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download') as executor:
+            list(executor.map(download_one, items))
+        progress.finish()
+    except Exception as e:
+        print(f"批量下载过程出错: {str(e)}")
+        progress.finish('failed')
+    finally:
+        session.close()
+
+    print(f"批量下载完成: 成功 {progress.files_done} 个，失败 {progress.files_failed} 个，"
+          f"共 {progress.bytes_done} 字节，平均 {progress.rate / 1024:.1f}KB/s")
+    return progress
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+文件夹选择
+
+桌面环境下通过系统原生对话框（osascript / PowerShell / zenity）选择文件夹；
+无图形界面的服务器可以在请求中直接传入服务端目录（或 headless=true 使用 EXPORT_ROOT），
+也可以通过环境变量 SHUKEAI_FOLDER_DIALOG=0 关闭对话框，任务立即开始，不再等待对话框超时。
+
+请求传入的目录只能位于 EXPORT_ROOT 内（解析 .. 和符号链接后校验），否则抛出 ServerDirError。
+"""
+
+import os
+import platform
+import subprocess
+from backend.config.settings import FOLDER_DIALOG_ENABLED, FOLDER_DIALOG_TIMEOUT, EXPORT_ROOT
+
+def select_folder(prompt, fallback_dir=None, timeout=FOLDER_DIALOG_TIMEOUT):
+    """弹出系统原生文件夹选择对话框
+
+    返回选择的文件夹；用户取消或超时返回 None；对话框不可用或失败时返回 fallback_dir。
+    """
+    system = platform.system()
+    try:
+        if system == "Darwin":  # macOS
+            applescript = f'''
+            tell application "Finder"
+                activate
+                set selectedFolder to choose folder with prompt "{prompt}" default location (path to downloads folder)
+                return POSIX path of selectedFolder
+            end tell
+            '''
+            result = subprocess.run(['osascript', '-e', applescript], capture_output=True, text=True, timeout=timeout)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+            if result.returncode == 1:
+                print("用户取消了文件夹选择")
+                return None
+            print(f"文件选择器异常退出，返回码: {result.returncode}")
+
+        elif system == "Windows":  # Windows
+            ps_script = f"""
+            Add-Type -AssemblyName System.Windows.Forms
+            $folderBrowser = New-Object System.Windows.Forms.FolderBrowserDialog
+            $folderBrowser.Description = "{prompt}"
+            $folderBrowser.ShowNewFolderButton = $true
+            if ($folderBrowser.ShowDialog() -eq [System.Windows.Forms.DialogResult]::OK) {{
+                Write-Output $folderBrowser.SelectedPath
+            }}
+            """
+            result = subprocess.run(['powershell', '-Command', ps_script], capture_output=True, text=True, timeout=timeout)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+
+        else:  # Linux
+            result = subprocess.run([
+                'zenity', '--file-selection', '--directory', f'--title={prompt}'
+            ], capture_output=True, text=True, timeout=timeout)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+
+    except subprocess.TimeoutExpired:
+        print("文件选择器超时，用户可能没有响应")
+        return None
+    except Exception as e:
+        print(f"文件选择器失败: {str(e)}")
+
+    if fallback_dir:
+        print(f"文件选择器失败，使用默认目录: {fallback_dir}")
+    return fallback_dir
+
+class ServerDirError(ValueError):
+    """请求指定的服务端目录无效（不在 EXPORT_ROOT 内或缺少必填目录）"""
+
+def resolve_server_dir(path=None):
+    """解析服务端目录，相对路径基于 EXPORT_ROOT，为空时返回 EXPORT_ROOT
+
+    绝对路径同样必须位于 EXPORT_ROOT 内，解析后超出 EXPORT_ROOT 时抛出 ServerDirError。
+    """
+    root = os.path.realpath(EXPORT_ROOT)
+    resolved = os.path.realpath(os.path.join(root, os.path.expanduser(path))) if path else root
+    if resolved != root and os.path.commonpath([resolved, root]) != root:
+        raise ServerDirError(f'目录必须位于 {root} 内: {path}')
+    return resolved
+
+def is_truthy(value):
+    """解析请求中的布尔参数（JSON 布尔值或表单字符串 "1"/"true"/"yes"/"on"）"""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def get_server_dir(data, key='output_dir', required=False):
+    """获取请求指定的服务端目录
+
+    请求传入了 key 对应的目录、headless=true 或全局关闭了对话框时返回解析后的目录，
+    否则返回 None，表示需要弹出原生文件夹对话框。
+    required=True 时（导入）不弹对话框就必须传入目录，不会默认扫描整个 EXPORT_ROOT。
+    """
+    data = data or {}
+    path = data.get(key)
+    if not path and not is_truthy(data.get('headless')) and FOLDER_DIALOG_ENABLED:
+        return None
+    if not path and required:
+        raise ServerDirError(f'未弹出文件夹对话框时必须指定 {key}')
+    return resolve_server_dir(path)
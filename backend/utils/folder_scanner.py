@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+文件夹图片扫描
+
+用 os.scandir 递归遍历文件夹，每个子目录作为一个任务交给线程池并行扫描，
+扩展名符合的文件再读取文件头（只读前16字节，不解码图片）确认是有效图片。
+扫描结果以生成器方式边扫描边返回，导入可以分批创建任务，不必等整个目录树扫描完：
+
+    for image_paths in chunked(scan_images(folder_path), IMPORT_BATCH_SIZE):
+        bulk_create(...)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from backend.utils.image_types import is_allowed_image, read_image_format
+from backend.config.settings import SCAN_WORKERS
+
+class ScanStats:
+    """扫描统计"""
+
+    def __init__(self):
+        self.directories = 0
+        self.images = 0
+        self.invalid = 0  # 扩展名符合但文件头不是图片（损坏或伪装）
+        self.errors = 0  # 无法读取的目录
+
+    def to_dict(self):
+        return {
+            'directories': self.directories,
+            'images': self.images,
+            'invalid': self.invalid,
+            'errors': self.errors
+        }
+
+def _scan_directory(path, recursive):
+    """扫描单个目录，返回 (有效图片, 无效图片数, 子目录)"""
+    images = []
+    invalid = 0
+    subdirectories = []
+    with os.scandir(path) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subdirectories.append(entry.path)
+            elif entry.is_file() and is_allowed_image(entry.name):
+                if read_image_format(entry.path):
+                    images.append(entry.path)
+                else:
+                    invalid += 1
+    return images, invalid, subdirectories
+
+def scan_images(root, recursive=True, stats=None, max_workers=SCAN_WORKERS):
+    """扫描文件夹中的有效图片，边扫描边返回图片路径（生成器）"""
+    stats = stats if stats is not None else ScanStats()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='folder-scan') as executor:
+        pending = {executor.submit(_scan_directory, root, recursive): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    images, invalid, subdirectories = future.result()
+                except OSError as e:
+                    stats.errors += 1
+                    print(f"扫描目录失败 {path}: {str(e)}")
+                    continue
+                stats.directories += 1
+                stats.invalid += invalid
+                for subdirectory in subdirectories:
+                    pending[executor.submit(_scan_directory, subdirectory, recursive)] = subdirectory
+                for image_path in images:
+                    stats.images += 1
+                    yield image_path
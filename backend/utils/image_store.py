@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+内容寻址图片存储
+
+上传和导入的图片按 SHA-256 保存到 IMAGE_STORE_DIR/<前两位>/<sha256>.<扩展名>，
+相同内容的图片只保存一份，image_store 表记录每张图片被多少个任务引用：
+
+    image_path = image_store.put_file(uploaded_path, sha256, move=True)  # 引用 +1
+    image_store.release_paths([task.image_path for task in tasks])      # 引用 -1，归零时删除文件
+
+任务表的 image_path 直接保存存储路径，从文件名即可得到 SHA-256，任务表不需要新增字段。
+
+文件操作跟随 atomic() 事务：新放入存储的文件在回滚时删除，
+move=True 的源文件和引用归零的文件在最外层事务提交后才删除，回滚时上传的源文件保持不变。
+
+文件夹导入可以不复制数据（import_files 的 mode），一批图片的登记和任务创建在同一个事务中提交：
+
+    with image_store.atomic():
+        image_paths = image_store.import_files(source_paths, mode)
+        bulk_create(JimengImg2VideoTask, rows)
+
+
+    auto       同一文件系统时硬链接到 IMPORT_LINK_DIR，否则引用原文件（默认）
+    link       硬链接，跨文件系统时复制到存储
+    reference  直接引用原文件，记录大小和修改时间，重试前用 find_changed_references() 校验
+    copy       复制到内容寻址存储（去重）
+
+不在存储中的旧独立文件只在调用方指定的上传目录（untracked_dirs）中才会删除。
+"""
+
+import os
+import shutil
+import hashlib
+import uuid
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from peewee import fn, chunked, EXCLUDED
+from backend.models.image_store_models import StoredImage, ImageReference
+from backend.utils.image_types import get_extension
+from backend.utils.bulk_insert import SQLITE_MAX_VARIABLES
+from backend.config.settings import IMAGE_STORE_DIR, IMPORT_LINK_DIR, UPLOAD_HASH_CHUNK_SIZE
+
+# 文件夹导入模式
+IMPORT_MODES = ('auto', 'link', 'reference', 'copy')
+
+def hash_file(file_path, chunk_size=UPLOAD_HASH_CHUNK_SIZE):
+    """计算文件的 SHA-256"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _remove_quietly(path):
+    """删除文件，文件不存在时忽略"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def is_within(path, directories):
+    """判断路径（解析符号链接和 .. 后）是否位于给定目录之一中"""
+    real_path = os.path.realpath(path)
+    for directory in directories:
+        real_dir = os.path.realpath(directory)
+        if os.path.commonpath([real_path, real_dir]) == real_dir and real_path != real_dir:
+            return True
+    return False
+
+class ImageStore:
+    """带引用计数的内容寻址图片存储"""
+
+    def __init__(self, root=IMAGE_STORE_DIR, link_dir=IMPORT_LINK_DIR):
+        self.root = os.path.abspath(root)
+        self.link_dir = os.path.abspath(link_dir)
+        self._lock = threading.RLock()  # 保证放入文件和删除文件不会交错执行（先取锁再开事务）
+        self._local = threading.local()  # 当前线程各层事务的 (提交后动作, 回滚动作)
+
+    @contextmanager
+    def atomic(self):
+        """在一个事务中登记多张图片并创建任务（整批只提交一次）
+
+            with image_store.atomic():
+                image_paths = image_store.import_files(source_paths, mode)
+                bulk_create(Model, rows)
+
+        先取存储锁再开事务，与 put_file、release_paths 的加锁顺序一致。
+        事务回滚时执行登记的回滚动作（删除新放入的文件），
+        最外层事务提交后执行提交后动作（删除源文件和不再使用的文件）；内层事务提交时并入外层。
+        """
+        with self._lock:
+            stack = self._local.__dict__.setdefault('stack', [])
+            actions = ([], [])
+            stack.append(actions)
+            try:
+                with StoredImage._meta.database.atomic():
+                    yield
+            except BaseException:
+                stack.pop()
+                self._run_actions(reversed(actions[1]))
+                raise
+            stack.pop()
+            if stack:
+                stack[-1][0].extend(actions[0])
+                stack[-1][1].extend(actions[1])
+            else:
+                self._run_actions(actions[0])
+
+    def _run_actions(self, actions):
+        for action in actions:
+            try:
+                action()
+            except Exception as e:
+                print(f"图片存储文件操作失败: {str(e)}")
+
+    def _on_commit(self, action):
+        """最外层事务提交后执行（不在事务中时立即执行）"""
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stack[-1][0].append(action)
+        else:
+            action()
+
+    def _on_rollback(self, action):
+        """当前事务回滚时执行"""
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stack[-1][1].append(action)
+
+    def path_for(self, sha256, ext):
+        return os.path.join(self.root, sha256[:2], f"{sha256}.{ext}" if ext else sha256)
+
+    def is_store_path(self, path):
+        """路径是否位于存储目录中"""
+        return bool(path) and os.path.abspath(path).startswith(self.root + os.sep)
+
+    def is_link_path(self, path):
+        """路径是否为导入时创建的硬链接"""
+        return bool(path) and os.path.abspath(path).startswith(self.link_dir + os.sep)
+
+    def sha256_of(self, path):
+        """从存储路径中取出 SHA-256，不是存储路径时返回 None"""
+        if not self.is_store_path(path):
+            return None
+        return os.path.basename(path).split('.', 1)[0]
+
+    def put_file(self, source_path, sha256=None, move=False):
+        """把文件放入存储并增加一次引用，返回存储路径
+
+        move=True 时源文件在事务提交后删除（先硬链接到存储，不能链接时复制），事务回滚时保留源文件；
+        本次新放入存储的文件在事务回滚时删除。
+        """
+        sha256 = sha256 or hash_file(source_path)
+        with self.atomic():
+            stored = StoredImage.get_or_none(StoredImage.sha256 == sha256)
+            target_path = stored.path if stored else self.path_for(sha256, get_extension(source_path))
+
+            if not os.path.exists(target_path):
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                temp_path = f"{target_path}.{uuid.uuid4().hex}.part"
+                try:
+                    if move:
+                        try:
+                            os.link(source_path, temp_path)
+                        except OSError:
+                            shutil.copy2(source_path, temp_path)
+                    else:
+                        shutil.copy2(source_path, temp_path)
+                    os.replace(temp_path, target_path)
+                except Exception:
+                    _remove_quietly(temp_path)
+                    raise
+                self._on_rollback(lambda: _remove_quietly(target_path))
+            if move:
+                self._on_commit(lambda: _remove_quietly(source_path))
+
+            (StoredImage
+             .insert(sha256=sha256, path=target_path, size=os.path.getsize(target_path), ref_count=1)
+             .on_conflict(conflict_target=[StoredImage.sha256],
+                          update={StoredImage.ref_count: StoredImage.ref_count + 1})
+             .execute())
+        return target_path
+
+    def link_file(self, source_path):
+        """硬链接到导入目录（不复制数据），跨文件系统或不支持硬链接时返回 None
+
+        在 atomic() 中调用时，事务回滚会删除创建的硬链接。
+        """
+        os.makedirs(self.link_dir, exist_ok=True)
+        ext = get_extension(source_path)
+        target_path = os.path.join(self.link_dir, f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex)
+        try:
+            os.link(source_path, target_path)
+        except OSError:
+            return None
+        self._on_rollback(lambda: _remove_quietly(target_path))
+        return target_path
+
+    def _upsert_references(self, paths):
+        """批量登记引用的原文件（记录大小和修改时间），同一路径出现多次时引用数累加"""
+        counts = Counter(paths)
+        rows = []
+        for path, count in counts.items():
+            stat = os.stat(path)
+            rows.append({'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'ref_count': count})
+        with StoredImage._meta.database.atomic():
+            for chunk in chunked(rows, SQLITE_MAX_VARIABLES // 4):
+                (ImageReference
+                 .insert_many(chunk)
+                 .on_conflict(conflict_target=[ImageReference.path],
+                              update={ImageReference.size: EXCLUDED.size,
+                                      ImageReference.mtime_ns: EXCLUDED.mtime_ns,
+                                      ImageReference.ref_count: ImageReference.ref_count + EXCLUDED.ref_count})
+                 .execute())
+
+    def _reference_matches(self, reference):
+        try:
+            stat = os.stat(reference.path)
+        except OSError:
+            return False
+        return stat.st_size == reference.size and stat.st_mtime_ns == reference.mtime_ns
+
+    def find_changed_references(self, paths):
+        """返回导入后被修改或删除的引用原文件路径（一次查询取出引用记录）"""
+        candidates = list({os.path.abspath(path) for path in paths
+                           if path and not self.is_store_path(path) and not self.is_link_path(path)})
+        changed = set()
+        for chunk in chunked(candidates, SQLITE_MAX_VARIABLES):
+            for reference in ImageReference.select().where(ImageReference.path.in_(chunk)):
+                if not self._reference_matches(reference):
+                    changed.add(reference.path)
+        return changed
+
+    def import_files(self, source_paths, mode='auto'):
+        """按导入模式批量导入，返回任务使用的图片路径列表（与 source_paths 顺序一致）
+
+        硬链接不写数据库；引用的原文件批量登记；复制到存储的文件逐个登记。
+        调用方用 atomic() 包住导入和任务创建时，整批只提交一次，回滚时删除本批创建的硬链接和存储文件。
+        """
+        results = [None] * len(source_paths)
+        references = []
+        copies = []
+        # 硬链接也在事务中创建：导入或调用方的任务创建失败回滚时删除本批创建的硬链接
+        with self.atomic():
+            for i, source_path in enumerate(source_paths):
+                if mode in ('auto', 'link'):
+                    linked_path = self.link_file(source_path)
+                    if linked_path:
+                        results[i] = linked_path
+                        continue
+                    if mode == 'link':
+                        # 跨文件系统无法硬链接，复制到存储
+                        copies.append(i)
+                        continue
+                if mode == 'copy':
+                    copies.append(i)
+                else:
+                    references.append(i)
+
+            for i in copies:
+                results[i] = self.put_file(source_paths[i])
+            if references:
+                for i in references:
+                    results[i] = os.path.abspath(source_paths[i])
+                self._upsert_references([results[i] for i in references])
+        return results
+
+    def release_paths(self, paths, untracked_dirs=()):
+        """释放任务对图片的引用，返回删除的文件列表 [(路径, 字节数)]
+
+        存储中的图片引用归零时删除；导入时创建的硬链接直接删除（不影响原文件）；
+        引用的外部文件只删除引用记录，不会删除原文件；
+        其他路径（旧的独立上传文件）只有位于 untracked_dirs（程序自己的上传临时目录）中时才删除，
+        其他位置的文件一律不删除。
+        文件在最外层事务提交后删除（在外层 atomic() 中调用时，返回的列表在提交后才填充）。
+        """
+        paths = [path for path in paths if path]
+        counts = Counter(sha256 for sha256 in map(self.sha256_of, paths) if sha256)
+        link_paths = [path for path in paths if self.is_link_path(path)]
+        reference_counts = Counter(os.path.abspath(path) for path in paths
+                                   if not self.is_store_path(path) and not self.is_link_path(path))
+        removed = []
+        with self.atomic():
+            for sha256, count in counts.items():
+                (StoredImage
+                 .update(ref_count=StoredImage.ref_count - count)
+                 .where(StoredImage.sha256 == sha256)
+                 .execute())
+            unused = []
+            if counts:
+                unused = list(StoredImage.select().where(
+                    StoredImage.sha256.in_(list(counts)),
+                    StoredImage.ref_count <= 0
+                ))
+            if unused:
+                StoredImage.delete().where(StoredImage.sha256.in_([stored.sha256 for stored in unused])).execute()
+
+            untracked = []
+            if reference_counts:
+                referenced = {path for (path,) in ImageReference
+                              .select(ImageReference.path)
+                              .where(ImageReference.path.in_(list(reference_counts)))
+                              .tuples()}
+                untracked = [path for path in reference_counts if path not in referenced]
+                for path in referenced:
+                    (ImageReference
+                     .update(ref_count=ImageReference.ref_count - reference_counts[path])
+                     .where(ImageReference.path == path)
+                     .execute())
+                if referenced:
+                    ImageReference.delete().where(
+                        ImageReference.path.in_(list(referenced)),
+                        ImageReference.ref_count <= 0
+                    ).execute()
+
+            remove_paths = [stored.path for stored in unused] + link_paths
+            for path in untracked:
+                if is_within(path, untracked_dirs):
+                    remove_paths.append(path)
+                elif untracked_dirs:
+                    print(f"跳过删除不在上传目录中的文件: {path}")
+
+            def remove_files():
+                for path in remove_paths:
+                    try:
+                        size = os.path.getsize(path)
+                        os.remove(path)
+                        removed.append((path, size))
+                    except FileNotFoundError:
+                        pass
+                    except Exception as e:
+                        print(f"删除图片失败 {path}: {str(e)}")
+            # 事务提交后才删除文件，回滚时数据库记录和文件都保持不变
+            self._on_commit(remove_files)
+        return removed
+
+    def discard_file(self, path, untracked_dirs=()):
+        """删除任务关联的图片：存储中的图片、硬链接和外部引用释放引用，上传目录中的旧文件直接删除"""
+        return self.release_paths([path], untracked_dirs)
+
+    def get_status(self):
+        """获取存储统计（图片数、总引用数、占用字节数）"""
+        count, refs, size = StoredImage.select(
+            fn.COUNT(StoredImage.sha256), fn.SUM(StoredImage.ref_count), fn.SUM(StoredImage.size)
+        ).tuples().get()
+        return {'images': count or 0, 'references': refs or 0, 'bytes': size or 0}
+
+# 全局图片存储
+image_store = ImageStore()
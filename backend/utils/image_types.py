@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+图片格式识别
+
+根据文件头（magic bytes）判断图片格式，不依赖扩展名，也不需要解码整张图片。
+"""
+
+# 支持的图片扩展名
+ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+
+# 识别格式需要读取的文件头长度
+IMAGE_HEADER_SIZE = 16
+
+def detect_image_format(header):
+    """根据文件头返回图片格式（png / jpeg / gif / bmp / webp），无法识别时返回 None"""
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if header.startswith(b'BM'):
+        return 'bmp'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+def read_image_format(file_path):
+    """读取文件头判断图片格式，读取失败或无法识别时返回 None"""
+    try:
+        with open(file_path, 'rb') as f:
+            return detect_image_format(f.read(IMAGE_HEADER_SIZE))
+    except OSError:
+        return None
+
+def get_extension(filename):
+    """获取小写扩展名（不含点），没有扩展名时返回空字符串"""
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+def is_allowed_image(filename):
+    """扩展名是否为支持的图片格式"""
+    return get_extension(filename) in ALLOWED_IMAGE_EXTENSIONS
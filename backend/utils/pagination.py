@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+任务列表分页工具
+
+支持两种分页方式：
+- 页码分页：page + page_size，深翻页需要 OFFSET 扫描
+- 游标分页：按 (create_at, id) 倒序的键集分页，每页开销与翻页深度无关，
+  next_cursor 为不透明的字符串，客户端原样传回即可
+"""
+
+import json
+import base64
+from datetime import datetime
+
+def encode_cursor(create_at, task_id):
+    """将 (create_at, id) 编码为不透明游标"""
+    payload = json.dumps([create_at.isoformat(), task_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析游标，返回 (create_at, id)，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        create_at, task_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return datetime.fromisoformat(create_at), int(task_id)
+    except Exception:
+        raise ValueError('无效的分页游标: {}'.format(cursor))
+
+def keyset_paginate(query, model, cursor=None, page_size=20):
+    """按 (create_at, id) 倒序做游标分页
+
+    返回 (当前页任务列表, 下一页游标)，没有更多数据时游标为 None。
+    """
+    if cursor:
+        create_at, task_id = decode_cursor(cursor)
+        # create_at <= 游标 作为索引范围条件，避免从头扫描到游标位置
+        query = query.where(
+            (model.create_at <= create_at) &
+            ((model.create_at < create_at) | (model.id < task_id))
+        )
+
+    # 多取一条用于判断是否还有下一页
+    rows = list(query.order_by(model.create_at.desc(), model.id.desc()).limit(page_size + 1))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.create_at, last.id)
+    return rows, next_cursor
+
+def is_cursor_request(args):
+    """请求参数中带有 cursor（允许为空字符串表示第一页）时使用游标分页"""
+    return args.get('cursor') is not None
+
+def want_total(args, default=True):
+    """是否需要返回总数（with_total=false 时跳过 COUNT 查询）"""
+    value = args.get('with_total')
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+提示词库缓存
+
+每个平台的 prompt.xlsx 解析一次后缓存在进程内，以 Excel 文件和图片目录的
+修改时间、文件大小作为版本，文件未变化时搜索、详情和统计直接读取内存：
+
+    prompt_cache = PromptLibraryCache(PROMPT_DATABASE_PATH, load_prompt_data)
+    library = prompt_cache.get('jimeng')  # 解析失败时抛出 PromptLibraryError
+
+loader(platform) 返回 {'success', 'message', 'data'}，data 为 PromptRecord 列表，
+可选的 'cancel_event'（threading.Event）在该版本的库被替换或清除时设置，用于停止后台生成预览图。
+同一平台同时只解析一次，其他请求等待解析结果。
+"""
+
+import threading
+from pathlib import Path
+from backend.utils.prompt_search import PromptSearchIndex
+
+class PromptLibraryError(Exception):
+    """提示词库不存在或解析失败"""
+
+class PromptLibrary:
+    """解析后的提示词库（加载时建立检索索引）"""
+
+    def __init__(self, platform, prompts, version, cancel_event=None):
+        self.platform = platform
+        self.prompts = prompts
+        self.version = version
+        self.cancel_event = cancel_event
+        self.by_name = {}
+        for prompt in prompts:
+            self.by_name.setdefault(prompt.name, prompt)  # 同名时保留第一条
+        self.index = PromptSearchIndex(prompts)
+
+    def search(self, query, page=1, per_page=20):
+        """搜索名称和提示词内容，返回 (匹配总数, 当前页的提示词列表)"""
+        return self.index.search(query, page, per_page)
+
+    def close(self):
+        """库被新版本替换或清除后停止该版本的后台任务"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+class PromptLibraryCache:
+    """按平台缓存提示词库，文件变化时重新解析"""
+
+    def __init__(self, root, loader, file_name='prompt.xlsx'):
+        self.root = Path(root)
+        self.loader = loader
+        self.file_name = file_name
+        self._libraries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _platform_path(self, platform):
+        if not platform or Path(platform).name != platform or platform.startswith('.'):
+            raise PromptLibraryError(f'无效的平台名称: {platform}')
+        return self.root / platform
+
+    def get_version(self, platform):
+        """获取提示词文件版本（修改时间、大小、图片目录修改时间），文件不存在时返回 None"""
+        platform_path = self._platform_path(platform)
+        try:
+            stat = (platform_path / self.file_name).stat()
+        except OSError:
+            return None
+        try:
+            images_mtime = (platform_path / 'images').stat().st_mtime_ns
+        except OSError:
+            images_mtime = None
+        return (stat.st_mtime_ns, stat.st_size, images_mtime)
+
+    def _platform_lock(self, platform):
+        with self._lock:
+            return self._locks.setdefault(platform, threading.Lock())
+
+    def get(self, platform):
+        """获取平台的提示词库，文件变化后首次访问时重新解析"""
+        version = self.get_version(platform)
+        library = self._libraries.get(platform)
+        if library is not None and library.version == version:
+            return library
+
+        with self._platform_lock(platform):
+            # 等待锁期间可能已被其他请求解析
+            version = self.get_version(platform)
+            library = self._libraries.get(platform)
+            if library is not None and library.version == version:
+                return library
+
+            result = self.loader(platform)
+            if not result['success']:
+                self._close(self._libraries.pop(platform, None))
+                raise PromptLibraryError(result['message'])
+            library = PromptLibrary(platform, result['data'], version, result.get('cancel_event'))
+            self._close(self._libraries.get(platform))
+            self._libraries[platform] = library
+            print(f"已加载提示词库 {platform}: {len(library.prompts)} 个提示词")
+            return library
+
+    def invalidate(self, platform=None):
+        """清除指定平台（为空时清除全部）的缓存"""
+        with self._lock:
+            if platform is None:
+                libraries = list(self._libraries.values())
+                self._libraries.clear()
+            else:
+                libraries = [self._libraries.pop(platform, None)]
+        for library in libraries:
+            self._close(library)
+
+    def _close(self, library):
+        if library is not None:
+            library.close()
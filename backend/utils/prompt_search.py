@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+提示词全文检索
+
+提示词库加载时对名称和提示词内容建立字符 n-gram 倒排索引（单字和二元组），
+中文不需要分词。查询时每个关键词取出现次数最少的 n-gram 的倒排列表作为候选，
+再用子串匹配确认并打分排序：
+
+    index = PromptSearchIndex(prompts)
+    total, items = index.search('猫 草地', page=1, per_page=20)
+
+多个关键词（空格分隔）需要全部匹配。排序：名称完全相同 > 名称前缀 > 名称中词的前缀
+> 名称包含 > 提示词前缀 > 提示词包含，同分按原顺序。
+最近查询的排序结果会缓存，翻页不需要重新打分。
+"""
+
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from array import array
+from backend.config.settings import PROMPT_SEARCH_CACHE_SIZE
+
+# 关键词各匹配方式的得分
+SCORE_NAME_EXACT = 100
+SCORE_NAME_PREFIX = 50
+SCORE_NAME_WORD_PREFIX = 30
+SCORE_NAME_CONTAINS = 20
+SCORE_PROMPT_PREFIX = 10
+SCORE_PROMPT_CONTAINS = 5
+
+_WORD_SEPARATORS = ' _-/,，、.。|'
+
+def normalize_text(text):
+    """统一全角半角和大小写"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+def _grams(text):
+    """文本中所有的单字和二元组（不含空白，关键词按空白拆分后不会包含空白）"""
+    grams = set(text)
+    grams.update(map(str.__add__, text, text[1:]))
+    return {gram for gram in grams if not any(map(str.isspace, gram))}
+
+def _is_word_prefix(name, term):
+    """term 是否出现在名称中某个词的开头（名称开头单独判断）"""
+    position = name.find(term)
+    while position > 0:
+        if name[position - 1] in _WORD_SEPARATORS:
+            return True
+        position = name.find(term, position + 1)
+    return False
+
+class PromptSearchIndex:
+    """名称和提示词内容的 n-gram 倒排索引"""
+
+    def __init__(self, prompts, cache_size=PROMPT_SEARCH_CACHE_SIZE):
+        self.prompts = prompts
+        self.names = [normalize_text(prompt.name) for prompt in prompts]
+        self.texts = [normalize_text(prompt.prompt) for prompt in prompts]
+        postings = defaultdict(lambda: array('I'))
+        for doc_id, (name, text) in enumerate(zip(self.names, self.texts)):
+            for gram in _grams(f"{name}\n{text}"):
+                postings[gram].append(doc_id)
+        self.postings = dict(postings)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _candidates(self, term):
+        """term 可能出现的文档（取最短的倒排列表，还需子串确认）"""
+        grams = [term[i:i + 2] for i in range(len(term) - 1)] or [term]
+        best = None
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return ()
+            if best is None or len(posting) < len(best):
+                best = posting
+        return best
+
+    def _score(self, doc_id, terms):
+        name = self.names[doc_id]
+        text = self.texts[doc_id]
+        score = 0
+        for term in terms:
+            if term in name:
+                if name == term:
+                    score += SCORE_NAME_EXACT
+                elif name.startswith(term):
+                    score += SCORE_NAME_PREFIX
+                elif _is_word_prefix(name, term):
+                    score += SCORE_NAME_WORD_PREFIX
+                else:
+                    score += SCORE_NAME_CONTAINS
+            elif term in text:
+                score += SCORE_PROMPT_PREFIX if text.startswith(term) else SCORE_PROMPT_CONTAINS
+            else:
+                return 0
+        return score
+
+    def _rank(self, terms):
+        """返回按得分排序的文档ID列表"""
+        candidates = min((self._candidates(term) for term in terms), key=len)
+        # 倒排列表按文档ID递增，按得分分桶后同分自然保持原顺序，不需要排序
+        buckets = defaultdict(list)
+        for doc_id in candidates:
+            score = self._score(doc_id, terms)
+            if score:
+                buckets[score].append(doc_id)
+        return [doc_id for score in sorted(buckets, reverse=True) for doc_id in buckets[score]]
+
+    def ranked_ids(self, query):
+        """查询匹配的文档ID（已排序），query 为空时返回全部"""
+        terms = tuple(dict.fromkeys(normalize_text(query).split()))
+        if not terms:
+            return range(len(self.prompts))
+        with self._lock:
+            doc_ids = self._cache.get(terms)
+            if doc_ids is not None:
+                self._cache.move_to_end(terms)
+                return doc_ids
+        doc_ids = self._rank(terms)
+        with self._lock:
+            self._cache[terms] = doc_ids
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return doc_ids
+
+    def search(self, query, page=1, per_page=20):
+        """分页搜索，返回 (匹配总数, 当前页的提示词列表)"""
+        doc_ids = self.ranked_ids(query)
+        start = (max(page, 1) - 1) * per_page
+        return len(doc_ids), [self.prompts[doc_id] for doc_id in doc_ids[start:start + per_page]]
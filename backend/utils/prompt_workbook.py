@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+提示词 Excel 流式读取
+
+单元格用 openpyxl 只读模式逐行读取，只取 name/image/prompt 三列，
+每行生成一个 PromptRecord（不创建 DataFrame，也不加载整个工作簿对象模型）。
+只读模式下工作表没有图片对象，嵌入图片的位置从 drawing XML 中解析，
+图片数据按需从压缩包中逐张读取。工作表和图片的路径只通过 openpyxl 的公开接口
+get_dependents 解析关系文件得到，XML 用标准库解析，不依赖 openpyxl 的内部属性：
+
+    records, sheet_path = read_prompt_rows(excel_file)
+    images = read_image_anchors(excel_file, sheet_path)   # {行号: 压缩包内的图片路径}
+    with open_media(excel_file) as archive:
+        image_bytes = archive.read(images[record.row])
+
+支持的 openpyxl 版本为 OPENPYXL_VERSIONS（包含下限、不包含上限），版本不符时导入失败。
+"""
+
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+import openpyxl
+from openpyxl import load_workbook
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+
+# 已验证的 openpyxl 版本范围
+OPENPYXL_VERSIONS = ((3, 1), (3, 2))
+
+def _version_tuple(version):
+    return tuple(int(part) for part in version.split('.')[:2] if part.isdigit())
+
+if not OPENPYXL_VERSIONS[0] <= _version_tuple(openpyxl.__version__) < OPENPYXL_VERSIONS[1]:
+    raise ImportError(f'需要 openpyxl>={".".join(map(str, OPENPYXL_VERSIONS[0]))},'
+                      f'<{".".join(map(str, OPENPYXL_VERSIONS[1]))}，当前版本 {openpyxl.__version__}')
+
+# 提示词表需要的列
+PROMPT_COLUMNS = ('name', 'image', 'prompt')
+
+# Office Open XML 命名空间和关系类型
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XDR_NS = 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing'
+DRAWINGML_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+OFFICE_DOCUMENT_REL = f'{REL_NS}/officeDocument'
+DRAWING_REL = f'{REL_NS}/drawing'
+IMAGE_REL = f'{REL_NS}/image'
+ANCHOR_TAGS = (f'{{{XDR_NS}}}twoCellAnchor', f'{{{XDR_NS}}}oneCellAnchor', f'{{{XDR_NS}}}absoluteAnchor')
+
+class PromptWorkbookError(Exception):
+    """提示词 Excel 格式错误"""
+
+class PromptRecord:
+    """一条提示词（__slots__ 保持每行内存占用小）"""
+
+    __slots__ = ('row', 'name', 'image_filename', 'image_url', 'image_pending', 'prompt')
+
+    def __init__(self, row, name, image_filename, prompt):
+        self.row = row  # Excel 行号（从1开始，表头为第1行）
+        self.name = name
+        self.image_filename = image_filename
+        self.image_url = None
+        self.image_pending = False  # 缩略图生成中，完成后 image_url 才有值
+        self.prompt = prompt
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'image_filename': self.image_filename,
+            'image_url': self.image_url,
+            'image_pending': self.image_pending,
+            'prompt': self.prompt
+        }
+
+def _cell_text(value):
+    return str(value).strip() if value is not None else ''
+
+def _rels(archive, part_path):
+    """读取部件的关系列表（没有关系文件时为空）"""
+    rels_path = get_rels_path(part_path)
+    if rels_path not in archive.namelist():
+        return []
+    return list(get_dependents(archive, rels_path))
+
+def _sheet_path(excel_file, title):
+    """按工作表名称查找工作表在压缩包中的路径"""
+    with zipfile.ZipFile(excel_file) as archive:
+        root_rels = get_dependents(archive, '_rels/.rels').find(OFFICE_DOCUMENT_REL)
+        workbook_path = next(root_rels).target
+        targets = {rel.Id: rel.target for rel in _rels(archive, workbook_path)}
+        workbook = ET.fromstring(archive.read(workbook_path))
+        for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet'):
+            if sheet.get('name') == title:
+                return targets.get(sheet.get(f'{{{REL_NS}}}id'))
+    return None
+
+def read_prompt_rows(excel_file, columns=PROMPT_COLUMNS):
+    """逐行读取活动工作表，返回 (PromptRecord 列表, 工作表在压缩包中的路径)"""
+    wb = load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        title = ws.title
+        header = next(ws.iter_rows(max_row=1, values_only=True), ())
+        header = [_cell_text(value) for value in header]
+        if not all(column in header for column in columns):
+            raise PromptWorkbookError(f'Excel文件格式错误，需要包含列: {list(columns)}')
+        name_col, image_col, prompt_col = (header.index(column) for column in columns)
+
+        records = []
+        max_col = max(name_col, image_col, prompt_col) + 1
+        for row_number, values in enumerate(ws.iter_rows(min_row=2, max_col=max_col, values_only=True), start=2):
+            values = values + (None,) * (max_col - len(values))
+            name = _cell_text(values[name_col])
+            # 跳过空行
+            if not name:
+                continue
+            image_value = _cell_text(values[image_col])
+            # 公式（如WPS的DISPIMG）不是图片文件名
+            if image_value.startswith('=') or 'DISPIMG' in image_value:
+                image_value = ''
+            records.append(PromptRecord(row_number, name, image_value, _cell_text(values[prompt_col])))
+    finally:
+        wb.close()
+    return records, _sheet_path(excel_file, title)
+
+def _anchor_images(drawing):
+    """按顺序返回绘图中每张图片的 (锚点起始行号（从0开始，没有时为 None）, 图片关系ID)"""
+    for anchor in drawing:
+        if anchor.tag not in ANCHOR_TAGS:
+            continue
+        from_row = anchor.findtext(f'{{{XDR_NS}}}from/{{{XDR_NS}}}row')
+        for pic in anchor.iter(f'{{{XDR_NS}}}pic'):
+            blip = pic.find(f'{{{XDR_NS}}}blipFill/{{{DRAWINGML_NS}}}blip')
+            if blip is not None and blip.get(f'{{{REL_NS}}}embed'):
+                yield (int(from_row) if from_row is not None else None), blip.get(f'{{{REL_NS}}}embed')
+
+def read_image_anchors(excel_file, sheet_path):
+    """解析工作表中嵌入图片的位置，返回 {行号: 压缩包内的图片路径}（不读取图片数据）"""
+    images = {}
+    if not sheet_path:
+        return images
+    with zipfile.ZipFile(excel_file) as archive:
+        for drawing_rel in _rels(archive, sheet_path):
+            if drawing_rel.Type != DRAWING_REL or drawing_rel.TargetMode == 'External':
+                continue
+            try:
+                drawing = ET.fromstring(archive.read(drawing_rel.target))
+            except (KeyError, ET.ParseError) as e:
+                print(f"解析图片位置失败 {drawing_rel.target}: {str(e)}")
+                continue
+            deps = {dep.Id: dep for dep in _rels(archive, drawing_rel.target)}
+            for idx, (from_row, embed) in enumerate(_anchor_images(drawing)):
+                dep = deps.get(embed)
+                if dep is None or dep.Type != IMAGE_REL or dep.TargetMode == 'External':
+                    continue
+                # 锚点行号从0开始，PromptRecord.row 为从1开始的 Excel 行号；
+                # 没有位置信息（absoluteAnchor）时按图片顺序对应第2行起的数据行
+                row = from_row + 1 if from_row is not None else idx + 2
+                images[row] = posixpath.normpath(dep.target)
+    return images
+
+def open_media(excel_file):
+    """打开 Excel 压缩包，用于逐张读取图片数据"""
+    return zipfile.ZipFile(excel_file)
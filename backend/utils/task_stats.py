@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+任务状态统计
+
+一次 GROUP BY status 查询得到全部状态的数量，结果按任务表做短时缓存，
+仪表盘频繁轮询时不再反复扫描 SQLite。任务状态变化（创建、重试、删除、
+处理器更新状态）时调用 invalidate_task_stats() 使对应任务表的缓存失效。
+"""
+
+import time
+import threading
+from peewee import fn
+from backend.config.settings import STATS_CACHE_TTL
+
+# 任务状态编号与统计字段名的对应关系
+TASK_STATUS_KEYS = {
+    0: 'queued',      # 排队中
+    1: 'processing',  # 生成中
+    2: 'completed',   # 已完成
+    3: 'failed'       # 失败
+}
+
+class TaskStatsCache:
+    """按 (任务表, 统计键) 缓存统计结果，带过期时间"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, table_name=None):
+        """清除指定任务表（为空时清除全部）的缓存"""
+        with self._lock:
+            if table_name is None:
+                self._items.clear()
+                return
+            for key in [key for key in self._items if key[0] == table_name]:
+                del self._items[key]
+
+_stats_cache = TaskStatsCache(STATS_CACHE_TTL)
+
+def count_by_status(model, *conditions):
+    """单次 GROUP BY status 查询，返回 {status: count}"""
+    query = model.select(model.status, fn.COUNT(model.id).alias('task_count'))
+    if conditions:
+        query = query.where(*conditions)
+    return {row.status: row.task_count for row in query.group_by(model.status).namedtuples()}
+
+def get_status_counts(model, *conditions, cache_key='all'):
+    """获取任务状态统计，返回 {'total', 'queued', 'processing', 'completed', 'failed'}
+
+    cache_key 用于区分同一任务表的不同筛选条件，条件中含日期时应把日期放进 cache_key。
+    """
+    key = (model._meta.table_name, cache_key)
+    cached = _stats_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    counts = count_by_status(model, *conditions)
+    stats = {'total': sum(counts.values())}
+    for status, name in TASK_STATUS_KEYS.items():
+        stats[name] = counts.get(status, 0)
+
+    _stats_cache.set(key, stats)
+    return dict(stats)
+
+def invalidate_task_stats(model=None):
+    """任务状态变化后清除统计缓存"""
+    _stats_cache.invalidate(model._meta.table_name if model is not None else None)
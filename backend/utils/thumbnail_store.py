@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+提示词预览缩略图存储
+
+Excel 中嵌入的图片和 images 目录中的图片生成缩略图后按原图 SHA-256 保存到
+PROMPT_THUMBNAIL_DIR/<前两位>/<sha256>.jpg，接口只返回图片URL，不再内嵌 Base64：
+
+    key = thumbnail_store.put(image_bytes)   # 已存在相同内容时不重新生成
+    url = thumbnail_url(key)                 # /api/prompt/thumbnails/<sha256>.jpg
+
+文件名即内容哈希，同一URL的内容不会变化，可以长期缓存。
+
+首次加载大量图片时用 put_async() 交给进程池生成（解码、缩放、JPEG编码都是CPU密集型），
+返回的 future 为 None 表示缩略图已存在：
+
+    key, future = thumbnail_store.put_async(image_bytes)
+    if future is not None:
+        future.add_done_callback(...)  # 生成完成后再填入预览图URL
+
+进程池使用 forkserver（不支持时使用 spawn）启动工作进程，工作进程会重新导入 __main__，
+因此只在主模块的启动代码位于 if __name__ == '__main__': 之下、解释器可执行时使用进程池；
+检查不通过时改用线程池并打印原因。嵌入式或打包运行时用 PROMPT_THUMBNAIL_PYTHON 指定工作进程的解释器。
+"""
+
+import io
+import os
+import re
+import ast
+import sys
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+from backend.config.settings import (PROMPT_THUMBNAIL_DIR, PROMPT_THUMBNAIL_SIZE, PROMPT_THUMBNAIL_QUALITY,
+                                     PROMPT_THUMBNAIL_WORKERS, PROMPT_THUMBNAIL_MAX_PENDING, PROMPT_THUMBNAIL_PYTHON)
+
+# 缩略图访问路径
+THUMBNAIL_URL_PREFIX = '/api/prompt/thumbnails'
+
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def make_thumbnail(image_bytes, size=PROMPT_THUMBNAIL_SIZE, quality=PROMPT_THUMBNAIL_QUALITY):
+    """把图片转换为RGB缩略图，返回JPEG字节"""
+    pil_image = Image.open(io.BytesIO(image_bytes))
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+    pil_image.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+def thumbnail_url(key):
+    return f"{THUMBNAIL_URL_PREFIX}/{key}.jpg"
+
+def render_thumbnail(root, key, image_bytes):
+    """生成缩略图并写入存储（在进程池中执行），返回缩略图键"""
+    ThumbnailStore(root).save(key, make_thumbnail(image_bytes))
+    return key
+
+def _has_main_guard(path):
+    """主模块文件的顶层是否有 if __name__ == '__main__': 判断"""
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return False
+    for node in tree.body:
+        if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+            continue
+        operands = [node.test.left, *node.test.comparators]
+        if (len(operands) == 2 and isinstance(node.test.ops[0], ast.Eq)
+                and any(isinstance(item, ast.Name) and item.id == '__name__' for item in operands)
+                and any(isinstance(item, ast.Constant) and item.value == '__main__' for item in operands)):
+            return True
+    return False
+
+def process_pool_context(executable=PROMPT_THUMBNAIL_PYTHON):
+    """返回进程池使用的 multiprocessing 上下文，不能安全启动工作进程时返回 (None, 原因)"""
+    if getattr(sys, 'frozen', False) and not executable:
+        return None, '打包运行时需要指定 PROMPT_THUMBNAIL_PYTHON'
+    executable = executable or sys.executable
+    if not executable or not os.path.isfile(executable):
+        return None, f'找不到Python解释器: {executable}'
+    if not os.path.basename(executable).lower().startswith('python'):
+        # 嵌入式解释器（如 uwsgi）的 sys.executable 不是 Python，工作进程无法启动
+        return None, f'当前可执行文件不是Python解释器: {executable}，请设置 PROMPT_THUMBNAIL_PYTHON'
+
+    main_path = getattr(sys.modules.get('__main__'), '__file__', None)
+    if main_path and not _has_main_guard(main_path):
+        return None, f'主模块 {main_path} 没有 if __name__ == \'__main__\': 保护，工作进程导入时会重新执行启动代码'
+
+    # Web服务是多线程的，fork 可能复制持有中的锁；forkserver 从单线程的服务进程派生工作进程，启动比 spawn 快
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(method)
+    if PROMPT_THUMBNAIL_PYTHON:
+        context.set_executable(executable)
+    return context, None
+
+class ThumbnailStore:
+    """按原图内容哈希保存的缩略图"""
+
+    def __init__(self, root=PROMPT_THUMBNAIL_DIR, max_workers=PROMPT_THUMBNAIL_WORKERS,
+                 max_pending=PROMPT_THUMBNAIL_MAX_PENDING):
+        self.root = os.path.abspath(root)
+        self.max_workers = max_workers
+        self._pool = None
+        self._pending = {}  # key -> Future，同一图片只提交一次
+        self._slots = threading.BoundedSemaphore(max_pending)  # 提交中的图片数达到上限时 put_async 等待
+        self._lock = threading.Lock()
+
+    def is_valid_key(self, key):
+        return bool(_KEY_PATTERN.match(key or ''))
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.jpg")
+
+    def key_for(self, image_bytes):
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def exists(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def save(self, key, thumbnail_bytes):
+        """写入缩略图（先写临时文件再重命名，读取方不会看到写了一半的文件）"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.part"
+        with open(temp_path, 'wb') as f:
+            f.write(thumbnail_bytes)
+        os.replace(temp_path, path)
+
+    def put(self, image_bytes):
+        """生成并保存缩略图，返回缩略图键（原图 SHA-256）"""
+        key = self.key_for(image_bytes)
+        if not self.exists(key):
+            self.save(key, make_thumbnail(image_bytes))
+        return key
+
+    def _get_pool(self):
+        if self._pool is None:
+            context, reason = process_pool_context()
+            if context is None:
+                # PIL 缩放和编码时释放 GIL，线程池仍能利用多核
+                print(f"缩略图改用线程池生成: {reason}")
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='thumbnail')
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._pool
+
+    def _render_inline(self, key, image_bytes):
+        """进程池不可用时在当前线程生成"""
+        future = Future()
+        try:
+            future.set_result(render_thumbnail(self.root, key, image_bytes))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def put_async(self, image_bytes):
+        """在进程池中生成缩略图，返回 (缩略图键, future)，缩略图已存在时 future 为 None
+
+        提交中的图片数达到 max_pending 时等待，调用方应在后台线程中逐张提交。
+        """
+        key = self.key_for(image_bytes)
+        if self.exists(key):
+            return key, None
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return key, future
+
+        self._slots.acquire()
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                self._slots.release()
+                return key, future
+            try:
+                future = self._get_pool().submit(render_thumbnail, self.root, key, image_bytes)
+            except (BrokenProcessPool, OSError, RuntimeError) as e:
+                print(f"缩略图进程池不可用，改为直接生成: {str(e)}")
+                self._pool = None
+                self._slots.release()
+                return key, self._render_inline(key, image_bytes)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._discard_pending(key))
+        return key, future
+
+    def _discard_pending(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+        self._slots.release()
+
+# 全局缩略图存储
+thumbnail_store = ThumbnailStore()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+批量上传处理
+
+multipart 请求体按块直接写入上传目录中的临时文件（不在内存中缓冲整个请求体），
+process_fields 中的文件部分在接收完成（下一个部分开始之前）时立即交给线程池校验、
+计算 SHA-256 和重命名，与后续文件的接收并行进行；路由最后用一个事务批量创建任务：
+
+    with upload_request(request, upload_dir) as (form, files):
+        results = process_uploads(files.getlist('images'), upload_dir)
+
+请求体大小、表单字段内存和表单项数量使用应用配置的上限（MAX_CONTENT_LENGTH 等），
+超出时抛出 RequestEntityTooLarge；退出 with 块时（包括参数校验抛出异常）删除仍留在上传目录中的
+临时文件和处理后的文件：image_store.put_file(move=True) 在事务提交后才删除源文件，
+事务回滚时源文件保留到这里统一清理。
+
+每个结果为 {'index', 'filename', 'path', 'sha256', 'size', 'error'}，
+index 为文件在表单中的序号（用于匹配 prompts[i]），error 不为空表示该文件处理失败。
+"""
+
+import os
+import uuid
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.formparser import parse_form_data, MultiPartParser
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, NeedData, MultipartDecoder
+from backend.utils.image_types import IMAGE_HEADER_SIZE, detect_image_format, get_extension, is_allowed_image
+from backend.config.settings import UPLOAD_WORKERS, UPLOAD_HASH_CHUNK_SIZE
+
+# 上传文件处理线程池
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='upload')
+
+def _disk_stream_factory(upload_dir, created):
+    """multipart 文件部分直接写入上传目录中的临时文件（记录到 created，解析失败时删除）"""
+    def stream_factory(total_content_length=None, content_type=None, filename=None, content_length=None):
+        stream = tempfile.NamedTemporaryFile('wb+', dir=upload_dir, suffix='.part', delete=False)
+        created.append(stream)
+        return stream
+    return stream_factory
+
+def _remove_stream(stream):
+    temp_path = getattr(stream, 'name', None)
+    try:
+        stream.close()
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+    except Exception as e:
+        print(f"删除上传临时文件失败: {str(e)}")
+
+class _StreamingMultiPartParser(MultiPartParser):
+    """与 werkzeug 的 MultiPartParser 相同，但每个文件部分接收完成时立即回调 on_file(name, storage)"""
+
+    def __init__(self, on_file=None, **kwargs):
+        super().__init__(**kwargs)
+        self.on_file = on_file
+
+    def parse(self, stream, boundary, content_length):
+        decoder = MultipartDecoder(boundary, max_form_memory_size=self.max_form_memory_size,
+                                   max_parts=self.max_form_parts)
+        fields = []
+        files = []
+        part = None
+        field_size = None
+        container = None
+
+        while True:
+            data = stream.read(self.buffer_size)
+            decoder.receive_data(data or None)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, Field):
+                    part = event
+                    field_size = 0
+                    container = []
+                elif isinstance(event, File):
+                    part = event
+                    field_size = None
+                    container = self.start_file_streaming(event, content_length)
+                elif isinstance(event, Data):
+                    if field_size is not None:
+                        field_size += len(event.data)
+                        if self.max_form_memory_size is not None and field_size > self.max_form_memory_size:
+                            raise RequestEntityTooLarge()
+                        container.append(event.data)
+                    else:
+                        container.write(event.data)
+                    if not event.more_data:
+                        if isinstance(part, Field):
+                            value = b''.join(container).decode(self.get_part_charset(part.headers), 'replace')
+                            fields.append((part.name, value))
+                        else:
+                            container.seek(0)
+                            storage = FileStorage(container, part.filename, part.name, headers=part.headers)
+                            files.append((part.name, storage))
+                            if self.on_file is not None:
+                                self.on_file(part.name, storage)
+                event = decoder.next_event()
+            if not data:
+                break
+        return self.cls(fields), self.cls(files)
+
+def parse_upload_request(request, upload_dir, on_file=None):
+    """流式解析 multipart 请求，返回 (form, files)
+
+    使用应用配置的请求体和表单上限（超出时抛出 RequestEntityTooLarge）；
+    每个文件部分接收完成时调用 on_file(name, storage)。解析失败时删除已写入的临时文件。
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    created = []
+    stream_factory = _disk_stream_factory(upload_dir, created)
+    boundary = request.mimetype_params.get('boundary', '').encode('latin-1')
+    try:
+        if request.mimetype != 'multipart/form-data' or not boundary:
+            _, form, files = parse_form_data(
+                request.environ,
+                stream_factory=stream_factory,
+                max_form_memory_size=request.max_form_memory_size,
+                max_content_length=request.max_content_length,
+                max_form_parts=request.max_form_parts,
+                silent=False
+            )
+            if on_file is not None:
+                for name, storage in files.items(multi=True):
+                    on_file(name, storage)
+            return form, files
+
+        parser = _StreamingMultiPartParser(
+            on_file=on_file,
+            stream_factory=stream_factory,
+            max_form_memory_size=request.max_form_memory_size,
+            max_form_parts=request.max_form_parts
+        )
+        # request.stream 按 MAX_CONTENT_LENGTH 限制读取长度，超出时抛出 RequestEntityTooLarge
+        return parser.parse(request.stream, boundary, request.content_length)
+    except Exception:
+        for stream in created:
+            _remove_stream(stream)
+        raise
+
+@contextmanager
+def upload_request(request, upload_dir, process_fields=('images',)):
+    """解析 multipart 请求，退出时删除仍留在上传目录中的临时文件和处理后的文件
+
+    process_fields 中的文件在接收完成时立即提交到线程池处理，process_uploads() 直接取结果。
+    """
+    submitted = []
+    counters = {}
+
+    def on_file(name, storage):
+        index = counters.get(name, 0)
+        counters[name] = index + 1
+        if name in process_fields and storage.filename:
+            storage.upload_future = _upload_executor.submit(_process_file, index, storage, upload_dir)
+            submitted.append(storage)
+
+    try:
+        form, files = parse_upload_request(request, upload_dir, on_file)
+    except Exception:
+        # 等已提交的文件处理结束后再删除（包括已重命名的文件）
+        for storage in submitted:
+            storage.upload_future.exception()
+        discard_uploads(submitted)
+        raise
+    try:
+        yield form, files
+    finally:
+        storages = list(files.items(multi=True))
+        for _, storage in storages:
+            future = getattr(storage, 'upload_future', None)
+            if future is not None:
+                future.exception()
+        discard_uploads(storage for _, storage in storages)
+
+def _temp_path(storage):
+    return getattr(storage.stream, 'name', None)
+
+def _remove_temp(storage):
+    _remove_stream(storage.stream)
+
+def discard_uploads(storages):
+    """删除上传临时文件和处理后留在上传目录中的文件（已放入存储并提交的文件已被移走）"""
+    for storage in storages:
+        _remove_temp(storage)
+        processed_path = getattr(storage, 'processed_path', None)
+        if processed_path and os.path.exists(processed_path):
+            try:
+                os.remove(processed_path)
+            except Exception as e:
+                print(f"删除上传文件失败: {str(e)}")
+
+def _process_file(index, storage, upload_dir):
+    """校验并计算 SHA-256，把临时文件重命名为最终文件名"""
+    result = {'index': index, 'filename': storage.filename, 'path': None, 'sha256': None, 'size': 0, 'error': None}
+    temp_path = _temp_path(storage)
+    try:
+        storage.stream.close()
+        if not is_allowed_image(storage.filename):
+            result['error'] = '不支持的文件格式'
+            return result
+
+        sha256 = hashlib.sha256()
+        with open(temp_path, 'rb') as f:
+            header = f.read(IMAGE_HEADER_SIZE)
+            sha256.update(header)
+            for chunk in iter(lambda: f.read(UPLOAD_HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+            result['size'] = f.tell()
+
+        if not detect_image_format(header):
+            result['error'] = '文件内容不是有效的图片'
+            return result
+
+        file_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.{get_extension(storage.filename)}")
+        os.replace(temp_path, file_path)
+        storage.processed_path = file_path
+        result['path'] = file_path
+        result['sha256'] = sha256.hexdigest()
+        return result
+
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    finally:
+        if result['path'] is None:
+            _remove_temp(storage)
+
+def process_uploads(storages, upload_dir):
+    """在线程池中并行处理上传文件，按原顺序返回结果（跳过未选择文件的空表单项）
+
+    接收时已提交处理的文件直接等待结果，其余文件在这里提交。
+    """
+    jobs = []
+    for index, storage in enumerate(storages):
+        if not storage.filename:
+            _remove_temp(storage)
+            continue
+        future = getattr(storage, 'upload_future', None)
+        if future is None:
+            future = _upload_executor.submit(_process_file, index, storage, upload_dir)
+        jobs.append(future)
+    return [job.result() for job in jobs]